@@ -0,0 +1,63 @@
+"""add department closure table
+
+Revision ID: 3f2a9c1d4b7e
+Revises:
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d4b7e'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    # 开发环境的数据库可能已由 create_all 建好闭包表
+    if not sa.inspect(bind).has_table('department_closure'):
+        op.create_table(
+            'department_closure',
+            sa.Column('ancestor_id', sa.String(36), sa.ForeignKey('departments.id'), primary_key=True),
+            sa.Column('descendant_id', sa.String(36), sa.ForeignKey('departments.id'), primary_key=True),
+            sa.Column('depth', sa.Integer(), nullable=False, server_default='0'),
+        )
+        op.create_index(
+            'ix_department_closure_descendant_id', 'department_closure', ['descendant_id']
+        )
+
+    # 按 parent_id 为已有部门写入闭包记录，与 DepartmentService.rebuild_department_closure 一致
+    departments = sa.table('departments', sa.column('id'), sa.column('parent_id'))
+    closure = sa.table(
+        'department_closure',
+        sa.column('ancestor_id'),
+        sa.column('descendant_id'),
+        sa.column('depth'),
+    )
+    parents = {
+        dept_id: parent_id
+        for dept_id, parent_id in bind.execute(
+            sa.select(departments.c.id, departments.c.parent_id)
+        )
+    }
+    rows = []
+    for dept_id in parents:
+        ancestor_id, depth = dept_id, 0
+        visited = set()
+        while ancestor_id in parents and ancestor_id not in visited:
+            visited.add(ancestor_id)
+            rows.append({'ancestor_id': ancestor_id, 'descendant_id': dept_id, 'depth': depth})
+            ancestor_id, depth = parents.get(ancestor_id), depth + 1
+
+    op.execute(closure.delete())
+    if rows:
+        op.bulk_insert(closure, rows)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_department_closure_descendant_id', table_name='department_closure')
+    op.drop_table('department_closure')
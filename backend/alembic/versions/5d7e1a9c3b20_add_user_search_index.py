@@ -0,0 +1,49 @@
+"""add user search index
+
+Revision ID: 5d7e1a9c3b20
+Revises: 8c4e2b7a1f05
+Create Date: 2026-10-17 12:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5d7e1a9c3b20'
+down_revision = '8c4e2b7a1f05'
+branch_labels = None
+depends_on = None
+
+
+# 与 app.modules.system.search 中的定义一致，查询中的表达式需与索引定义完全一致
+USER_FTS_TABLE = 'users_fts'
+TRIGRAM_EXPRESSION = (
+    "(coalesce(users.username, '') || ' ' || coalesce(users.email, '') || ' ' "
+    "|| coalesce(users.nickname, ''))"
+)
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        # 索引内容在应用启动时由 ensure_user_search_index 按用户表全量写入
+        op.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {USER_FTS_TABLE} "
+            "USING fts5(user_id UNINDEXED, username, email, nickname, tokenize='unicode61')"
+        )
+    elif dialect == 'postgresql':
+        # 创建扩展需要数据库超级用户或扩展所有者权限，应由具备权限的账号执行迁移
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_users_search_trgm ON users "
+            f"USING gin ({TRIGRAM_EXPRESSION} gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(f"DROP TABLE IF EXISTS {USER_FTS_TABLE}")
+    elif dialect == 'postgresql':
+        # pg_trgm 扩展可能被其他对象使用，降级时保留
+        op.execute("DROP INDEX IF EXISTS ix_users_search_trgm")
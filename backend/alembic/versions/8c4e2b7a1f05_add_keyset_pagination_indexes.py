@@ -0,0 +1,38 @@
+"""add keyset pagination indexes
+
+Revision ID: 8c4e2b7a1f05
+Revises: 3f2a9c1d4b7e
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4e2b7a1f05'
+down_revision = '3f2a9c1d4b7e'
+branch_labels = None
+depends_on = None
+
+
+# 游标分页按 (created_at, id) 排序和比较，与模型中声明的索引一致
+KEYSET_INDEXES = (
+    ('ix_users_created_at_id', 'users'),
+    ('ix_roles_created_at_id', 'roles'),
+    ('ix_positions_created_at_id', 'positions'),
+)
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    for index_name, table_name in KEYSET_INDEXES:
+        # 开发环境的数据库可能已由 create_all 建好索引
+        existing = {index['name'] for index in inspector.get_indexes(table_name)}
+        if index_name not in existing:
+            op.create_index(index_name, table_name, ['created_at', 'id'])
+
+
+def downgrade() -> None:
+    for index_name, table_name in KEYSET_INDEXES:
+        op.drop_index(index_name, table_name=table_name)
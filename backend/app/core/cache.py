@@ -0,0 +1,319 @@
+"""
+缓存模块
+提供统一的异步缓存接口，支持进程内 LRU/TTL 缓存和 Redis 缓存，
+以及存放刷新令牌族、吊销记录等不可淘汰数据的状态存储
+"""
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+
+
+class CacheBackend(ABC):
+    """缓存后端基类，所有值以 bytes 形式存取"""
+    
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        """读取值，不存在或已过期时返回None"""
+    
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        """批量读取，返回与 keys 顺序一致的值列表"""
+        return [await self.get(key) for key in keys]
+    
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        """写入值，ttl 为过期时间（秒），None 表示不过期"""
+    
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        """删除键，不存在的键忽略"""
+    
+    @abstractmethod
+    async def incr(self, key: str, ttl: Optional[int] = None, amount: int = 1) -> int:
+        """递增计数器（amount 为负数时递减），ttl 仅在键首次创建时生效"""
+    
+    async def close(self) -> None:
+        """释放后端资源"""
+        return None
+
+
+class MemoryCache(CacheBackend):
+    """
+    进程内缓存
+    
+    基于 OrderedDict 实现 LRU 淘汰，每个条目可单独设置过期时间。
+    max_size 为None时不做淘汰，只在写入时定期清理已过期的条目，用作状态存储。
+    仅在当前进程内共享，适用于单进程部署和开发环境。
+    """
+    
+    # 不限容量时每写入多少次清理一次过期条目
+    PURGE_INTERVAL = 1024
+    
+    def __init__(self, max_size: Optional[int] = 1024):
+        self.max_size = max_size
+        self._data: "OrderedDict[str, Tuple[Optional[float], bytes]]" = OrderedDict()
+        self._writes = 0
+    
+    def _get_entry(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        
+        expires_at, value = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        
+        self._data.move_to_end(key)
+        return value
+    
+    def _set_entry(self, key: str, value: bytes, ttl: Optional[int]) -> None:
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        if self.max_size is None:
+            self._writes += 1
+            if self._writes % self.PURGE_INTERVAL == 0:
+                self._purge_expired()
+            return
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+    
+    def _purge_expired(self) -> None:
+        now = time.monotonic()
+        expired = [
+            key for key, (expires_at, _) in self._data.items()
+            if expires_at is not None and expires_at < now
+        ]
+        for key in expired:
+            del self._data[key]
+    
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._get_entry(key)
+    
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        self._set_entry(key, value, ttl)
+    
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+    
+    async def incr(self, key: str, ttl: Optional[int] = None, amount: int = 1) -> int:
+        current = self._get_entry(key)
+        if current is None:
+            self._set_entry(key, str(amount).encode(), ttl)
+            return amount
+        
+        # 保留已有条目的过期时间
+        value = int(current) + amount
+        self._data[key] = (self._data[key][0], str(value).encode())
+        return value
+
+
+class RedisCache(CacheBackend):
+    """
+    Redis 缓存
+    
+    多进程/多实例部署时共享缓存数据。可传入任意兼容 redis.asyncio
+    接口的客户端（例如测试中使用的 fakeredis.aioredis.FakeRedis）。
+    """
+    
+    def __init__(self, url: Optional[str] = None, client: Any = None):
+        if client is None:
+            from redis import asyncio as aioredis
+            client = aioredis.from_url(url or settings.REDIS_URL)
+        self.client = client
+    
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+    
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        if not keys:
+            return []
+        return await self.client.mget(keys)
+    
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        await self.client.set(key, value, ex=ttl)
+    
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*keys)
+    
+    async def incr(self, key: str, ttl: Optional[int] = None, amount: int = 1) -> int:
+        value = await self.client.incrby(key, amount)
+        if ttl and value == amount:
+            await self.client.expire(key, ttl)
+        return value
+    
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def create_cache_backend(backend: str, bounded: bool = True) -> CacheBackend:
+    """
+    根据名称创建缓存后端
+    
+    Args:
+        backend: 后端名称，memory / redis / fakeredis
+        bounded: 进程内缓存是否按 CACHE_MAX_SIZE 做 LRU 淘汰，状态存储传入False
+    
+    Returns:
+        缓存后端实例
+    """
+    if backend == "redis":
+        return RedisCache(settings.REDIS_URL)
+    if backend == "fakeredis":
+        # 测试用的本地替身，需要额外安装 fakeredis
+        from fakeredis import aioredis as fake_aioredis
+        return RedisCache(client=fake_aioredis.FakeRedis())
+    if backend == "memory":
+        return MemoryCache(max_size=settings.CACHE_MAX_SIZE if bounded else None)
+    raise ValueError(f"不支持的缓存后端: {backend}")
+
+
+_cache: Optional[CacheBackend] = None
+_state_store: Optional[CacheBackend] = None
+
+
+def get_cache() -> CacheBackend:
+    """获取全局缓存后端实例（懒加载）"""
+    global _cache
+    if _cache is None:
+        _cache = create_cache_backend(settings.CACHE_BACKEND)
+    return _cache
+
+
+def set_cache(backend: Optional[CacheBackend]) -> None:
+    """替换全局缓存后端（用于测试）"""
+    global _cache
+    _cache = backend
+
+
+def get_state_store() -> CacheBackend:
+    """
+    获取全局状态存储（懒加载）
+    
+    刷新令牌族、令牌吊销记录、登录失败计数和各类版本号丢失后会导致用户被登出、
+    吊销或限流失效、旧缓存重新生效，不能与缓存数据共用会被 LRU 淘汰的存储：
+    进程内后端不限容量，只按过期时间清理；
+    Redis 后端要求实例不淘汰数据（maxmemory-policy noeviction）。
+    """
+    global _state_store
+    if _state_store is None:
+        _state_store = create_cache_backend(
+            settings.STATE_BACKEND or settings.CACHE_BACKEND, bounded=False
+        )
+    return _state_store
+
+
+def set_state_store(backend: Optional[CacheBackend]) -> None:
+    """替换全局状态存储（用于测试）"""
+    global _state_store
+    _state_store = backend
+
+
+async def close_cache() -> None:
+    """关闭全局缓存后端和状态存储"""
+    global _cache, _state_store
+    if _cache is not None:
+        await _cache.close()
+        _cache = None
+    if _state_store is not None:
+        await _state_store.close()
+        _state_store = None
+
+
+def _namespace_version_key(namespace: str) -> str:
+    return f"{settings.CACHE_KEY_PREFIX}:{namespace}:version"
+
+
+async def get_namespace_version(namespace: str) -> int:
+    """
+    获取缓存命名空间的版本号
+    
+    版本号在每次 invalidate 时递增，可作为该命名空间数据的变更计数。
+    版本号保存在状态存储中：若与缓存数据一起被 LRU 淘汰，版本号会回到0，
+    旧版本号下写入的条目和数据戳将重新生效。
+    
+    Args:
+        namespace: 缓存命名空间
+    
+    Returns:
+        当前版本号，从未失效过时为0
+    """
+    value = await get_state_store().get(_namespace_version_key(namespace))
+    return int(value) if value else 0
+
+
+async def invalidate(namespace: str) -> None:
+    """
+    使整个缓存命名空间失效
+    
+    通过递增命名空间版本号实现，旧条目不再被读取并随 TTL 自然过期。
+    
+    Args:
+        namespace: 缓存命名空间
+    """
+    await get_state_store().incr(_namespace_version_key(namespace))
+
+
+def cached(
+    namespace: str,
+    ttl: Optional[int] = None,
+    adapter: Any = None
+) -> Callable:
+    """
+    异步函数结果缓存装饰器
+    
+    缓存键由命名空间、命名空间版本号和调用参数组成，数据库会话参数不参与键计算。
+    
+    Args:
+        namespace: 缓存命名空间，用于批量失效
+        ttl: 过期时间（秒），默认使用 CACHE_DEFAULT_TTL
+        adapter: 可选的 pydantic TypeAdapter，用于序列化模型对象；
+            未提供时使用 JSON 序列化
+    
+    Returns:
+        装饰器函数
+    """
+    expire = ttl if ttl is not None else settings.CACHE_DEFAULT_TTL
+    
+    def encode(value: Any) -> bytes:
+        if adapter is not None:
+            return adapter.dump_json(value)
+        return json.dumps(value, default=str).encode()
+    
+    def decode(raw: bytes) -> Any:
+        if adapter is not None:
+            return adapter.validate_json(raw)
+        return json.loads(raw)
+    
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            cache = get_cache()
+            key_args = [repr(arg) for arg in args if not isinstance(arg, AsyncSession)]
+            key_args += [
+                f"{name}={value!r}" for name, value in sorted(kwargs.items())
+                if not isinstance(value, AsyncSession)
+            ]
+            version = await get_namespace_version(namespace)
+            key = ":".join(
+                [settings.CACHE_KEY_PREFIX, namespace, f"v{version}", func.__qualname__, *key_args]
+            )
+            
+            raw = await cache.get(key)
+            if raw is not None:
+                return decode(raw)
+            
+            value = await func(*args, **kwargs)
+            await cache.set(key, encode(value), expire)
+            return value
+        return wrapper
+    return decorator
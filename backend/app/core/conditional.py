@@ -0,0 +1,143 @@
+"""
+条件请求模块
+按资源族版本生成强 ETag，If-None-Match 命中时在执行查询之前直接返回304
+"""
+import hashlib
+from typing import Awaitable, Callable, Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from .config import settings
+from .cache import get_cache, get_namespace_version, get_state_store, invalidate
+
+
+class NotModified(Exception):
+    """客户端缓存的资源未发生变化"""
+    
+    def __init__(self, headers: Dict[str, str]):
+        super().__init__("Not Modified")
+        self.headers = headers
+
+
+def _stamp_key(family: str, counter: int) -> str:
+    return f"{settings.CACHE_KEY_PREFIX}:{family}:stamp:v{counter}"
+
+
+def _last_stamp_key(family: str) -> str:
+    return f"{settings.CACHE_KEY_PREFIX}:{family}:stamp:last"
+
+
+async def resource_version(family: str, load_stamp: Callable[[], Awaitable[str]]) -> str:
+    """
+    获取资源族的版本
+    
+    版本由两部分组成：
+    - 变更计数：即同名缓存命名空间的版本号，应用内修改时随 invalidate 递增，立即生效
+    - 数据戳：由 load_stamp 查询数据表的行数和最大 updated_at，
+      用于发现绕过应用直接修改数据库的变更（如初始化脚本）
+    
+    数据戳按变更计数缓存 RESOURCE_VERSION_TTL 秒，期间获取版本不访问数据库，
+    直接修改数据库的变更最多延迟该时间后生效。重新查询的数据戳与同一变更计数下
+    上次的数据戳不同时，说明有绕过应用的修改，此时按 invalidate 递增变更计数，
+    同名命名空间的服务层缓存（如 @cached("departments")）随 ETag 一起失效，
+    不会出现新 ETag 搭配旧缓存内容的响应。
+    
+    Args:
+        family: 资源族名称，与缓存命名空间一致
+        load_stamp: 查询数据戳的协程函数，仅在缓存未命中时调用
+    
+    Returns:
+        资源族版本
+    """
+    counter = await get_namespace_version(family)
+    cache = get_cache()
+    stamp = await cache.get(_stamp_key(family, counter))
+    if stamp is None:
+        stamp = (await load_stamp()).encode()
+        # 上次查询的数据戳记录为 变更计数|数据戳
+        store = get_state_store()
+        last = await store.get(_last_stamp_key(family))
+        if last is not None:
+            last_counter, _, last_stamp = last.partition(b"|")
+            if int(last_counter) == counter and last_stamp != stamp:
+                await invalidate(family)
+                counter = await get_namespace_version(family)
+        await store.set(_last_stamp_key(family), f"{counter}|".encode() + stamp)
+        await cache.set(_stamp_key(family, counter), stamp, settings.RESOURCE_VERSION_TTL)
+    return f"{counter}:{stamp.decode()}"
+
+
+def make_etag(request: Request, *versions: str) -> str:
+    """
+    生成强 ETag
+    
+    同一资源在不同查询参数下响应不同，响应结构也可能随版本发布变化，
+    因此 ETag 由资源版本、应用版本、路径和规范化后的查询参数共同决定。
+    
+    Args:
+        request: 请求对象
+        versions: 响应所依赖的各资源族版本
+    
+    Returns:
+        带双引号的 ETag
+    """
+    query = "&".join(sorted(f"{name}={value}" for name, value in request.query_params.multi_items()))
+    raw = "|".join((*versions, settings.PROJECT_VERSION, request.url.path, query))
+    return f'"{hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    判断 If-None-Match 是否与 ETag 匹配
+    
+    按 RFC 7232 对 If-None-Match 使用弱比较（忽略 W/ 前缀），* 匹配任意现有资源。
+    
+    Args:
+        if_none_match: If-None-Match 请求头
+        etag: 当前 ETag
+    
+    Returns:
+        是否匹配
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+class ConditionalGet:
+    """单个请求的条件请求状态"""
+    
+    def __init__(self, etag: str):
+        self.etag = etag
+    
+    @property
+    def headers(self) -> Dict[str, str]:
+        """200和304响应共用的缓存相关响应头"""
+        return {
+            "ETag": self.etag,
+            "Cache-Control": settings.REFERENCE_DATA_CACHE_CONTROL,
+            # 响应只对有权限的用户可见，不同令牌不能共享缓存
+            "Vary": "Authorization",
+        }
+    
+    def check(self, request: Request) -> None:
+        """
+        检查 If-None-Match
+        
+        Raises:
+            NotModified: 客户端缓存仍然有效
+        """
+        if etag_matches(request.headers.get("if-none-match"), self.etag):
+            raise NotModified(self.headers)
+    
+    def apply(self, response: Response) -> Response:
+        """为完整响应附加 ETag 和缓存相关响应头"""
+        response.headers.update(self.headers)
+        return response
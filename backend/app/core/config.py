@@ -2,7 +2,7 @@
 应用配置模块
 管理所有环境变量和应用配置
 """
-from typing import List
+from typing import List, Optional
 from functools import lru_cache
 try:
     from pydantic_settings import BaseSettings
@@ -17,17 +17,83 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "企业级管理系统"
     PROJECT_VERSION: str = "1.0.0"
     DEBUG: bool = True
+    # 工作进程数，多进程部署时进程内缓存不能在进程间共享
+    WORKERS: int = 1
     
     # 数据库配置
     DATABASE_URL: str = "sqlite:///./backend.db"
+    # 输出每条SQL语句（调试用，日常排查优先使用请求级SQL统计）
+    DATABASE_ECHO: bool = False
+    # 严格加载模式：关系属性未在查询中显式加载时访问即抛错，不设置时生产模式（DEBUG=False）启用
+    ORM_STRICT_LOADING: Optional[bool] = None
+    
+    # 请求级SQL统计：调试模式下通过响应头返回，同一语句重复达到阈值时记录疑似N+1告警
+    SQL_INSTRUMENTATION_ENABLED: bool = True
+    SQL_REPEATED_QUERY_THRESHOLD: int = 5
     
     # Redis配置
     REDIS_URL: str = "redis://localhost:6379/0"
     
+    # 缓存配置（memory / redis / fakeredis）
+    CACHE_BACKEND: str = "memory"
+    CACHE_KEY_PREFIX: str = "cache"
+    CACHE_DEFAULT_TTL: int = 60
+    CACHE_MAX_SIZE: int = 1024
+    COUNT_CACHE_TTL: int = 30
+    # 状态存储后端（刷新令牌族、令牌吊销记录等不可淘汰的数据），不设置时与 CACHE_BACKEND 相同；
+    # 使用 Redis 时实例需配置 maxmemory-policy noeviction
+    STATE_BACKEND: Optional[str] = None
+    # 参考数据（权限、部门、角色）条件请求：资源版本的缓存时间和 Cache-Control 响应头
+    RESOURCE_VERSION_TTL: int = 60
+    REFERENCE_DATA_CACHE_CONTROL: str = "private, no-cache"
+    
     # JWT配置
     SECRET_KEY: str = "dev-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
+    # 自定义有效期的访问令牌允许的最长有效期，吊销用户全部会话的记录按此保留
+    ACCESS_TOKEN_MAX_EXPIRE_MINUTES: int = 60
+    
+    # 已验证访问令牌缓存容量，0 表示不缓存
+    TOKEN_CACHE_MAX_SIZE: int = 4096
+    
+    # 令牌吊销记录同步间隔（秒），多进程部署时吊销的最大生效延迟
+    TOKEN_REVOCATION_SYNC_INTERVAL: float = 1.0
+    
+    # 刷新令牌有效期（天），从登录时起算
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    
+    # 无状态认证：令牌内嵌用户声明，权限校验路由可跳过用户查询；
+    # 安全戳缓存必须在进程间共享，多进程部署时要求 CACHE_BACKEND=redis
+    JWT_STATELESS_AUTH: bool = False
+    SECURITY_STAMP_CACHE_TTL: int = 300
+    
+    # 登录限流：滑动窗口内允许的失败次数，分别按用户名+IP、用户名、IP统计
+    LOGIN_RATE_LIMIT_ENABLED: bool = True
+    LOGIN_RATE_LIMIT_WINDOW: int = 300
+    LOGIN_MAX_FAILURES_PER_USER_IP: int = 5
+    LOGIN_MAX_FAILURES_PER_USER: int = 20
+    LOGIN_MAX_FAILURES_PER_IP: int = 50
+    # 部署在反向代理之后时，使用 X-Forwarded-For 中的第一个地址作为客户端IP
+    LOGIN_RATE_LIMIT_TRUST_FORWARDED: bool = False
+    
+    # 权限缓存配置
+    PERMISSION_CACHE_TTL: int = 300
+    PERMISSION_CACHE_MAX_SIZE: int = 10000
+    # RBAC 版本号同步间隔（秒），多进程部署时权限变更在其他进程的最大生效延迟
+    RBAC_VERSION_SYNC_INTERVAL: float = 1.0
+    # 在ASGI层根据路由权限清单提前拒绝无权限请求，依赖安全戳缓存确认用户状态，
+    # 多进程部署时要求 CACHE_BACKEND=redis
+    PERMISSION_FAST_PATH_ENABLED: bool = True
+    
+    # 密码哈希执行器（thread / process）、并行数和排队上限
+    PASSWORD_HASH_EXECUTOR: str = "thread"
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_SIZE: int = 64
+    
+    # 用户批量导入每批写入数量和上传文件大小上限（字节）
+    USER_IMPORT_BATCH_SIZE: int = 500
+    USER_IMPORT_MAX_FILE_SIZE: int = 20 * 1024 * 1024
     
     # 跨域配置
     ALLOWED_ORIGINS: List[str] = ["http://localhost:3000"]
@@ -35,12 +101,35 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env"
         case_sensitive = True
+    
+    def validate_deployment(self) -> None:
+        """
+        校验配置组合在当前部署方式下是否安全
+        
+        Raises:
+            ValueError: 配置组合会导致安全校验在进程间不一致
+        """
+        if self.WORKERS > 1 and (self.STATE_BACKEND or self.CACHE_BACKEND) == "memory":
+            # 刷新令牌族、吊销记录和 RBAC 版本号只在单个进程内可见
+            raise ValueError("多进程部署时状态存储必须为 redis，请设置 STATE_BACKEND 或 CACHE_BACKEND")
+        if (
+            self.WORKERS > 1
+            and (self.JWT_STATELESS_AUTH or self.PERMISSION_FAST_PATH_ENABLED)
+            and self.CACHE_BACKEND == "memory"
+        ):
+            # 进程A修改密码或禁用用户后，进程B仍会按本地缓存的旧安全戳信任令牌
+            raise ValueError(
+                "多进程部署启用 JWT_STATELESS_AUTH 或 PERMISSION_FAST_PATH_ENABLED 时，"
+                "CACHE_BACKEND 必须为 redis"
+            )
 
 
 @lru_cache()
 def get_settings() -> Settings:
-    """获取配置实例（单例模式）"""
-    return Settings()
+    """获取配置实例（单例模式），配置组合不安全时拒绝启动"""
+    settings = Settings()
+    settings.validate_deployment()
+    return settings
 
 
 # 全局配置实例
@@ -1,12 +1,13 @@
 """
 数据库连接和会话管理
 """
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 
 from .config import settings
+from .query_stats import install_query_instrumentation
 
 
 # 统一数据库URL处理
@@ -28,15 +29,20 @@ def get_async_db_url():
 engine = create_engine(
     get_sync_db_url(),
     connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
-    echo=settings.DEBUG
+    echo=settings.DATABASE_ECHO
 )
 
 # 异步数据库引擎（用于FastAPI应用）
 async_engine = create_async_engine(
     get_async_db_url(),
-    echo=settings.DEBUG
+    echo=settings.DATABASE_ECHO
 )
 
+# 请求级SQL统计
+if settings.SQL_INSTRUMENTATION_ENABLED:
+    install_query_instrumentation(engine)
+    install_query_instrumentation(async_engine.sync_engine)
+
 # 会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 AsyncSessionLocal = sessionmaker(
@@ -59,6 +65,24 @@ async def get_async_session() -> AsyncSession:
             await session.close()
 
 
+async def has_table(db: AsyncSession, table_name: str) -> bool:
+    """
+    检查数据表是否存在
+    
+    生产环境不自动建表，新增的数据表需执行迁移后才存在。
+    
+    Args:
+        db: 数据库会话
+        table_name: 表名
+    
+    Returns:
+        是否存在
+    """
+    return await db.run_sync(
+        lambda session: inspect(session.connection()).has_table(table_name)
+    )
+
+
 def get_db():
     """获取同步数据库会话（用于Alembic等）"""
     db = SessionLocal()
@@ -0,0 +1,94 @@
+"""
+密码哈希执行器模块
+将 bcrypt 等CPU密集的哈希计算放到线程池或进程池中执行，避免阻塞事件循环
+"""
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from .config import settings
+
+
+class PasswordHasherBusy(Exception):
+    """哈希任务排队已满，请求被拒绝"""
+    
+    def __init__(self, retry_after: int = 1):
+        super().__init__("服务繁忙，请稍后重试")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """
+    密码哈希执行器
+    
+    最多 workers 个任务并行计算，另有 queue_size 个任务排队等待。
+    排队已满时，允许丢弃的任务（例如登录校验）立即抛出 PasswordHasherBusy，
+    由调用方返回 503，而不是让所有请求一起变慢。
+    
+    bcrypt 计算期间会释放 GIL，线程池即可获得多核并行；
+    进程池适用于不释放 GIL 的哈希实现。
+    """
+    
+    def __init__(self, executor: str = "thread", workers: int = 4, queue_size: int = 64):
+        self.executor_type = executor
+        self.workers = workers
+        self.max_pending = workers + queue_size
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+    
+    @property
+    def pending(self) -> int:
+        """正在执行和排队中的任务数"""
+        return self._pending
+    
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            elif self.executor_type == "thread":
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="password-hasher"
+                )
+            else:
+                raise ValueError(f"不支持的哈希执行器: {self.executor_type}")
+        return self._executor
+    
+    async def run(self, func: Callable, *args: Any, shed: bool = True) -> Any:
+        """
+        在执行器中运行哈希函数
+        
+        Args:
+            func: 模块级函数（进程池要求可被 pickle）
+            *args: 函数参数
+            shed: 排队已满时是否拒绝任务；批量导入等后台任务传入 False 以排队等待
+        
+        Returns:
+            函数返回值
+        
+        Raises:
+            PasswordHasherBusy: 排队已满且 shed 为 True
+        """
+        if shed and self._pending >= self.max_pending:
+            raise PasswordHasherBusy()
+        
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._pending -= 1
+    
+    def shutdown(self) -> None:
+        """关闭执行器，等待已提交的任务完成"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+# 全局密码哈希执行器
+password_hasher = PasswordHasher(
+    executor=settings.PASSWORD_HASH_EXECUTOR,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    queue_size=settings.PASSWORD_HASH_QUEUE_SIZE,
+)
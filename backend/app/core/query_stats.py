@@ -0,0 +1,143 @@
+"""
+SQL查询统计模块
+通过 SQLAlchemy 游标事件和上下文变量按请求统计查询次数、耗时和重复语句，用于发现N+1查询
+"""
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# 折叠 IN (?, ?, ?) 等展开参数，使参数个数不同的同类语句归为同一形态
+_PARAMETER_LIST = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|\$\d+|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|\$\d+|:\w+))+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """
+    获取语句形态（参数化后的SQL，折叠空白和参数列表）
+    
+    Args:
+        statement: SQL语句
+    
+    Returns:
+        语句形态
+    """
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    return _PARAMETER_LIST.sub("(...)", statement)
+
+
+class QueryStats:
+    """单个统计范围（一次请求或一个 query_budget 块）内的查询统计"""
+    
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.shapes: Counter = Counter()
+    
+    def record(self, statement: str, elapsed: float) -> None:
+        """记录一次语句执行"""
+        self.count += 1
+        self.total_time += elapsed
+        self.shapes[statement_shape(statement)] += 1
+    
+    def repeated(self, threshold: int = 2) -> List[Tuple[str, int]]:
+        """
+        获取重复执行的语句形态
+        
+        Args:
+            threshold: 最少重复次数
+        
+        Returns:
+            (语句形态, 次数) 列表，按次数降序
+        """
+        return [
+            (shape, count) for shape, count in self.shapes.most_common()
+            if count >= threshold
+        ]
+    
+    def summary(self) -> Dict[str, Any]:
+        """获取统计摘要"""
+        return {
+            "count": self.count,
+            "time_ms": round(self.total_time * 1000, 2),
+            "distinct": len(self.shapes),
+        }
+
+
+# 当前上下文中所有生效的统计范围，嵌套时每条语句同时计入各层
+_active_stats: ContextVar[Tuple[QueryStats, ...]] = ContextVar("active_query_stats", default=())
+
+
+@contextmanager
+def collect_queries() -> Iterator[QueryStats]:
+    """
+    在当前上下文中收集查询统计
+    
+    Yields:
+        查询统计对象，块内执行的语句实时计入
+    """
+    stats = QueryStats()
+    token = _active_stats.set(_active_stats.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _active_stats.reset(token)
+
+
+@contextmanager
+def query_budget(max_queries: int) -> Iterator[QueryStats]:
+    """
+    断言代码块内执行的查询次数不超过预算（测试用）
+    
+    Args:
+        max_queries: 最大查询次数
+    
+    Yields:
+        查询统计对象
+    
+    Raises:
+        AssertionError: 查询次数超出预算，错误信息包含各语句形态的执行次数
+    """
+    with collect_queries() as stats:
+        yield stats
+    
+    if stats.count > max_queries:
+        details = "\n".join(
+            f"  {count} x {shape}" for shape, count in stats.shapes.most_common()
+        )
+        raise AssertionError(
+            f"查询次数超出预算: 实际 {stats.count} 次，预算 {max_queries} 次\n{details}"
+        )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    elapsed = time.perf_counter() - start_times.pop()
+    for stats in _active_stats.get():
+        stats.record(statement, elapsed)
+
+
+def install_query_instrumentation(engine: Engine) -> None:
+    """
+    为同步引擎（异步引擎传入其 sync_engine）注册查询统计事件
+    
+    没有生效的统计范围时，事件处理只有一次上下文变量读取的开销。
+    
+    Args:
+        engine: 同步引擎
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
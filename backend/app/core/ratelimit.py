@@ -0,0 +1,207 @@
+"""
+登录限流模块
+基于滑动窗口计数器统计登录失败次数，在查询数据库和校验密码之前拒绝被限流的请求
+"""
+import asyncio
+import time
+from typing import Dict, List, Tuple
+
+from fastapi import Request
+
+from .config import settings
+from .cache import get_state_store
+
+
+class RateLimitExceeded(Exception):
+    """请求超出限流阈值"""
+    
+    def __init__(self, scope: str, retry_after: int):
+        super().__init__("尝试次数过多，请稍后重试")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+def get_client_ip(request: Request) -> str:
+    """
+    获取客户端IP
+    
+    Args:
+        request: 请求对象
+    
+    Returns:
+        客户端IP，无法获取时返回 unknown
+    """
+    if settings.LOGIN_RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+class LoginRateLimiter:
+    """
+    登录失败限流器
+    
+    使用滑动窗口计数器：每个窗口一个计数键，当前估计值为
+    上一窗口计数按剩余比例折算后加上当前窗口计数。
+    计数存放在状态存储中，不会被缓存的 LRU 淘汰清零；
+    内存后端适用于单进程，Redis 后端在多实例间共享。
+    
+    每次登录尝试先原子递增计数再与阈值比较，并发的一批请求各自得到不同的计数，
+    不会同时通过检查。计数先按失败处理，登录成功后再清除或退回。
+    
+    同时按三个维度统计失败次数：
+    - 用户名+IP：针对单个来源对单个账号的暴力破解，阈值最低
+    - 用户名：针对分布式的单账号攻击
+    - IP：针对单个来源尝试大量账号的撞库攻击
+    """
+    
+    def __init__(self, window: int, limits: Dict[str, int]):
+        self.window = window
+        self.limits = limits
+        self._metrics: Dict[str, int] = {
+            "checked": 0,
+            "throttled": 0,
+            "failures": 0,
+            "successes": 0,
+        }
+        self._throttled_by_scope: Dict[str, int] = {scope: 0 for scope in limits}
+    
+    @staticmethod
+    def _identities(username: str, ip: str) -> Dict[str, str]:
+        username = username.strip().lower()
+        return {
+            "user_ip": f"{username}|{ip}",
+            "user": username,
+            "ip": ip,
+        }
+    
+    def _key(self, scope: str, identity: str, window_index: int) -> str:
+        return f"{settings.CACHE_KEY_PREFIX}:login:{scope}:{identity}:{window_index}"
+    
+    def _window_position(self) -> Tuple[int, float]:
+        now = time.time()
+        window_index = int(now // self.window)
+        return window_index, now - window_index * self.window
+    
+    async def _count_attempt(self, scope: str, identity: str, window_index: int, elapsed: float) -> float:
+        store = get_state_store()
+        previous, current = await asyncio.gather(
+            store.get(self._key(scope, identity, window_index - 1)),
+            # 计数键需保留到下一个窗口结束，用于滑动窗口折算
+            store.incr(self._key(scope, identity, window_index), self.window * 2),
+        )
+        weight = (self.window - elapsed) / self.window
+        return max(int(previous or 0), 0) * weight + current
+    
+    async def _release(self, identities: Dict[str, str], scopes: List[str], window_index: int) -> None:
+        store = get_state_store()
+        await asyncio.gather(*(
+            store.incr(self._key(scope, identities[scope], window_index), self.window * 2, amount=-1)
+            for scope in scopes
+        ))
+    
+    async def acquire(self, username: str, ip: str) -> None:
+        """
+        登记一次登录尝试，并检查是否允许
+        
+        各维度的计数先原子递增再与阈值比较，本次尝试在确认结果前按失败计数；
+        被拒绝时退回计数，被拒绝的请求不延长限流时间。
+        
+        Args:
+            username: 登录用户名或邮箱
+            ip: 客户端IP
+        
+        Raises:
+            RateLimitExceeded: 任一维度计入本次尝试后超过阈值
+        """
+        if not settings.LOGIN_RATE_LIMIT_ENABLED:
+            return
+        
+        self._metrics["checked"] += 1
+        window_index, elapsed = self._window_position()
+        identities = self._identities(username, ip)
+        counts = await asyncio.gather(*(
+            self._count_attempt(scope, identity, window_index, elapsed)
+            for scope, identity in identities.items()
+        ))
+        for scope, count in zip(identities, counts):
+            if count > self.limits[scope]:
+                await self._release(identities, list(identities), window_index)
+                self._metrics["throttled"] += 1
+                self._throttled_by_scope[scope] += 1
+                # 至少等到当前窗口结束，上一窗口的计数才会开始衰减
+                raise RateLimitExceeded(scope, int(self.window - elapsed) + 1)
+    
+    async def record_failure(self, username: str, ip: str) -> None:
+        """
+        记录一次登录失败（计数已在 acquire 中递增，这里只更新统计）
+        
+        Args:
+            username: 登录用户名或邮箱
+            ip: 客户端IP
+        """
+        if not settings.LOGIN_RATE_LIMIT_ENABLED:
+            return
+        
+        self._metrics["failures"] += 1
+    
+    async def record_success(self, username: str, ip: str) -> None:
+        """
+        记录一次登录成功，清除该用户的失败计数（用户名+IP 和用户名维度）
+        
+        只有知道密码的人才能登录成功，清除用户名维度不会给攻击者可乘之机，
+        而保留它会让失败记录分散在多个IP上的用户在成功登录后仍被限流。
+        IP维度的计数不清除，只退回本次尝试，避免攻击者用自己的账号穿插成功登录来重置撞库计数。
+        
+        Args:
+            username: 登录用户名或邮箱
+            ip: 客户端IP
+        """
+        if not settings.LOGIN_RATE_LIMIT_ENABLED:
+            return
+        
+        self._metrics["successes"] += 1
+        window_index, _ = self._window_position()
+        identities = self._identities(username, ip)
+        keys: List[str] = [
+            self._key(scope, identities[scope], index)
+            for scope in ("user_ip", "user")
+            for index in (window_index - 1, window_index)
+        ]
+        await asyncio.gather(
+            get_state_store().delete(*keys),
+            self._release(identities, ["ip"], window_index),
+        )
+    
+    def metrics(self) -> Dict[str, object]:
+        """
+        获取当前进程的限流统计
+        
+        Returns:
+            检查次数、拒绝次数（含各维度明细）、失败和成功次数
+        """
+        return {
+            **self._metrics,
+            "throttled_by_scope": dict(self._throttled_by_scope),
+            "window": self.window,
+            "limits": dict(self.limits),
+        }
+    
+    def reset_metrics(self) -> None:
+        """清零统计数据"""
+        for name in self._metrics:
+            self._metrics[name] = 0
+        for scope in self._throttled_by_scope:
+            self._throttled_by_scope[scope] = 0
+
+
+# 全局登录限流器
+login_limiter = LoginRateLimiter(
+    window=settings.LOGIN_RATE_LIMIT_WINDOW,
+    limits={
+        "user_ip": settings.LOGIN_MAX_FAILURES_PER_USER_IP,
+        "user": settings.LOGIN_MAX_FAILURES_PER_USER,
+        "ip": settings.LOGIN_MAX_FAILURES_PER_IP,
+    },
+)
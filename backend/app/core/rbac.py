@@ -0,0 +1,403 @@
+"""
+RBAC 权限缓存模块
+维护全局 RBAC 版本号、权限位注册表以及按用户缓存的有效权限位掩码
+"""
+import hashlib
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .config import settings
+from .cache import get_state_store
+
+
+# RBAC 版本号，角色/权限/用户角色关系变更时递增。版本号保存在状态存储中供各进程共享，
+# 这里是本进程的快照，每隔 RBAC_VERSION_SYNC_INTERVAL 秒由 sync_rbac_version 刷新
+_rbac_version: int = 0
+_next_version_sync: float = 0.0
+
+
+def _rbac_version_key() -> str:
+    return f"{settings.CACHE_KEY_PREFIX}:rbac:version"
+
+
+def get_rbac_version() -> int:
+    """获取本进程最近同步的 RBAC 版本号"""
+    return _rbac_version
+
+
+async def sync_rbac_version(force: bool = False) -> int:
+    """
+    从状态存储同步 RBAC 版本号
+    
+    两次同步之间直接返回本地快照，不产生 I/O；本进程发起的变更立即生效，
+    其他进程发起的变更最多延迟 RBAC_VERSION_SYNC_INTERVAL 秒。
+    
+    Args:
+        force: 忽略同步间隔立即同步
+    
+    Returns:
+        当前 RBAC 版本号
+    """
+    global _rbac_version, _next_version_sync
+    now = time.monotonic()
+    if force or now >= _next_version_sync:
+        _next_version_sync = now + settings.RBAC_VERSION_SYNC_INTERVAL
+        value = await get_state_store().get(_rbac_version_key())
+        _rbac_version = int(value) if value else 0
+    return _rbac_version
+
+
+async def bump_rbac_version() -> int:
+    """
+    递增 RBAC 版本号
+    
+    所有进程中已缓存的用户权限集合随之失效，下次访问时重新从数据库加载。
+    
+    Returns:
+        递增后的版本号
+    """
+    global _rbac_version
+    _rbac_version = await get_state_store().incr(_rbac_version_key())
+    return _rbac_version
+
+
+class PermissionCache:
+    """
+    用户有效权限缓存
+    
+    以用户ID为键，缓存 (RBAC版本号, 过期时间, 值)，值为权限位掩码或角色代码集合。
+    版本号不一致或超过 TTL 的条目视为未命中。缓存为进程内缓存，
+    版本号在进程间共享，其他进程的变更在下次 sync_rbac_version 后生效。
+    写入时使用开始加载数据前读取的版本号，加载期间发生的变更会使该条目直接失效。
+    """
+    
+    def __init__(self, ttl: int, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: Dict[str, Tuple[int, float, Any]] = {}
+    
+    def get(self, user_id: str) -> Optional[Any]:
+        """
+        获取缓存值
+        
+        Args:
+            user_id: 用户ID
+        
+        Returns:
+            缓存值，未命中时返回None
+        """
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        
+        version, expires_at, value = entry
+        if version != _rbac_version or expires_at < time.monotonic():
+            self._entries.pop(user_id, None)
+            return None
+        return value
+    
+    def set(self, user_id: str, value: Any, version: int) -> None:
+        """
+        写入缓存值
+        
+        Args:
+            user_id: 用户ID
+            value: 权限位掩码或角色代码集合
+            version: 开始从数据库加载该值之前的 RBAC 版本号
+        """
+        if version != _rbac_version:
+            # 加载期间权限已变更，加载结果可能已过时
+            return
+        if len(self._entries) >= self.max_size and user_id not in self._entries:
+            # 超出容量时整体清空，下一轮请求会重新填充热点用户
+            self._entries.clear()
+        self._entries[user_id] = (
+            version,
+            time.monotonic() + self.ttl,
+            value,
+        )
+    
+    def invalidate(self, user_id: str) -> None:
+        """使指定用户的缓存失效"""
+        self._entries.pop(user_id, None)
+    
+    def clear(self) -> None:
+        """清空缓存"""
+        self._entries.clear()
+
+
+class PermissionRegistry:
+    """
+    权限位注册表
+    
+    为每个权限代码分配一个固定的位序号，权限集合因此可以表示为一个整数位掩码，
+    权限校验简化为一次按位与运算。序号按首次出现的顺序分配，进程生命周期内不变；
+    权限被删除后序号也不回收，只是不再出现在任何角色的掩码中。
+    位掩码只在进程内使用，不对外暴露或持久化。
+    """
+    
+    # 指纹缓存的最大条目数，不同的有效权限组合通常很少
+    FINGERPRINT_CACHE_SIZE = 1024
+    
+    def __init__(self):
+        self._bits: Dict[str, int] = {}
+        self._codes: List[str] = []
+        self._fingerprints: Dict[int, str] = {}
+    
+    def bit(self, code: str) -> int:
+        """
+        获取权限代码对应的位值，未注册的代码自动分配新序号
+        
+        Args:
+            code: 权限代码
+        
+        Returns:
+            只有一位为1的整数
+        """
+        index = self._bits.get(code)
+        if index is None:
+            index = len(self._codes)
+            self._bits[code] = index
+            self._codes.append(code)
+        return 1 << index
+    
+    def find_bit(self, code: str) -> int:
+        """
+        获取已注册权限代码的位值，不注册新代码（用于校验客户端传入的代码）
+        
+        Args:
+            code: 权限代码
+        
+        Returns:
+            位值，未注册时为0
+        """
+        index = self._bits.get(code)
+        return 0 if index is None else 1 << index
+    
+    def mask(self, codes: Iterable[str]) -> int:
+        """
+        将权限代码集合编译为位掩码
+        
+        Args:
+            codes: 权限代码
+        
+        Returns:
+            位掩码
+        """
+        mask = 0
+        for code in codes:
+            mask |= self.bit(code)
+        return mask
+    
+    def codes(self, mask: int) -> List[str]:
+        """
+        将位掩码还原为权限代码列表
+        
+        Args:
+            mask: 位掩码
+        
+        Returns:
+            权限代码列表，按注册顺序排列
+        """
+        codes = []
+        index = 0
+        while mask:
+            if mask & 1:
+                codes.append(self._codes[index])
+            mask >>= 1
+            index += 1
+        return codes
+    
+    def fingerprint(self, mask: int) -> str:
+        """
+        计算权限集合的指纹
+        
+        指纹基于排序后的权限代码计算，与各进程的位序号分配无关，
+        可以在多进程部署中作为权限集合的版本号返回给客户端。
+        
+        Args:
+            mask: 位掩码
+        
+        Returns:
+            16位十六进制字符串
+        """
+        fingerprint = self._fingerprints.get(mask)
+        if fingerprint is None:
+            payload = "\n".join(sorted(self.codes(mask))).encode()
+            fingerprint = hashlib.blake2b(payload, digest_size=8).hexdigest()
+            if len(self._fingerprints) >= self.FINGERPRINT_CACHE_SIZE:
+                self._fingerprints.clear()
+            self._fingerprints[mask] = fingerprint
+        return fingerprint
+
+
+class _TrieNode:
+    """权限代码前缀树节点"""
+    
+    __slots__ = ("children", "mask", "exact")
+    
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        # 子树内全部权限的掩码
+        self.mask = 0
+        # 恰好以该节点结尾的权限的掩码
+        self.exact = 0
+
+
+class PermissionIndex:
+    """
+    权限展开索引
+    
+    由全部有效权限编译而成，构建角色掩码时展开两类隐含授权：
+    - 通配符：user:* 授予以 user: 开头的全部权限，* 授予全部权限
+    - 层级：授予父权限（例如菜单 user）即授予其 parent_id 子树下的全部权限
+    
+    通配符通过按 ":" 分段的前缀树解析，每个节点预先保存子树的掩码；
+    展开结果按权限代码缓存。索引随角色掩码表每个 RBAC 版本编译一次，
+    请求路径上的权限校验仍然只是一次按位与。
+    """
+    
+    WILDCARD = "*"
+    
+    def __init__(
+        self,
+        registry: PermissionRegistry,
+        permissions: Iterable[Tuple[str, Optional[str]]]
+    ):
+        """
+        Args:
+            registry: 权限位注册表
+            permissions: 全部有效权限的 (权限代码, 父权限代码)
+        """
+        self._registry = registry
+        self._root = _TrieNode()
+        self._children: Dict[str, List[str]] = {}
+        self._expanded: Dict[str, int] = {}
+        
+        for code, parent_code in permissions:
+            bit = registry.bit(code)
+            node = self._root
+            node.mask |= bit
+            for segment in code.split(":"):
+                node = node.children.setdefault(segment, _TrieNode())
+                node.mask |= bit
+            node.exact |= bit
+            if parent_code is not None:
+                self._children.setdefault(parent_code, []).append(code)
+    
+    @property
+    def all_mask(self) -> int:
+        """全部有效权限的掩码"""
+        return self._root.mask
+    
+    def _match_wildcard(self, code: str) -> int:
+        node = self._root
+        for segment in code.split(":")[:-1]:
+            node = node.children.get(segment)
+            if node is None:
+                return 0
+        # 前缀本身（例如菜单 user）不在 user:* 的匹配范围内
+        return node.mask & ~node.exact
+    
+    def expand(self, code: str) -> int:
+        """
+        展开一个授予的权限代码
+        
+        Args:
+            code: 角色被授予的权限代码
+        
+        Returns:
+            该授权隐含的全部有效权限掩码（包含自身）
+        """
+        expanded = self._expanded.get(code)
+        if expanded is not None:
+            return expanded
+        
+        # 先占位，防止 parent_id 数据成环时无限递归
+        self._expanded[code] = 0
+        mask = self._registry.bit(code)
+        if code == self.WILDCARD or code.endswith(":" + self.WILDCARD):
+            mask |= self._match_wildcard(code)
+        for child_code in self._children.get(code, ()):
+            mask |= self.expand(child_code)
+        
+        self._expanded[code] = mask
+        return mask
+
+
+class RoleMaskTable:
+    """
+    角色权限位掩码表
+    
+    缓存所有有效角色的权限位掩码以及全部有效权限的掩码（超级管理员使用），
+    与用户权限缓存共用 RBAC 版本号和 TTL。表为全局共享，用户缓存未命中时
+    只需查询用户的角色代码，再对角色掩码做按位或即可得到有效权限。
+    """
+    
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._entry: Optional[Tuple[int, float, Dict[str, int], int]] = None
+    
+    def get(self) -> Optional[Tuple[Dict[str, int], int]]:
+        """
+        获取角色掩码表
+        
+        Returns:
+            (角色代码 -> 位掩码, 全部有效权限掩码)，未命中时返回None
+        """
+        if self._entry is None:
+            return None
+        
+        version, expires_at, role_masks, all_mask = self._entry
+        if version != _rbac_version or expires_at < time.monotonic():
+            self._entry = None
+            return None
+        return role_masks, all_mask
+    
+    def set(self, role_masks: Dict[str, int], all_mask: int, version: int) -> None:
+        """
+        写入角色掩码表
+        
+        Args:
+            role_masks: 角色代码 -> 位掩码
+            all_mask: 全部有效权限掩码
+            version: 开始从数据库加载之前的 RBAC 版本号
+        """
+        if version != _rbac_version:
+            # 加载期间权限已变更，加载结果可能已过时
+            return
+        self._entry = (
+            version,
+            time.monotonic() + self.ttl,
+            role_masks,
+            all_mask,
+        )
+    
+    def clear(self) -> None:
+        """清空缓存"""
+        self._entry = None
+
+
+# 全局权限位注册表
+permission_registry = PermissionRegistry()
+
+# 全局角色掩码表
+role_mask_table = RoleMaskTable(ttl=settings.PERMISSION_CACHE_TTL)
+
+# 全局权限缓存实例，缓存用户的有效权限位掩码
+permission_cache = PermissionCache(
+    ttl=settings.PERMISSION_CACHE_TTL,
+    max_size=settings.PERMISSION_CACHE_MAX_SIZE,
+)
+
+# 用户角色代码缓存，与权限缓存共用 RBAC 版本号和 TTL
+role_cache = PermissionCache(
+    ttl=settings.PERMISSION_CACHE_TTL,
+    max_size=settings.PERMISSION_CACHE_MAX_SIZE,
+)
+
+
+def invalidate_user_rbac(user_id: str) -> None:
+    """使指定用户的权限和角色缓存失效"""
+    permission_cache.invalidate(user_id)
+    role_cache.invalidate(user_id)
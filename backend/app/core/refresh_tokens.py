@@ -0,0 +1,155 @@
+"""
+刷新令牌模块
+刷新令牌由 令牌族ID.代数.签名 组成，仅凭 HMAC 即可校验；
+令牌族状态存放在不淘汰数据的状态存储中，用于轮换和重复使用检测
+"""
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+from typing import Any, Dict, Optional, Tuple
+
+from .config import settings
+from .cache import get_state_store
+
+
+class RefreshTokenError(Exception):
+    """刷新令牌无效、已过期或被重复使用"""
+    
+    def __init__(self, detail: str, reused: bool = False):
+        super().__init__(detail)
+        self.detail = detail
+        self.reused = reused
+
+
+def _family_key(family_id: str) -> str:
+    return f"{settings.CACHE_KEY_PREFIX}:refresh:{family_id}"
+
+
+def _generation_key(family_id: str) -> str:
+    return f"{settings.CACHE_KEY_PREFIX}:refresh:{family_id}:generation"
+
+
+def _sign(family_id: str, generation: int) -> str:
+    digest = hmac.new(
+        settings.SECRET_KEY.encode(),
+        f"refresh|{family_id}|{generation}".encode(),
+        hashlib.sha256
+    ).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def _encode(family_id: str, generation: int) -> str:
+    return f"{family_id}.{generation}.{_sign(family_id, generation)}"
+
+
+def parse_refresh_token(token: str) -> Tuple[str, int]:
+    """
+    解析并校验刷新令牌签名
+    
+    Args:
+        token: 刷新令牌
+    
+    Returns:
+        (令牌族ID, 代数)
+    
+    Raises:
+        RefreshTokenError: 格式或签名无效
+    """
+    try:
+        family_id, generation_text, signature = token.split(".")
+        generation = int(generation_text)
+    except (AttributeError, ValueError):
+        raise RefreshTokenError("无效的刷新令牌")
+    
+    if not hmac.compare_digest(signature, _sign(family_id, generation)):
+        raise RefreshTokenError("无效的刷新令牌")
+    return family_id, generation
+
+
+async def issue_refresh_token(
+    user_id: str,
+    security_stamp: str,
+    is_superuser: bool
+) -> str:
+    """
+    登录时签发新的刷新令牌族
+    
+    Args:
+        user_id: 用户ID
+        security_stamp: 签发时的用户安全戳，安全戳变化后令牌族失效
+        is_superuser: 是否超级管理员（用于续签无状态访问令牌）
+    
+    Returns:
+        第0代刷新令牌
+    """
+    family_id = secrets.token_urlsafe(16)
+    ttl = settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600
+    state = {"sub": user_id, "ss": security_stamp, "su": bool(is_superuser)}
+    
+    store = get_state_store()
+    await store.set(_family_key(family_id), json.dumps(state).encode(), ttl)
+    await store.set(_generation_key(family_id), b"0", ttl)
+    return _encode(family_id, 0)
+
+
+async def rotate_refresh_token(token: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    轮换刷新令牌
+    
+    代数计数器通过原子递增推进，同一代令牌只能成功使用一次。
+    已被使用过的旧令牌再次出现视为泄露，整个令牌族随即吊销。
+    
+    Args:
+        token: 当前刷新令牌
+    
+    Returns:
+        (新刷新令牌, 令牌族状态)
+    
+    Raises:
+        RefreshTokenError: 令牌无效、已过期或被重复使用
+    """
+    family_id, generation = parse_refresh_token(token)
+    
+    store = get_state_store()
+    raw_state = await store.get(_family_key(family_id))
+    if raw_state is None:
+        raise RefreshTokenError("刷新令牌已失效，请重新登录")
+    
+    next_generation = await store.incr(_generation_key(family_id))
+    if next_generation != generation + 1:
+        await revoke_refresh_family(family_id)
+        raise RefreshTokenError("刷新令牌已被使用，请重新登录", reused=True)
+    
+    return _encode(family_id, next_generation), json.loads(raw_state)
+
+
+async def revoke_refresh_family(family_id: str) -> None:
+    """吊销整个刷新令牌族"""
+    await get_state_store().delete(_family_key(family_id), _generation_key(family_id))
+
+
+async def revoke_refresh_token(token: str, user_id: Optional[str] = None) -> bool:
+    """
+    吊销刷新令牌所属的令牌族（用于登出）
+    
+    Args:
+        token: 刷新令牌
+        user_id: 指定时仅吊销属于该用户的令牌族
+    
+    Returns:
+        是否吊销成功
+    """
+    try:
+        family_id, _ = parse_refresh_token(token)
+    except RefreshTokenError:
+        return False
+    
+    if user_id is not None:
+        raw_state = await get_state_store().get(_family_key(family_id))
+        if raw_state is None or json.loads(raw_state)["sub"] != user_id:
+            return False
+    
+    await revoke_refresh_family(family_id)
+    return True
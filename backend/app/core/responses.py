@@ -0,0 +1,110 @@
+"""
+高性能JSON响应模块
+为大列表和树形接口提供按需启用的快速响应类，跳过 FastAPI 对返回值的二次校验和
+jsonable_encoder 的逐层转换，直接由预构建的序列化器输出JSON字节
+"""
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json, to_jsonable_python
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+
+from app.schemas.common import ApiResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson 未安装时退回 pydantic-core 的序列化器
+    orjson = None
+
+
+@lru_cache(maxsize=None)
+def get_type_adapter(response_type: Any) -> TypeAdapter:
+    """
+    获取响应类型对应的 TypeAdapter
+    
+    TypeAdapter 构建时会编译校验器和序列化器，开销远大于单次序列化，
+    因此按类型缓存，同一类型在进程内只构建一次。
+    
+    Args:
+        response_type: 类型注解，如 List[DepartmentTree]
+    
+    Returns:
+        缓存的 TypeAdapter
+    """
+    return TypeAdapter(response_type)
+
+
+def dumps(content: Any) -> bytes:
+    """
+    将普通Python对象序列化为JSON字节
+    
+    Args:
+        content: 字典、列表等普通对象
+    
+    Returns:
+        UTF-8编码的JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            content,
+            default=to_jsonable_python,
+            option=orjson.OPT_NON_STR_KEYS
+        )
+    return to_json(content)
+
+
+class FastJSONResponse(Response):
+    """
+    快速JSON响应
+    
+    - pydantic 模型使用模型类上预编译的序列化器直接输出JSON字节
+    - 指定 response_type 时使用按类型缓存的 TypeAdapter 序列化
+    - 其他普通对象使用 orjson 序列化
+    
+    路由函数直接返回响应对象时 FastAPI 不再按 response_model 校验和转换返回值，
+    路由装饰器上的 response_model 仍用于生成接口文档。
+    因此只应用于内容来自服务层、已经是目标类型的可信数据。
+    """
+    
+    media_type = "application/json"
+    
+    def __init__(
+        self,
+        content: Any,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+        background: Optional[BackgroundTask] = None,
+        response_type: Any = None
+    ):
+        self.response_type = response_type
+        super().__init__(content, status_code, headers, media_type, background)
+    
+    def render(self, content: Any) -> bytes:
+        if self.response_type is not None:
+            return get_type_adapter(self.response_type).dump_json(content)
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        return dumps(content)
+
+
+def api_response(data: Any, data_type: Any, status_code: int = 200) -> FastJSONResponse:
+    """
+    将可信的服务层输出包装为成功的 ApiResponse 并直接序列化
+    
+    ApiResponse 以 model_construct 构造，不再逐项校验 data；序列化按
+    ApiResponse[data_type] 的类型信息进行，因此 data 必须已经符合 data_type，
+    需要校验的原始数据应先用 get_type_adapter(data_type).validate_python 转换。
+    
+    Args:
+        data: 响应数据
+        data_type: 响应数据类型，与路由 response_model 中的类型参数一致
+        status_code: HTTP状态码
+    
+    Returns:
+        快速JSON响应
+    """
+    content = ApiResponse[data_type].model_construct(success=True, data=data)
+    return FastJSONResponse(content, status_code=status_code)
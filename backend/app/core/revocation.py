@@ -0,0 +1,219 @@
+"""
+令牌吊销模块
+吊销记录以递增序号写入状态存储，各工作进程定期增量同步到本地集合，
+请求校验时只查本地内存
+"""
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from .config import settings
+from .cache import get_state_store
+from .security import max_access_token_lifetime
+
+
+def _sequence_key() -> str:
+    return f"{settings.CACHE_KEY_PREFIX}:revocation:seq"
+
+
+def _entry_key(sequence: int) -> str:
+    return f"{settings.CACHE_KEY_PREFIX}:revocation:{sequence}"
+
+
+class TokenRevocationList:
+    """
+    访问令牌吊销列表
+    
+    支持两类吊销记录：
+    - 单个令牌：按 jti 吊销，保留到令牌过期
+    - 用户全部会话：记录一个时间点，签发时间（iat）早于该时间点的令牌全部失效
+    
+    每条记录写入状态存储的 缓存前缀:revocation:<序号>，过期时间与记录有效期一致，
+    记录在有效期内不会被淘汰，否则已吊销的令牌会重新生效；
+    本地保存已同步的最大序号，每隔 sync_interval 秒读取一次新增记录。
+    写入方先递增序号再写入记录，同步时遇到尚未写入的记录会停在该序号，
+    下次同步重新读取，不会越过仍在写入的记录。
+    两次同步之间的校验不产生任何 I/O，本进程发起的吊销立即生效，
+    其他进程最多延迟 sync_interval 秒。
+    """
+    
+    # 单次同步最多读取的记录数
+    SYNC_BATCH_SIZE = 1000
+    # 序号之后的记录写入超过该秒数时，仍缺失的记录视为已过期或写入方已失败
+    PENDING_GRACE = 10
+    
+    def __init__(self, sync_interval: float):
+        self.sync_interval = sync_interval
+        self._revoked_jtis: Dict[str, float] = {}
+        self._user_cutoffs: Dict[str, Dict[str, float]] = {}
+        self._last_sequence = 0
+        self._next_sync = 0.0
+    
+    def _apply(self, entry: Dict[str, Any]) -> None:
+        if entry["type"] == "jti":
+            self._revoked_jtis[entry["jti"]] = entry["exp"]
+        elif entry["type"] == "user":
+            current = self._user_cutoffs.get(entry["sub"])
+            if current is None or current["after"] < entry["after"]:
+                self._user_cutoffs[entry["sub"]] = {
+                    "after": entry["after"],
+                    "exp": entry["exp"],
+                }
+    
+    def _prune(self) -> None:
+        now = time.time()
+        self._revoked_jtis = {
+            jti: exp for jti, exp in self._revoked_jtis.items() if exp > now
+        }
+        self._user_cutoffs = {
+            user_id: cutoff for user_id, cutoff in self._user_cutoffs.items()
+            if cutoff["exp"] > now
+        }
+    
+    async def _append(self, entry: Dict[str, Any]) -> None:
+        ttl = int(entry["exp"] - time.time()) + 1
+        if ttl <= 0:
+            return
+        store = get_state_store()
+        sequence = await store.incr(_sequence_key())
+        # 写入时间供其他进程判断缺失的记录是否仍在写入
+        record = {**entry, "ts": time.time()}
+        await store.set(_entry_key(sequence), json.dumps(record).encode(), ttl)
+        self._apply(entry)
+    
+    def _settled(self, entries: List[Optional[Dict[str, Any]]]) -> int:
+        """
+        计算可以确认的记录前缀长度
+        
+        缺失的记录可能已过期，也可能其他进程刚递增序号、尚未写入。
+        序号更大的记录写入已超过 PENDING_GRACE 秒时，缺失记录的写入方早已取得序号，
+        可以确认该记录不会再出现；否则停在缺失的记录处，等待下次同步。
+        
+        Args:
+            entries: 按序号排列的记录，缺失的记录为None
+        
+        Returns:
+            可以应用并越过的记录数
+        """
+        horizon = time.time() - self.PENDING_GRACE
+        settled = len(entries)
+        confirmed = False
+        for index in range(len(entries) - 1, -1, -1):
+            entry = entries[index]
+            if entry is None:
+                if not confirmed:
+                    settled = index
+            elif entry.get("ts", 0) <= horizon:
+                confirmed = True
+        return settled
+    
+    async def sync(self, force: bool = False) -> None:
+        """
+        从状态存储增量同步吊销记录
+        
+        Args:
+            force: 忽略同步间隔立即同步
+        """
+        now = time.monotonic()
+        if not force and now < self._next_sync:
+            return
+        self._next_sync = now + self.sync_interval
+        
+        store = get_state_store()
+        latest = int(await store.get(_sequence_key()) or 0)
+        if latest < self._last_sequence:
+            # 状态存储被清空或重建，序号重新开始
+            self._revoked_jtis.clear()
+            self._user_cutoffs.clear()
+            self._last_sequence = 0
+        
+        while self._last_sequence < latest:
+            end = min(latest, self._last_sequence + self.SYNC_BATCH_SIZE)
+            sequences = range(self._last_sequence + 1, end + 1)
+            entries = [
+                json.loads(raw) if raw is not None else None
+                for raw in await store.get_many([_entry_key(seq) for seq in sequences])
+            ]
+            # 已过期（对应令牌也已过期）的记录读取为空，确认后跳过
+            settled = self._settled(entries)
+            for entry in entries[:settled]:
+                if entry is not None:
+                    self._apply(entry)
+            self._last_sequence += settled
+            if settled == 0:
+                # 窗口起点的记录仍在写入
+                break
+        
+        self._prune()
+    
+    def is_revoked(self, payload: Dict[str, Any]) -> bool:
+        """
+        根据本地快照判断令牌是否已吊销
+        
+        Args:
+            payload: 令牌声明
+        
+        Returns:
+            是否已吊销
+        """
+        jti = payload.get("jti")
+        if jti is not None and jti in self._revoked_jtis:
+            return True
+        
+        cutoff = self._user_cutoffs.get(payload.get("sub"))
+        if cutoff is not None and payload.get("iat", 0) < cutoff["after"]:
+            return True
+        return False
+    
+    async def check(self, payload: Dict[str, Any]) -> bool:
+        """
+        同步（如已到期）后判断令牌是否已吊销
+        
+        Args:
+            payload: 令牌声明
+        
+        Returns:
+            是否已吊销
+        """
+        await self.sync()
+        return self.is_revoked(payload)
+    
+    async def revoke_token(self, payload: Dict[str, Any]) -> bool:
+        """
+        吊销单个访问令牌，记录保留到令牌过期
+        
+        Args:
+            payload: 令牌声明
+        
+        Returns:
+            是否写入了吊销记录（缺少 jti 或已过期的令牌无需吊销）
+        """
+        jti = payload.get("jti")
+        exp = payload.get("exp")
+        if jti is None or exp is None or exp <= time.time():
+            return False
+        await self._append({"type": "jti", "jti": jti, "exp": exp})
+        return True
+    
+    async def revoke_user_tokens(self, user_id: str, after: Optional[float] = None) -> None:
+        """
+        吊销用户在此之前签发的全部访问令牌
+        
+        Args:
+            user_id: 用户ID
+            after: 分界时间戳，默认为当前时间
+        """
+        after = after if after is not None else time.time()
+        await self._append({
+            "type": "user",
+            "sub": user_id,
+            "after": after,
+            # 分界点之前签发的令牌（含自定义有效期的令牌）最晚在此时过期，之后记录不再需要
+            "exp": after + max_access_token_lifetime().total_seconds(),
+        })
+
+
+# 全局令牌吊销列表
+token_revocations = TokenRevocationList(
+    sync_interval=settings.TOKEN_REVOCATION_SYNC_INTERVAL
+)
@@ -2,40 +2,72 @@
 安全相关工具模块
 包含JWT令牌处理、密码哈希等功能
 """
+import asyncio
+import hmac
+import hashlib
+import secrets
+import time
 from datetime import datetime, timedelta
-from typing import Any, Union, Optional
+from typing import Any, Dict, List, Union, Optional
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 
 from .config import settings
+from .cache import get_cache
+from .hashing import password_hasher
+from .token_cache import verified_token_cache
 
 
 # 密码上下文
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
+def max_access_token_lifetime() -> timedelta:
+    """访问令牌可能的最长有效期，即默认有效期和自定义有效期上限中的较大者"""
+    return timedelta(minutes=max(
+        settings.ACCESS_TOKEN_EXPIRE_MINUTES,
+        settings.ACCESS_TOKEN_MAX_EXPIRE_MINUTES
+    ))
+
+
 def create_access_token(
     subject: Union[str, Any], 
-    expires_delta: timedelta = None
+    expires_delta: timedelta = None,
+    claims: Optional[Dict[str, Any]] = None
 ) -> str:
     """
     创建JWT访问令牌
     
     Args:
         subject: 令牌主体（通常是用户ID）
-        expires_delta: 过期时间增量
-        
+        expires_delta: 过期时间增量，不能超过 max_access_token_lifetime()
+        claims: 附加声明（无状态认证模式下的用户身份声明）
+    
     Returns:
         JWT令牌字符串
+    
+    Raises:
+        ValueError: 有效期超过上限，按时间点吊销用户会话时无法覆盖该令牌
     """
     if expires_delta:
+        if expires_delta > max_access_token_lifetime():
+            raise ValueError("访问令牌有效期超过 ACCESS_TOKEN_MAX_EXPIRE_MINUTES")
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
     
-    to_encode = {"exp": expire, "sub": str(subject)}
+    # jti 用于单个令牌吊销，iat 用于吊销用户全部会话
+    to_encode = {
+        "exp": expire,
+        # 保留小数部分，精确区分吊销时间点前后签发的令牌
+        "iat": time.time(),
+        "sub": str(subject),
+        "jti": secrets.token_urlsafe(12),
+    }
+    if claims:
+        to_encode.update(claims)
     encoded_jwt = jwt.encode(
         to_encode, 
         settings.SECRET_KEY, 
@@ -44,28 +76,106 @@ def create_access_token(
     return encoded_jwt
 
 
-def verify_token(token: str) -> Optional[str]:
+def decode_access_token(token: str) -> Optional[Dict[str, Any]]:
     """
-    验证JWT令牌
+    解码并验证JWT令牌
+    
+    验证通过的结果会被缓存，同一令牌在过期前的重复请求直接返回缓存的声明。
     
     Args:
         token: JWT令牌
-        
+    
     Returns:
-        令牌主体或None
+        令牌声明字典，验证失败或缺少主体时返回None
     """
+    payload = verified_token_cache.get(token)
+    if payload is not None:
+        return payload
+    
     try:
         payload = jwt.decode(
             token, 
             settings.SECRET_KEY, 
             algorithms=[settings.ALGORITHM]
         )
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            return None
-        return user_id
     except JWTError:
         return None
+    
+    if payload.get("sub") is None:
+        return None
+    
+    verified_token_cache.set(token, payload)
+    return payload
+
+
+def verify_token(token: str) -> Optional[str]:
+    """
+    验证JWT令牌
+    
+    Args:
+        token: JWT令牌
+    
+    Returns:
+        令牌主体或None
+    """
+    payload = decode_access_token(token)
+    if payload is None:
+        return None
+    return payload["sub"]
+
+
+def create_security_stamp(
+    hashed_password: str,
+    is_active: bool,
+    is_superuser: bool
+) -> str:
+    """
+    计算用户安全戳
+    
+    安全戳由影响认证结果的用户字段派生，修改密码、禁用账户或变更
+    超级管理员标记后安全戳随之变化，旧令牌中的安全戳即失效。
+    
+    Args:
+        hashed_password: 哈希密码
+        is_active: 是否激活
+        is_superuser: 是否超级管理员
+    
+    Returns:
+        安全戳字符串
+    """
+    message = f"{hashed_password}|{int(bool(is_active))}|{int(bool(is_superuser))}"
+    digest = hmac.new(
+        settings.SECRET_KEY.encode(), message.encode(), hashlib.sha256
+    ).hexdigest()
+    return digest[:16]
+
+
+def _security_stamp_key(user_id: str) -> str:
+    return f"{settings.CACHE_KEY_PREFIX}:security_stamp:{user_id}"
+
+
+async def get_cached_security_stamp(user_id: str) -> Optional[str]:
+    """获取缓存中的用户安全戳"""
+    value = await get_cache().get(_security_stamp_key(user_id))
+    return value.decode() if value else None
+
+
+async def store_security_stamp(user_id: str, stamp: str) -> None:
+    """缓存用户当前安全戳"""
+    await get_cache().set(
+        _security_stamp_key(user_id),
+        stamp.encode(),
+        settings.SECURITY_STAMP_CACHE_TTL
+    )
+
+
+async def forget_security_stamp(user_id: str) -> None:
+    """
+    清除缓存中的用户安全戳
+    
+    用户安全相关字段变更后调用，后续请求将回退到数据库校验。
+    """
+    await get_cache().delete(_security_stamp_key(user_id))
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -75,7 +185,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Args:
         plain_password: 明文密码
         hashed_password: 哈希密码
-        
+    
     Returns:
         验证结果
     """
@@ -88,8 +198,68 @@ def get_password_hash(password: str) -> str:
     
     Args:
         password: 明文密码
-        
+    
     Returns:
         哈希密码
     """
     return pwd_context.hash(password)
+
+
+def _hash_passwords(passwords: List[str]) -> List[str]:
+    return [get_password_hash(password) for password in passwords]
+
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    在哈希执行器中验证密码
+    
+    排队已满时抛出 PasswordHasherBusy，登录等高频请求据此快速失败。
+    
+    Args:
+        plain_password: 明文密码
+        hashed_password: 哈希密码
+    
+    Returns:
+        验证结果
+    """
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+
+async def ahash_password(password: str) -> str:
+    """
+    在哈希执行器中计算密码哈希，排队已满时等待而不拒绝
+    
+    Args:
+        password: 明文密码
+    
+    Returns:
+        哈希密码
+    """
+    return await password_hasher.run(get_password_hash, password, shed=False)
+
+
+async def ahash_passwords(passwords: List[str]) -> List[str]:
+    """
+    批量计算密码哈希
+    
+    密码按执行器并行数分片，每片作为一个任务提交，
+    批量任务最多占用 workers 个排队位置。
+    
+    Args:
+        passwords: 明文密码列表
+    
+    Returns:
+        与输入顺序一致的哈希密码列表
+    """
+    if not passwords:
+        return []
+    
+    chunk_size = -(-len(passwords) // password_hasher.workers)
+    chunks = [
+        passwords[start:start + chunk_size]
+        for start in range(0, len(passwords), chunk_size)
+    ]
+    results = await asyncio.gather(*(
+        password_hasher.run(_hash_passwords, chunk, shed=False) for chunk in chunks
+    ))
+    return [hashed for chunk in results for hashed in chunk]
@@ -0,0 +1,112 @@
+"""
+已验证令牌缓存模块
+缓存 JWT 签名校验和解码的结果，同一令牌的重复请求无需再次解析和计算 HMAC
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .config import settings
+
+
+class VerifiedTokenCache:
+    """
+    已验证令牌 LRU 缓存
+    
+    以令牌的 SHA-256 摘要为键，缓存 (过期时间, 声明字典)，不保存令牌原文。
+    命中时仍会检查 exp，过期条目立即淘汰；SECRET_KEY 或签名算法变化时整体清空。
+    所有操作都是同步的且不包含 await，在单个事件循环内并发访问是安全的。
+    """
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, Tuple[Optional[float], Dict[str, Any]]]" = OrderedDict()
+        self._signing_key: Tuple[str, str] = (settings.SECRET_KEY, settings.ALGORITHM)
+    
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+    
+    def _check_signing_key(self) -> None:
+        signing_key = (settings.SECRET_KEY, settings.ALGORITHM)
+        if signing_key != self._signing_key:
+            # 密钥轮换后，用旧密钥验证过的令牌不再可信
+            self._entries.clear()
+            self._signing_key = signing_key
+    
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        获取已验证令牌的声明
+        
+        Args:
+            token: JWT令牌
+        
+        Returns:
+            声明字典的副本，未命中或已过期时返回None
+        """
+        if self.max_size <= 0:
+            return None
+        
+        self._check_signing_key()
+        key = self._digest(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        expires_at, claims = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(claims)
+    
+    def set(self, token: str, claims: Dict[str, Any]) -> None:
+        """
+        缓存验证通过的令牌声明
+        
+        Args:
+            token: JWT令牌
+            claims: 解码后的声明字典
+        """
+        if self.max_size <= 0:
+            return
+        
+        self._check_signing_key()
+        expires_at = claims.get("exp")
+        self._entries[self._digest(token)] = (
+            float(expires_at) if expires_at is not None else None,
+            dict(claims),
+        )
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        """清空缓存"""
+        self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+        
+        Returns:
+            命中次数、未命中次数、命中率和当前条目数
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+        }
+
+
+# 全局已验证令牌缓存
+verified_token_cache = VerifiedTokenCache(max_size=settings.TOKEN_CACHE_MAX_SIZE)
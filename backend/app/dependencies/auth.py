@@ -1,14 +1,21 @@
 """
 认证相关依赖注入
 """
-from typing import Optional
+from typing import Any, Dict, Optional, Union
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.core.security import verify_token
+from app.core.config import settings
+from app.core.rbac import get_rbac_version, sync_rbac_version
+from app.core.revocation import token_revocations
+from app.core.security import (
+    verify_token, decode_access_token, create_security_stamp,
+    get_cached_security_stamp, store_security_stamp
+)
 from app.models.user import User
+from app.models.loading import user_load
 from app.dependencies.database import get_db
 
 
@@ -16,6 +23,120 @@ from app.dependencies.database import get_db
 security = HTTPBearer()
 
 
+class TokenPrincipal:
+    """
+    令牌主体
+    
+    无状态认证模式下由令牌声明构造的轻量用户身份，
+    提供权限校验所需的 id / is_superuser / is_active 属性。
+    """
+    
+    __slots__ = ("id", "is_superuser", "is_active", "rbac_version")
+    
+    def __init__(self, id: str, is_superuser: bool, rbac_version: int):
+        self.id = id
+        self.is_superuser = is_superuser
+        self.is_active = True
+        self.rbac_version = rbac_version
+    
+    def __repr__(self):
+        return f"<TokenPrincipal(id={self.id})>"
+
+
+def build_token_claims(user: User) -> Dict[str, Any]:
+    """
+    构建无状态认证模式下的令牌声明
+    
+    Args:
+        user: 用户对象
+    
+    Returns:
+        附加声明字典，未启用无状态认证时为空
+    """
+    return build_stateless_claims(
+        bool(user.is_superuser),
+        create_security_stamp(user.hashed_password, user.is_active, user.is_superuser)
+    )
+
+
+def build_stateless_claims(is_superuser: bool, security_stamp: str) -> Dict[str, Any]:
+    """
+    由已知的用户身份字段构建令牌声明（刷新令牌续签时无需加载用户）
+    
+    Args:
+        is_superuser: 是否超级管理员
+        security_stamp: 用户安全戳
+    
+    Returns:
+        附加声明字典，未启用无状态认证时为空
+    """
+    if not settings.JWT_STATELESS_AUTH:
+        return {}
+    
+    return {
+        "su": is_superuser,
+        "ss": security_stamp,
+        "rv": get_rbac_version(),
+    }
+
+
+def _credentials_exception(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def decode_credentials(credentials: HTTPAuthorizationCredentials) -> Dict[str, Any]:
+    """
+    校验请求凭证并返回令牌声明
+    
+    Args:
+        credentials: JWT凭证
+    
+    Returns:
+        令牌声明字典
+    
+    Raises:
+        HTTPException: 令牌无效或已被吊销时抛出401错误
+    """
+    payload = decode_access_token(credentials.credentials)
+    if payload is None:
+        raise _credentials_exception("无效的认证凭证")
+    
+    if await token_revocations.check(payload):
+        raise _credentials_exception("认证凭证已失效，请重新登录")
+    # 权限缓存和令牌中的 rv 声明都以 RBAC 版本号为准，校验前同步其他进程的变更
+    await sync_rbac_version()
+    return payload
+
+
+async def _load_token_user(payload: Dict[str, Any], db: AsyncSession) -> User:
+    """根据令牌声明从数据库加载用户，并校验安全戳"""
+    # 当前用户的角色和权限由 get_user_principal 按需加载并缓存，这里不加载任何关系
+    result = await db.execute(
+        select(User)
+        .options(*user_load("lean"))
+        .where(User.id == payload["sub"], User.is_active == True)
+    )
+    user = result.scalar_one_or_none()
+    
+    if user is None:
+        raise _credentials_exception("用户不存在或已被禁用")
+    
+    # 缓存中的安全戳同时表示用户已通过数据库校验，供无状态认证和权限快速拒绝中间件使用
+    stamp = create_security_stamp(
+        user.hashed_password, user.is_active, user.is_superuser
+    )
+    await store_security_stamp(str(user.id), stamp)
+    token_stamp = payload.get("ss")
+    if token_stamp is not None and stamp != token_stamp:
+        raise _credentials_exception("认证凭证已失效，请重新登录")
+    
+    return user
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db)
@@ -26,36 +147,57 @@ async def get_current_user(
     Args:
         credentials: JWT凭证
         db: 数据库会话
-        
+    
     Returns:
         当前用户对象
-        
+    
     Raises:
         HTTPException: 认证失败时抛出401错误
     """
     # 验证令牌
-    user_id = verify_token(credentials.credentials)
-    if user_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="无效的认证凭证",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    payload = await decode_credentials(credentials)
+    return await _load_token_user(payload, db)
+
+
+async def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> Union[User, TokenPrincipal]:
+    """
+    获取当前请求主体
     
-    # 查询用户
-    result = await db.execute(
-        select(User).where(User.id == user_id, User.is_active == True)
-    )
-    user = result.scalar_one_or_none()
+    启用无状态认证、令牌安全戳与缓存一致且签发后 RBAC 版本未变化时，
+    直接由令牌声明构造主体，不查询用户表；否则回退到数据库查询。
+    适用于只需要身份和权限的路由。
     
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="用户不存在或已被禁用",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    Args:
+        credentials: JWT凭证
+        db: 数据库会话
     
-    return user
+    Returns:
+        令牌主体或用户对象
+    
+    Raises:
+        HTTPException: 认证失败时抛出401错误
+    """
+    payload = await decode_credentials(credentials)
+    
+    token_stamp = payload.get("ss")
+    rbac_version = get_rbac_version()
+    if (
+        settings.JWT_STATELESS_AUTH
+        and token_stamp is not None
+        and payload.get("rv") == rbac_version
+    ):
+        cached_stamp = await get_cached_security_stamp(payload["sub"])
+        if cached_stamp == token_stamp:
+            return TokenPrincipal(
+                id=payload["sub"],
+                is_superuser=bool(payload.get("su")),
+                rbac_version=rbac_version
+            )
+    
+    return await _load_token_user(payload, db)
 
 
 async def get_current_active_user(
@@ -66,10 +208,10 @@ async def get_current_active_user(
     
     Args:
         current_user: 当前用户
-        
+    
     Returns:
         活跃用户对象
-        
+    
     Raises:
         HTTPException: 用户未激活时抛出400错误
     """
@@ -89,10 +231,10 @@ async def get_superuser(
     
     Args:
         current_user: 当前用户
-        
+    
     Returns:
         超级管理员用户对象
-        
+    
     Raises:
         HTTPException: 非超级管理员时抛出403错误
     """
@@ -112,7 +254,7 @@ def get_optional_user(
     
     Args:
         credentials: JWT凭证（可选）
-        
+    
     Returns:
         用户ID或None
     """
@@ -0,0 +1,65 @@
+"""
+条件请求依赖注入
+"""
+from functools import partial
+from typing import Tuple, Type
+
+from fastapi import Depends, Request
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.conditional import ConditionalGet, make_etag, resource_version
+from app.dependencies.database import get_db
+from app.models.base import BaseModel
+from app.models.department import Department
+from app.models.permission import Permission
+from app.models.role import Role
+
+
+# 资源族 -> 数据戳覆盖的数据表。资源族名称同时是缓存命名空间，
+# 应用内修改通过 invalidate(资源族) 递增变更计数
+RESOURCE_FAMILIES = {
+    "permissions": (Permission,),
+    "departments": (Department,),
+    "roles": (Role,),
+}
+
+
+async def _load_stamp(db: AsyncSession, models: Tuple[Type[BaseModel], ...]) -> str:
+    """一次查询得到各数据表的行数和最大 updated_at，行数用于发现删除"""
+    columns = []
+    for model in models:
+        columns.append(select(func.count()).select_from(model).scalar_subquery())
+        columns.append(select(func.max(model.updated_at)).scalar_subquery())
+    row = (await db.execute(select(*columns))).one()
+    return ":".join(str(value) for value in row)
+
+
+def conditional_get(*families: str):
+    """
+    创建条件请求依赖
+    
+    依赖计算响应所依赖的资源族版本并生成 ETag，If-None-Match 匹配时抛出
+    NotModified，由全局异常处理器返回304，路由函数和数据查询都不会执行。
+    应声明在权限依赖之后，保证无权限的请求不会得到304。
+    
+    Args:
+        families: 响应所依赖的资源族，见 RESOURCE_FAMILIES
+    
+    Returns:
+        依赖函数，返回 ConditionalGet，路由通过其 apply 为完整响应附加响应头
+    """
+    for family in families:
+        if family not in RESOURCE_FAMILIES:
+            raise ValueError(f"未知的资源族: {family}")
+    
+    async def dependency(request: Request, db: AsyncSession = Depends(get_db)) -> ConditionalGet:
+        versions = [
+            await resource_version(family, partial(_load_stamp, db, RESOURCE_FAMILIES[family]))
+            for family in families
+        ]
+        conditional = ConditionalGet(make_etag(request, *versions))
+        conditional.check(request)
+        return conditional
+    
+    return dependency
@@ -1,17 +1,24 @@
 """
 权限验证依赖注入
 """
-from typing import List, Set
+import re
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
 from functools import wraps
 from fastapi import Depends, HTTPException, status
+from fastapi.routing import APIRoute
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, literal, union_all
+from sqlalchemy.orm import aliased
 
+from app.core.rbac import (
+    PermissionIndex, get_rbac_version, permission_cache, permission_registry, role_cache,
+    role_mask_table
+)
 from app.models.user import User
 from app.models.role import Role
 from app.models.permission import Permission
-from app.dependencies.auth import get_current_active_user
+from app.models.associations import user_role_table, role_permission_table
+from app.dependencies.auth import get_current_principal
 from app.dependencies.database import get_db
 
 
@@ -22,6 +29,8 @@ async def get_user_permissions(
     """
     获取用户的所有权限
     
+    结果按用户ID缓存，RBAC版本号变化后自动失效。
+    
     Args:
         user: 用户对象
         db: 数据库会话
@@ -29,32 +38,142 @@ async def get_user_permissions(
     Returns:
         用户权限代码集合
     """
-    # 如果是超级管理员，拥有所有权限
-    if user.is_superuser:
-        result = await db.execute(
-            select(Permission.code).where(Permission.is_active == True)
-        )
-        return set(result.scalars().all())
+    return set(permission_registry.codes(await get_user_permission_mask(user, db)))
+
+
+async def get_user_permission_mask(
+    user: User,
+    db: AsyncSession
+) -> int:
+    """
+    获取用户的有效权限位掩码
+    
+    Args:
+        user: 用户对象
+        db: 数据库会话
+        
+    Returns:
+        权限位掩码
+    """
+    cached = permission_cache.get(str(user.id))
+    if cached is not None:
+        return cached
+    
+    _, mask = await _get_user_roles_and_mask(user, db)
+    return mask
+
+
+async def get_user_principal(
+    user: User,
+    db: AsyncSession
+) -> Tuple[List[str], Set[str]]:
+    """
+    获取用户的角色代码和权限代码
     
-    # 查询用户的角色和权限
+    供登录、/auth/me 使用，与权限校验共用角色缓存和权限缓存。
+    
+    Args:
+        user: 用户对象
+        db: 数据库会话
+        
+    Returns:
+        (角色代码列表, 权限代码集合)
+    """
+    roles, mask = await _get_user_roles_and_mask(user, db)
+    return sorted(roles), set(permission_registry.codes(mask))
+
+
+async def _get_user_roles_and_mask(
+    user: User,
+    db: AsyncSession
+) -> Tuple[FrozenSet[str], int]:
+    """
+    获取用户的角色代码集合和权限位掩码，未命中时加载并写入缓存
+    
+    有效权限为各角色掩码的按位或，超级管理员为全部有效权限的掩码。
+    """
+    user_id = str(user.id)
+    roles = role_cache.get(user_id)
+    mask = permission_cache.get(user_id)
+    if roles is None or mask is None:
+        # 加载期间版本号可能变化，缓存条目按加载前的版本号写入
+        version = get_rbac_version()
+        if roles is None:
+            roles = await _load_user_roles(user, db)
+            role_cache.set(user_id, roles, version)
+        
+        role_masks, all_mask = await _load_role_masks(db)
+        if user.is_superuser:
+            mask = all_mask
+        else:
+            mask = 0
+            for role_code in roles:
+                mask |= role_masks.get(role_code, 0)
+        permission_cache.set(user_id, mask, version)
+    
+    return roles, mask
+
+
+async def _load_user_roles(user: User, db: AsyncSession) -> FrozenSet[str]:
+    """从数据库加载用户的有效角色代码"""
     result = await db.execute(
-        select(User)
-        .options(
-            selectinload(User.roles).selectinload(Role.permissions)
+        select(Role.code)
+        .select_from(user_role_table)
+        .join(Role, Role.id == user_role_table.c.role_id)
+        .where(user_role_table.c.user_id == user.id, Role.is_active == True)
+    )
+    return frozenset(result.scalars().all())
+
+
+async def _load_role_masks(db: AsyncSession) -> Tuple[Dict[str, int], int]:
+    """
+    获取所有有效角色的权限位掩码
+    
+    未命中时通过一次查询加载全部有效角色的授权以及全部有效权限（含父权限代码），
+    编译权限展开索引后展开通配符和父权限授权。结果全局共享，RBAC版本号变化后失效。
+    """
+    cached = role_mask_table.get()
+    if cached is not None:
+        return cached
+    
+    version = get_rbac_version()
+    # 有效角色 -> 有效权限；另附全部有效权限及其父权限（角色列为空），用于编译展开索引
+    parent = aliased(Permission)
+    query = union_all(
+        select(
+            Role.code.label("role_code"),
+            Permission.code.label("permission_code"),
+            literal(None).label("parent_code")
         )
-        .where(User.id == user.id)
+        .select_from(role_permission_table)
+        .join(Role, Role.id == role_permission_table.c.role_id)
+        .join(Permission, Permission.id == role_permission_table.c.permission_id)
+        .where(Role.is_active == True, Permission.is_active == True),
+        select(
+            literal(None).label("role_code"),
+            Permission.code.label("permission_code"),
+            parent.code.label("parent_code")
+        )
+        .outerjoin(parent, parent.id == Permission.parent_id)
+        .where(Permission.is_active == True)
     )
-    user_with_roles = result.scalar_one()
     
-    # 收集所有权限代码
-    permissions = set()
-    for role in user_with_roles.roles:
-        if role.is_active:
-            for permission in role.permissions:
-                if permission.is_active:
-                    permissions.add(permission.code)
+    result = await db.execute(query)
+    grants: List[Tuple[str, str]] = []
+    permissions: List[Tuple[str, Optional[str]]] = []
+    for role_code, permission_code, parent_code in result.all():
+        if role_code is None:
+            permissions.append((permission_code, parent_code))
+        else:
+            grants.append((role_code, permission_code))
+    
+    index = PermissionIndex(permission_registry, permissions)
+    role_masks: Dict[str, int] = {}
+    for role_code, permission_code in grants:
+        role_masks[role_code] = role_masks.get(role_code, 0) | index.expand(permission_code)
     
-    return permissions
+    role_mask_table.set(role_masks, index.all_mask, version)
+    return role_masks, index.all_mask
 
 
 def require_permissions(*permission_codes: str):
@@ -67,6 +186,8 @@ def require_permissions(*permission_codes: str):
     Returns:
         装饰器函数
     """
+    required_mask = permission_registry.mask(permission_codes)
+    
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
@@ -80,13 +201,12 @@ def require_permissions(*permission_codes: str):
                     detail="权限验证配置错误"
                 )
             
-            # 获取用户权限
-            user_permissions = await get_user_permissions(user, db)
+            # 获取用户权限位掩码
+            user_mask = await get_user_permission_mask(user, db)
             
             # 检查权限
-            required_permissions = set(permission_codes)
-            if not required_permissions.issubset(user_permissions):
-                missing_permissions = required_permissions - user_permissions
+            if (user_mask & required_mask) != required_mask:
+                missing_permissions = permission_registry.codes(required_mask & ~user_mask)
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail=f"权限不足，缺少权限: {', '.join(missing_permissions)}"
@@ -98,14 +218,20 @@ def require_permissions(*permission_codes: str):
 
 
 class PermissionChecker:
-    """权限检查器"""
+    """
+    权限检查器
+    
+    所需权限在创建时（即路由模块导入时）编译为位掩码，
+    每次请求只需一次按位与运算。
+    """
     
     def __init__(self, permission_codes: List[str]):
         self.permission_codes = set(permission_codes)
+        self.required_mask = permission_registry.mask(permission_codes)
     
     async def __call__(
         self,
-        user: User = Depends(get_current_active_user),
+        user: User = Depends(get_current_principal),
         db: AsyncSession = Depends(get_db)
     ) -> User:
         """
@@ -116,17 +242,17 @@ class PermissionChecker:
             db: 数据库会话
             
         Returns:
-            验证通过的用户对象
+            验证通过的用户对象（无状态认证模式下为令牌主体）
             
         Raises:
             HTTPException: 权限不足时抛出403错误
         """
-        # 获取用户权限
-        user_permissions = await get_user_permissions(user, db)
+        # 获取用户权限位掩码
+        user_mask = await get_user_permission_mask(user, db)
         
         # 检查权限
-        if not self.permission_codes.issubset(user_permissions):
-            missing_permissions = self.permission_codes - user_permissions
+        if (user_mask & self.required_mask) != self.required_mask:
+            missing_permissions = permission_registry.codes(self.required_mask & ~user_mask)
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"权限不足，缺少权限: {', '.join(missing_permissions)}"
@@ -146,3 +272,94 @@ def has_permission(*permission_codes: str):
         权限检查器实例
     """
     return PermissionChecker(list(permission_codes))
+
+
+class RouteManifest:
+    """
+    路由权限清单
+    
+    启动时遍历应用路由，收集每个路由依赖树中所有 PermissionChecker 的位掩码，
+    编译为 请求方法 -> [(路径正则, 所需掩码, 路由)] 的查找表，供ASGI中间件在
+    依赖解析之前判断权限，并通过接口对外展示。
+    
+    查找表保留路由注册顺序并包含无需权限的路由，匹配规则与路由器一致：
+    取第一个路径和方法都匹配的路由。
+    """
+    
+    def __init__(self):
+        self.compiled = False
+        self._table: Dict[str, List[Tuple[re.Pattern, int, Any]]] = {}
+    
+    @staticmethod
+    def _collect_mask(dependant) -> int:
+        mask = 0
+        for dependency in dependant.dependencies:
+            if isinstance(dependency.call, PermissionChecker):
+                mask |= dependency.call.required_mask
+            mask |= RouteManifest._collect_mask(dependency)
+        return mask
+    
+    def compile(self, routes: Iterable[Any]) -> None:
+        """
+        编译路由权限查找表
+        
+        Args:
+            routes: 应用路由列表
+        """
+        table: Dict[str, List[Tuple[re.Pattern, int, Any]]] = {}
+        for route in routes:
+            methods = getattr(route, "methods", None)
+            path_regex = getattr(route, "path_regex", None)
+            if not methods or path_regex is None:
+                continue
+            mask = self._collect_mask(route.dependant) if isinstance(route, APIRoute) else 0
+            for method in methods:
+                table.setdefault(method, []).append((path_regex, mask, route))
+        
+        self._table = table
+        self.compiled = True
+    
+    def required_mask(self, method: str, path: str) -> int:
+        """
+        查找请求对应路由所需的权限掩码
+        
+        Args:
+            method: 请求方法
+            path: 请求路径
+        
+        Returns:
+            所需权限掩码，未匹配或无需权限时为0
+        """
+        for path_regex, mask, _ in self._table.get(method, ()):
+            if path_regex.match(path):
+                return mask
+        return 0
+    
+    def entries(self) -> List[Dict[str, Any]]:
+        """
+        获取需要权限的路由清单
+        
+        Returns:
+            路由清单，每项包含路径、方法、名称和所需权限代码
+        """
+        entries: Dict[int, Dict[str, Any]] = {}
+        for method, routes in self._table.items():
+            for _, mask, route in routes:
+                if not mask:
+                    continue
+                entry = entries.setdefault(id(route), {
+                    "path": route.path,
+                    "methods": [],
+                    "name": route.name,
+                    "permissions": permission_registry.codes(mask),
+                })
+                entry["methods"].append(method)
+        
+        result = sorted(entries.values(), key=lambda entry: entry["path"])
+        for entry in result:
+            entry["methods"].sort()
+        return result
+
+
+# 全局路由权限清单
+route_manifest = RouteManifest()
@@ -0,0 +1,91 @@
+"""
+权限快速拒绝中间件
+在路由依赖解析和请求体解析之前，根据路由权限清单和已缓存的用户权限掩码拒绝无权限请求
+"""
+from typing import Optional
+
+from app.core.config import settings
+from app.core.rbac import permission_cache, permission_registry, sync_rbac_version
+from app.core.responses import FastJSONResponse
+from app.core.revocation import token_revocations
+from app.core.security import decode_access_token, get_cached_security_stamp
+from app.dependencies.permissions import route_manifest
+from app.schemas.common import ApiResponse
+
+
+class PermissionFastPathMiddleware:
+    """
+    权限快速拒绝中间件（纯ASGI实现）
+    
+    只做拒绝，不做放行：仅当令牌有效、未被吊销、用户仍然有效且权限掩码已在缓存中，
+    并且掩码不满足路由要求时直接返回403。其余情况（无令牌、令牌无效、
+    缓存未命中、无法确认用户状态）交给路由按原流程处理并填充缓存，
+    因此中间件不会改变任何请求的最终结果，只是让被拒绝的请求少走依赖注入、
+    请求体解析和数据库会话创建。
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.PERMISSION_FAST_PATH_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        
+        if not route_manifest.compiled:
+            route_manifest.compile(scope["app"].routes)
+        
+        required_mask = route_manifest.required_mask(scope["method"], scope["path"])
+        if required_mask:
+            user_mask = await self._cached_user_mask(scope)
+            if user_mask is not None and (user_mask & required_mask) != required_mask:
+                missing_permissions = permission_registry.codes(required_mask & ~user_mask)
+                await self._reject(scope, receive, send, f"权限不足，缺少权限: {', '.join(missing_permissions)}")
+                return
+        
+        await self.app(scope, receive, send)
+    
+    @staticmethod
+    async def _cached_user_mask(scope) -> Optional[int]:
+        """解析Bearer令牌，确认主体有效后返回已缓存的用户权限掩码，无法确定时返回None"""
+        authorization = None
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                authorization = value.decode("latin-1")
+                break
+        if authorization is None:
+            return None
+        
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None
+        
+        payload = decode_access_token(token)
+        if payload is None or await token_revocations.check(payload):
+            return None
+        await sync_rbac_version()
+        user_id = str(payload["sub"])
+        user_mask = permission_cache.get(user_id)
+        if user_mask is None:
+            return None
+        
+        # 被禁用或已修改密码的用户应由路由返回401而不是403。安全戳只在用户通过
+        # 数据库校验后写入缓存，并在用户信息变更时清除，缓存中存在且与令牌一致即说明主体有效
+        stamp = await get_cached_security_stamp(user_id)
+        if stamp is None or payload.get("ss", stamp) != stamp:
+            return None
+        return user_mask
+    
+    @staticmethod
+    async def _reject(scope, receive, send, detail: str) -> None:
+        """返回与HTTP异常处理器一致的权限不足响应"""
+        response = FastJSONResponse(
+            status_code=200,  # 与全局异常处理器一致，统一返回200状态码
+            content=ApiResponse(
+                success=False,
+                data=None,
+                error=detail,
+                code="403"
+            )
+        )
+        await response(scope, receive, send)
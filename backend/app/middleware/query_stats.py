@@ -0,0 +1,55 @@
+"""
+请求级SQL统计中间件
+统计每个请求执行的查询次数和耗时，调试模式下写入响应头，并记录重复语句告警
+"""
+from loguru import logger
+
+from app.core.config import settings
+from app.core.query_stats import collect_queries
+
+
+class QueryStatsMiddleware:
+    """
+    请求级SQL统计中间件（纯ASGI实现）
+    
+    响应头在响应开始时写入，只包含此前执行的查询；流式响应在响应体阶段执行的查询
+    以及请求结束后的完整统计记录在日志中。同一语句形态在一个请求内重复达到
+    SQL_REPEATED_QUERY_THRESHOLD 次时记录疑似N+1告警。
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.SQL_INSTRUMENTATION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        
+        with collect_queries() as stats:
+            async def send_with_stats(message):
+                if message["type"] == "http.response.start" and settings.DEBUG:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-query-count", str(stats.count).encode()))
+                    headers.append((b"x-db-query-time", f"{stats.total_time * 1000:.2f}".encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+            
+            try:
+                await self.app(scope, receive, send_with_stats)
+            finally:
+                self._log(scope, stats)
+    
+    @staticmethod
+    def _log(scope, stats) -> None:
+        """记录请求的查询统计"""
+        if not stats.count:
+            return
+        
+        endpoint = scope.get("endpoint")
+        name = getattr(endpoint, "__name__", None) or scope["path"]
+        logger.debug(
+            f"{scope['method']} {scope['path']} ({name}): "
+            f"{stats.count} 次查询, {stats.total_time * 1000:.2f} ms"
+        )
+        for shape, count in stats.repeated(settings.SQL_REPEATED_QUERY_THRESHOLD):
+            logger.warning(f"疑似N+1查询: {scope['method']} {name} 重复执行 {count} 次: {shape[:300]}")
@@ -2,7 +2,7 @@
 关联表模型
 定义多对多关系的关联表
 """
-from sqlalchemy import Table, Column, ForeignKey, DateTime, String
+from sqlalchemy import Table, Column, ForeignKey, DateTime, String, Integer, Index
 from sqlalchemy.sql import func
 
 from app.core.database import Base
@@ -25,3 +25,13 @@ role_permission_table = Table(
     Column('permission_id', String(36), ForeignKey('permissions.id'), primary_key=True),
     Column('created_at', DateTime(timezone=True), server_default=func.now()),
 )
+
+# 部门闭包表，记录每个部门与其所有祖先（含自身，depth=0）的关系
+department_closure_table = Table(
+    'department_closure',
+    Base.metadata,
+    Column('ancestor_id', String(36), ForeignKey('departments.id'), primary_key=True),
+    Column('descendant_id', String(36), ForeignKey('departments.id'), primary_key=True),
+    Column('depth', Integer, nullable=False, default=0),
+    Index('ix_department_closure_descendant_id', 'descendant_id'),
+)
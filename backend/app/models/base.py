@@ -7,9 +7,29 @@ from datetime import datetime
 from sqlalchemy import Column, String, DateTime, Boolean
 from sqlalchemy.sql import func
 
+from app.core.config import settings
 from app.core.database import Base
 
 
+def default_lazy(development_lazy: str) -> str:
+    """
+    获取关系属性的默认加载策略
+    
+    严格加载模式下返回 raise_on_sql，未在查询中通过加载方案显式加载的关系一经访问即抛错，
+    避免默认的 selectin 在每次加载实体时级联查询；非严格模式保留开发时的默认策略。
+    
+    Args:
+        development_lazy: 非严格模式下的加载策略
+    
+    Returns:
+        relationship 的 lazy 参数
+    """
+    strict = settings.ORM_STRICT_LOADING
+    if strict is None:
+        strict = not settings.DEBUG
+    return "raise_on_sql" if strict else development_lazy
+
+
 class BaseModel(Base):
     """基础模型类"""
     __abstract__ = True
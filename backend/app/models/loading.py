@@ -0,0 +1,91 @@
+"""
+实体加载方案
+为常用查询提供显式的关系加载选项，每个方案都为所有关系指定加载方式，
+不依赖模型上的默认 lazy 策略
+"""
+from typing import Dict, Tuple
+
+from sqlalchemy.orm import raiseload, selectinload
+from sqlalchemy.orm.interfaces import LoaderOption
+
+# 构造加载选项会触发映射配置，需要先导入关系涉及的全部模型
+from .permission import Permission  # noqa: F401
+from .department import Department  # noqa: F401
+from .position import Position  # noqa: F401
+from .user import User
+from .role import Role
+
+
+# 用户加载方案
+# - lean：只加载用户列，用于身份校验、存在性检查和按ID更新
+# - with_roles：附带角色（不含角色权限），用于用户列表和详情
+# - with_org：附带部门和岗位，用于个人信息
+# - full：附带角色、部门和岗位
+USER_LOAD_PROFILES: Dict[str, Tuple[LoaderOption, ...]] = {
+    "lean": (
+        raiseload(User.roles, sql_only=True),
+        raiseload(User.department, sql_only=True),
+        raiseload(User.position, sql_only=True),
+    ),
+    "with_roles": (
+        selectinload(User.roles).raiseload(Role.permissions, sql_only=True),
+        raiseload(User.department, sql_only=True),
+        raiseload(User.position, sql_only=True),
+    ),
+    "with_org": (
+        raiseload(User.roles, sql_only=True),
+        selectinload(User.department),
+        selectinload(User.position),
+    ),
+    "full": (
+        selectinload(User.roles).raiseload(Role.permissions, sql_only=True),
+        selectinload(User.department),
+        selectinload(User.position),
+    ),
+}
+
+# 角色加载方案
+# - lean：只加载角色列
+# - with_permissions：附带角色权限
+ROLE_LOAD_PROFILES: Dict[str, Tuple[LoaderOption, ...]] = {
+    "lean": (
+        raiseload(Role.permissions, sql_only=True),
+        raiseload(Role.users, sql_only=True),
+    ),
+    "with_permissions": (
+        selectinload(Role.permissions),
+        raiseload(Role.users, sql_only=True),
+    ),
+}
+
+
+def user_load(profile: str = "lean") -> Tuple[LoaderOption, ...]:
+    """
+    获取用户加载方案的查询选项
+    
+    Args:
+        profile: 方案名称（lean / with_roles / with_org / full）
+    
+    Returns:
+        可直接传给 select(User).options(...) 的加载选项
+    """
+    try:
+        return USER_LOAD_PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"未知的用户加载方案: {profile}")
+
+
+def role_load(profile: str = "lean") -> Tuple[LoaderOption, ...]:
+    """
+    获取角色加载方案的查询选项
+    
+    Args:
+        profile: 方案名称（lean / with_permissions）
+    
+    Returns:
+        可直接传给 select(Role).options(...) 的加载选项
+    """
+    try:
+        return ROLE_LOAD_PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"未知的角色加载方案: {profile}")
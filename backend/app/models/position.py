@@ -1,7 +1,7 @@
 """
 岗位模型
 """
-from sqlalchemy import Column, String, Text, Integer, ForeignKey
+from sqlalchemy import Column, String, Text, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from .base import BaseModel
@@ -10,6 +10,10 @@ from .base import BaseModel
 class Position(BaseModel):
     """岗位模型"""
     __tablename__ = "positions"
+    __table_args__ = (
+        # 游标分页排序键
+        Index("ix_positions_created_at_id", "created_at", "id"),
+    )
     
     name = Column(String(100), nullable=False)
     code = Column(String(50), unique=True, nullable=False, index=True)
@@ -1,16 +1,20 @@
 """
 角色模型
 """
-from sqlalchemy import Column, String, Text
+from sqlalchemy import Column, String, Text, Index
 from sqlalchemy.orm import relationship
 
-from .base import BaseModel
+from .base import BaseModel, default_lazy
 from .associations import user_role_table, role_permission_table
 
 
 class Role(BaseModel):
     """角色模型"""
     __tablename__ = "roles"
+    __table_args__ = (
+        # 游标分页排序键
+        Index("ix_roles_created_at_id", "created_at", "id"),
+    )
     
     name = Column(String(50), nullable=False, index=True)
     code = Column(String(50), unique=True, nullable=False, index=True)
@@ -26,7 +30,7 @@ class Role(BaseModel):
         "Permission", 
         secondary=role_permission_table, 
         back_populates="roles",
-        lazy="selectin"
+        lazy=default_lazy("selectin")
     )
     
     def __repr__(self):
@@ -1,16 +1,20 @@
 """
 用户模型
 """
-from sqlalchemy import Column, String, Boolean, ForeignKey
+from sqlalchemy import Column, String, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
-from .base import BaseModel
+from .base import BaseModel, default_lazy
 from .associations import user_role_table
 
 
 class User(BaseModel):
     """用户模型"""
     __tablename__ = "users"
+    __table_args__ = (
+        # 游标分页排序键
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
     
     email = Column(String(255), unique=True, index=True, nullable=False)
     username = Column(String(50), unique=True, index=True, nullable=False)
@@ -30,7 +34,7 @@ class User(BaseModel):
         "Role", 
         secondary=user_role_table, 
         back_populates="users",
-        lazy="selectin"
+        lazy=default_lazy("selectin")
     )
     
     def __repr__(self):
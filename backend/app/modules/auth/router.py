@@ -1,20 +1,30 @@
 """
 认证路由模块
 """
-from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.security import create_access_token
+from app.core.refresh_tokens import RefreshTokenError, revoke_refresh_token
+from app.core.ratelimit import login_limiter, get_client_ip
 from app.dependencies.database import get_db
-from app.dependencies.auth import get_current_active_user
-from app.dependencies.permissions import get_user_permissions
+from app.core.revocation import token_revocations
+from app.dependencies.auth import (
+    get_current_active_user, get_current_principal, get_superuser,
+    decode_credentials, security
+)
+from app.dependencies.permissions import get_user_principal
 from app.schemas.user import UserLogin, UserRegister, UserResponse
 from app.schemas.common import ApiResponse
 from app.models.user import User
 from .service import AuthService
-from .schemas import LoginResponse, CurrentUserResponse
+from .schemas import (
+    LoginResponse, CurrentUserResponse,
+    TokenRefreshRequest, TokenRefreshResponse, LogoutRequest,
+    PermissionCheckRequest, PermissionCheckResponse
+)
 
 
 router = APIRouter(prefix="/auth", tags=["认证"])
@@ -28,43 +38,80 @@ router = APIRouter(prefix="/auth", tags=["认证"])
 )
 async def login(
     user_credentials: UserLogin,
+    request: Request,
     db: AsyncSession = Depends(get_db)
 ):
     """用户登录接口"""
     
+    # 失败次数过多时直接拒绝，不查询数据库也不校验密码
+    client_ip = get_client_ip(request)
+    await login_limiter.acquire(user_credentials.username, client_ip)
+    
     # 验证用户凭证
     user = await AuthService.authenticate_user(
         db, user_credentials.username, user_credentials.password
     )
     
     if not user:
+        await login_limiter.record_failure(user_credentials.username, client_ip)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户名或密码错误"
         )
     
-    # 创建访问令牌
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        subject=str(user.id),
-        expires_delta=access_token_expires
-    )
+    await login_limiter.record_success(user_credentials.username, client_ip)
+    
+    # 创建访问令牌和刷新令牌
+    access_token, refresh_token = await AuthService.issue_tokens(user)
     
-    # 获取用户权限和角色
-    permissions = list(await get_user_permissions(user, db))
+    # 获取用户权限（与 /auth/me 共用角色和权限缓存）
+    _, permissions = await get_user_principal(user, db)
     
     # 构建响应数据
     login_data = LoginResponse(
         access_token=access_token,
         token_type="bearer",
         expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        refresh_token=refresh_token,
         user=UserResponse.from_orm(user),
-        permissions=permissions
+        permissions=sorted(permissions)
     )
     
     return ApiResponse(success=True, data=login_data)
 
 
+@router.post(
+    "/refresh",
+    response_model=ApiResponse[TokenRefreshResponse],
+    summary="刷新令牌",
+    description="使用刷新令牌换取新的访问令牌，刷新令牌同时轮换"
+)
+async def refresh(
+    refresh_data: TokenRefreshRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """刷新令牌接口"""
+    try:
+        access_token, refresh_token = await AuthService.refresh_tokens(
+            db, refresh_data.refresh_token
+        )
+    except RefreshTokenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=e.detail
+        )
+    
+    return ApiResponse(
+        success=True,
+        data=TokenRefreshResponse(
+            access_token=access_token,
+            token_type="bearer",
+            expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+            refresh_token=refresh_token
+        )
+    )
+
+
 @router.post(
     "/register",
     response_model=ApiResponse[UserResponse],
@@ -117,33 +164,68 @@ async def get_current_user_info(
 ):
     """获取当前用户信息接口"""
     
-    # 获取用户权限和角色
-    permissions = list(await get_user_permissions(current_user, db))
-    roles = await AuthService.get_user_roles(db, current_user)
+    # 获取用户权限和角色（缓存未命中时一次查询加载）
+    roles, permissions = await get_user_principal(current_user, db)
     
     # 构建响应数据
     user_info = CurrentUserResponse(
         user=UserResponse.from_orm(current_user),
-        permissions=permissions,
+        permissions=sorted(permissions),
         roles=roles
     )
     
     return ApiResponse(success=True, data=user_info)
 
 
+@router.post(
+    "/permissions/check",
+    response_model=ApiResponse[PermissionCheckResponse],
+    summary="批量检查权限",
+    description="批量检查当前用户是否拥有指定权限，结果以位图返回；版本号未变化时只返回unchanged"
+)
+async def check_permissions(
+    check_data: PermissionCheckRequest,
+    current_user: User = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """批量检查权限接口"""
+    result = await AuthService.check_permissions(
+        db, current_user, check_data.codes, check_data.version
+    )
+    return ApiResponse(success=True, data=result)
+
+
+@router.get(
+    "/login-throttle",
+    response_model=ApiResponse[dict],
+    summary="登录限流统计",
+    description="获取当前进程的登录限流统计数据（仅超级管理员）"
+)
+async def get_login_throttle_metrics(
+    current_user: User = Depends(get_superuser)
+):
+    """登录限流统计接口"""
+    return ApiResponse(success=True, data=login_limiter.metrics())
+
+
 @router.post(
     "/logout",
     response_model=ApiResponse[dict],
     summary="用户登出",
-    description="用户登出（客户端需要清除令牌）"
+    description="用户登出，吊销当前访问令牌和刷新令牌"
 )
 async def logout(
+    logout_data: Optional[LogoutRequest] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
     current_user: User = Depends(get_current_active_user)
 ):
     """用户登出接口"""
     
-    # 由于使用JWT，服务端无状态，实际登出由客户端处理
-    # 这里只是提供一个标准的登出端点
+    # 吊销当前访问令牌和刷新令牌
+    await token_revocations.revoke_token(await decode_credentials(credentials))
+    if logout_data and logout_data.refresh_token:
+        await revoke_refresh_token(logout_data.refresh_token, str(current_user.id))
+    
     return ApiResponse(
         success=True,
         data={"message": "登出成功"}
@@ -1,7 +1,7 @@
 """
 认证模块专用响应模式
 """
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 from app.schemas.user import UserResponse
@@ -12,6 +12,7 @@ class LoginResponse(BaseModel):
     access_token: str = Field(description="访问令牌")
     token_type: str = Field(default="bearer", description="令牌类型")
     expires_in: int = Field(description="过期时间（秒）")
+    refresh_token: str = Field(description="刷新令牌")
     user: UserResponse = Field(description="用户信息")
     permissions: List[str] = Field(description="用户权限列表")
 
@@ -21,3 +22,42 @@ class CurrentUserResponse(BaseModel):
     user: UserResponse = Field(description="用户信息")
     permissions: List[str] = Field(description="用户权限列表")
     roles: List[str] = Field(description="用户角色列表")
+
+
+class TokenRefreshRequest(BaseModel):
+    """刷新令牌请求模式"""
+    refresh_token: str = Field(description="刷新令牌")
+
+
+class TokenRefreshResponse(BaseModel):
+    """刷新令牌响应模式"""
+    access_token: str = Field(description="访问令牌")
+    token_type: str = Field(default="bearer", description="令牌类型")
+    expires_in: int = Field(description="过期时间（秒）")
+    refresh_token: str = Field(description="新的刷新令牌，旧令牌随即失效")
+
+
+class LogoutRequest(BaseModel):
+    """登出请求模式"""
+    refresh_token: Optional[str] = Field(default=None, description="需要吊销的刷新令牌")
+
+
+class PermissionCheckRequest(BaseModel):
+    """批量权限检查请求模式"""
+    codes: List[str] = Field(
+        default_factory=list,
+        max_length=1024,
+        description="需要检查的权限代码，为空时返回全部权限"
+    )
+    version: Optional[str] = Field(default=None, description="客户端已持有结果的版本号")
+
+
+class PermissionCheckResponse(BaseModel):
+    """批量权限检查响应模式"""
+    version: str = Field(description="结果版本号，权限集合或检查的代码变化时改变")
+    unchanged: bool = Field(default=False, description="版本号与请求一致，客户端可继续使用已有结果")
+    bitmap: Optional[str] = Field(
+        default=None,
+        description="Base64编码的位图，第i位对应codes[i]，每个字节低位在前"
+    )
+    permissions: Optional[List[str]] = Field(default=None, description="未指定codes时返回全部权限代码")
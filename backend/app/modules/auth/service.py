@@ -1,16 +1,29 @@
 """
 认证服务模块
 """
-from typing import Optional, List
+import base64
+import hashlib
+from datetime import timedelta
+from typing import Optional, List, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, or_
-from sqlalchemy.orm import selectinload
 
 from app.models.user import User
 from app.models.role import Role
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.models.loading import user_load
+from app.core.config import settings
+from app.core.security import (
+    averify_password, ahash_password, create_access_token, create_security_stamp,
+    get_cached_security_stamp, store_security_stamp
+)
+from app.core.refresh_tokens import (
+    RefreshTokenError, issue_refresh_token, rotate_refresh_token, revoke_refresh_token
+)
+from app.core.rbac import permission_registry, sync_rbac_version
 from app.schemas.user import UserCreate, UserRegister
-from app.dependencies.permissions import get_user_permissions
+from app.dependencies.permissions import get_user_principal, get_user_permission_mask
+from app.dependencies.auth import build_token_claims, build_stateless_claims
+from .schemas import PermissionCheckResponse
 
 
 class AuthService:
@@ -34,8 +47,11 @@ class AuthService:
             认证成功的用户对象或None
         """
         # 查询用户（支持用户名或邮箱登录）
+        # 角色由 get_user_principal 统一加载，这里不加载任何关系
         result = await db.execute(
-            select(User).where(
+            select(User)
+            .options(*user_load("lean"))
+            .where(
                 or_(User.username == username, User.email == username),
                 User.is_active == True
             )
@@ -45,12 +61,91 @@ class AuthService:
         if not user:
             return None
         
-        # 验证密码
-        if not verify_password(password, user.hashed_password):
+        # 验证密码（在哈希执行器中计算，不阻塞事件循环）
+        if not await averify_password(password, user.hashed_password):
             return None
         
         return user
     
+    @staticmethod
+    def _create_access_token(user_id: str, claims: dict) -> str:
+        return create_access_token(
+            subject=user_id,
+            expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+            claims=claims
+        )
+    
+    @staticmethod
+    async def issue_tokens(user: User) -> Tuple[str, str]:
+        """
+        登录成功后签发访问令牌和刷新令牌
+        
+        Args:
+            user: 认证通过的用户对象
+            
+        Returns:
+            (访问令牌, 刷新令牌)
+        """
+        user_id = str(user.id)
+        stamp = create_security_stamp(
+            user.hashed_password, user.is_active, user.is_superuser
+        )
+        await store_security_stamp(user_id, stamp)
+        
+        # 令牌中的 rv 声明取当前 RBAC 版本号
+        await sync_rbac_version()
+        access_token = AuthService._create_access_token(user_id, build_token_claims(user))
+        refresh_token = await issue_refresh_token(user_id, stamp, bool(user.is_superuser))
+        return access_token, refresh_token
+    
+    @staticmethod
+    async def refresh_tokens(
+        db: AsyncSession,
+        refresh_token: str
+    ) -> Tuple[str, str]:
+        """
+        使用刷新令牌续签
+        
+        只做 HMAC 校验和缓存读写，不校验密码；安全戳缓存未命中时
+        才查询一次用户表。修改密码、禁用账户等操作使安全戳变化后，
+        令牌族随之失效。
+        
+        Args:
+            db: 数据库会话
+            refresh_token: 当前刷新令牌
+            
+        Returns:
+            (新访问令牌, 新刷新令牌)
+            
+        Raises:
+            RefreshTokenError: 刷新令牌无效、已过期、被重复使用或用户状态已变化
+        """
+        new_refresh_token, state = await rotate_refresh_token(refresh_token)
+        user_id = state["sub"]
+        
+        stamp = await get_cached_security_stamp(user_id)
+        if stamp != state["ss"]:
+            result = await db.execute(
+                select(User)
+                .options(*user_load("lean"))
+                .where(User.id == user_id, User.is_active == True)
+            )
+            user = result.scalar_one_or_none()
+            stamp = create_security_stamp(
+                user.hashed_password, user.is_active, user.is_superuser
+            ) if user else None
+            if stamp is not None:
+                await store_security_stamp(user_id, stamp)
+            if stamp != state["ss"]:
+                await revoke_refresh_token(new_refresh_token)
+                raise RefreshTokenError("认证凭证已失效，请重新登录")
+        
+        await sync_rbac_version()
+        access_token = AuthService._create_access_token(
+            user_id, build_stateless_claims(state["su"], stamp)
+        )
+        return access_token, new_refresh_token
+    
     @staticmethod
     async def create_user(
         db: AsyncSession,
@@ -70,7 +165,7 @@ class AuthService:
         user = User(
             email=user_data.email,
             username=user_data.username,
-            hashed_password=get_password_hash(user_data.password),
+            hashed_password=await ahash_password(user_data.password),
             nickname=user_data.nickname,
             avatar_url=user_data.avatar_url,
             is_superuser=user_data.is_superuser,
@@ -125,14 +220,56 @@ class AuthService:
         Returns:
             角色代码列表
         """
-        result = await db.execute(
-            select(User)
-            .options(selectinload(User.roles))
-            .where(User.id == user.id)
-        )
-        user_with_roles = result.scalar_one()
+        roles, _ = await get_user_principal(user, db)
+        return roles
+    
+    @staticmethod
+    async def check_permissions(
+        db: AsyncSession,
+        user: User,
+        codes: List[str],
+        version: Optional[str] = None
+    ) -> PermissionCheckResponse:
+        """
+        批量检查用户权限
         
-        return [role.code for role in user_with_roles.roles if role.is_active]
+        结果以位图返回，第i位表示是否拥有codes[i]；未指定codes时返回全部权限代码。
+        版本号由用户有效权限集合的指纹和检查的代码列表共同决定，
+        与客户端传入的版本号一致时只返回 unchanged，不重复传输结果。
+        
+        Args:
+            db: 数据库会话
+            user: 当前用户或令牌主体
+            codes: 需要检查的权限代码
+            version: 客户端已持有结果的版本号
+            
+        Returns:
+            检查结果
+        """
+        mask = await get_user_permission_mask(user, db)
+        current_version = permission_registry.fingerprint(mask)
+        if codes:
+            payload = f"{current_version}\n" + "\n".join(codes)
+            current_version = hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()
+        
+        if version == current_version:
+            return PermissionCheckResponse(version=current_version, unchanged=True)
+        
+        if not codes:
+            return PermissionCheckResponse(
+                version=current_version,
+                permissions=sorted(permission_registry.codes(mask))
+            )
+        
+        bitmap = bytearray((len(codes) + 7) // 8)
+        for index, code in enumerate(codes):
+            if mask & permission_registry.find_bit(code):
+                bitmap[index >> 3] |= 1 << (index & 7)
+        
+        return PermissionCheckResponse(
+            version=current_version,
+            bitmap=base64.b64encode(bytes(bitmap)).decode()
+        )
     
     @staticmethod
     async def check_username_exists(
@@ -151,11 +288,11 @@ class AuthService:
         Returns:
             是否存在
         """
-        query = select(User).where(User.username == username)
+        query = select(User.id).where(User.username == username)
         if exclude_user_id:
             query = query.where(User.id != exclude_user_id)
         
-        result = await db.execute(query)
+        result = await db.execute(query.limit(1))
         return result.scalar_one_or_none() is not None
     
     @staticmethod
@@ -175,9 +312,9 @@ class AuthService:
         Returns:
             是否存在
         """
-        query = select(User).where(User.email == email)
+        query = select(User.id).where(User.email == email)
         if exclude_user_id:
             query = query.where(User.id != exclude_user_id)
         
-        result = await db.execute(query)
+        result = await db.execute(query.limit(1))
         return result.scalar_one_or_none() is not None
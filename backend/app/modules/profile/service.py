@@ -4,10 +4,12 @@
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
 
 from app.models.user import User
-from app.core.security import verify_password, get_password_hash
+from app.models.loading import user_load
+from app.core.cache import invalidate
+from app.core.security import averify_password, ahash_password, forget_security_stamp
+from app.core.revocation import token_revocations
 from .schemas import ProfileUpdate
 
 
@@ -28,11 +30,7 @@ class ProfileService:
         """
         result = await db.execute(
             select(User)
-            .options(
-                selectinload(User.department),
-                selectinload(User.position),
-                selectinload(User.roles)
-            )
+            .options(*user_load("with_org"))
             .where(User.id == user_id)
         )
         return result.scalar_one_or_none()
@@ -54,7 +52,9 @@ class ProfileService:
         Returns:
             更新后的用户对象
         """
-        result = await db.execute(select(User).where(User.id == user_id))
+        result = await db.execute(
+            select(User).options(*user_load("lean")).where(User.id == user_id)
+        )
         user = result.scalar_one_or_none()
         
         if not user:
@@ -69,6 +69,10 @@ class ProfileService:
         await db.commit()
         await db.refresh(user)
         
+        if "nickname" in update_data:
+            # 部门树中包含负责人昵称
+            await invalidate("departments")
+        
         return user
     
     @staticmethod
@@ -90,19 +94,24 @@ class ProfileService:
         Returns:
             (是否成功, 错误信息)
         """
-        result = await db.execute(select(User).where(User.id == user_id))
+        result = await db.execute(
+            select(User).options(*user_load("lean")).where(User.id == user_id)
+        )
         user = result.scalar_one_or_none()
         
         if not user:
             return False, "用户不存在"
         
         # 验证原密码
-        if not verify_password(old_password, user.hashed_password):
+        if not await averify_password(old_password, user.hashed_password):
             return False, "原密码错误"
         
         # 更新密码
-        user.hashed_password = get_password_hash(new_password)
+        user.hashed_password = await ahash_password(new_password)
         await db.commit()
+        await forget_security_stamp(user_id)
+        # 修改密码后此前签发的所有访问令牌失效
+        await token_revocations.revoke_user_tokens(user_id)
         
         return True, ""
     
@@ -123,7 +132,9 @@ class ProfileService:
         Returns:
             更新后的用户对象
         """
-        result = await db.execute(select(User).where(User.id == user_id))
+        result = await db.execute(
+            select(User).options(*user_load("lean")).where(User.id == user_id)
+        )
         user = result.scalar_one_or_none()
         
         if not user:
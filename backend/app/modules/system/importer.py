@@ -0,0 +1,412 @@
+"""
+用户批量导入模块
+流式解析 CSV/JSONL 文件，按批校验并批量写入用户
+"""
+import csv
+import io
+import json
+import uuid
+from itertools import islice
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+
+from loguru import logger
+from pydantic import ValidationError
+from sqlalchemy import select, insert, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.models.user import User
+from app.models.department import Department
+from app.models.position import Position
+from app.core.config import settings
+from app.core.security import ahash_passwords
+from app.core.cache import invalidate
+from .schemas import UserImportRow
+from .search import index_users
+
+
+# 支持的文件格式（扩展名 -> 格式）
+IMPORT_FORMATS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+}
+
+
+def detect_import_format(filename: Optional[str]) -> Optional[str]:
+    """
+    根据文件名判断导入格式
+    
+    Args:
+        filename: 上传文件名
+    
+    Returns:
+        csv / jsonl，不支持的格式返回None
+    """
+    name = (filename or "").lower()
+    for extension, file_format in IMPORT_FORMATS.items():
+        if name.endswith(extension):
+            return file_format
+    return None
+
+
+def iter_import_rows(file: BinaryIO, file_format: str) -> Iterator[Tuple[int, Any]]:
+    """
+    逐行解析导入文件，不会将整个文件读入内存
+    
+    Args:
+        file: 二进制文件对象
+        file_format: csv / jsonl
+    
+    Returns:
+        (行号, 行数据) 迭代器；行无法解析时行数据为异常对象
+    """
+    text_stream = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        if file_format == "csv":
+            reader = csv.DictReader(text_stream)
+            for row in reader:
+                # 空单元格视为未填写
+                yield reader.line_num, {
+                    key: (value if value != "" else None)
+                    for key, value in row.items() if key
+                }
+        else:
+            for line_no, line in enumerate(text_stream, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError as e:
+                    yield line_no, e
+    finally:
+        # 交还底层文件对象，由上传文件自身负责关闭
+        text_stream.detach()
+
+
+def _read_rows(
+    rows: Iterator[Tuple[int, Any]],
+    limit: int
+) -> Tuple[List[Tuple[int, Any]], Optional[Exception]]:
+    """
+    从行迭代器读取最多 limit 行（在线程池中执行）
+    
+    文件编码错误或 CSV 格式错误会使迭代器中途终止，此时返回已读取的行和该异常。
+    
+    Returns:
+        (已读取的行, 解析中止的异常)
+    """
+    chunk: List[Tuple[int, Any]] = []
+    try:
+        chunk.extend(islice(rows, limit))
+    except (UnicodeDecodeError, csv.Error) as e:
+        return chunk, e
+    return chunk, None
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in item['loc'])}: {item['msg']}"
+        for item in error.errors()
+    )
+
+
+def _encode_event(event: Dict[str, Any]) -> bytes:
+    return (json.dumps(event, ensure_ascii=False) + "\n").encode()
+
+
+class UserImportService:
+    """用户批量导入服务类"""
+    
+    @staticmethod
+    async def _resolve_codes(
+        db: AsyncSession,
+        model,
+        codes: Set[str],
+        known: Dict[str, str]
+    ) -> None:
+        """批量查询代码对应的ID，结果写入 known 供后续批次复用"""
+        missing = [code for code in codes if code not in known]
+        if not missing:
+            return
+        result = await db.execute(
+            select(model.code, model.id).where(model.code.in_(missing))
+        )
+        known.update({code: str(model_id) for code, model_id in result.all()})
+    
+    @staticmethod
+    async def _resolve_ids(
+        db: AsyncSession,
+        model,
+        ids: Set[str],
+        known: Set[str]
+    ) -> None:
+        """批量确认直接填写的ID存在，存在的ID写入 known 供后续批次复用"""
+        missing = [model_id for model_id in ids if model_id not in known]
+        if not missing:
+            return
+        result = await db.execute(select(model.id).where(model.id.in_(missing)))
+        known.update(str(model_id) for model_id in result.scalars().all())
+    
+    @staticmethod
+    async def _existing_identities(
+        db: AsyncSession,
+        usernames: List[str],
+        emails: List[str]
+    ) -> Tuple[Set[str], Set[str]]:
+        """一次查询批次内已存在的用户名和邮箱"""
+        if not usernames and not emails:
+            return set(), set()
+        result = await db.execute(
+            select(User.username, User.email).where(
+                or_(User.username.in_(usernames), User.email.in_(emails))
+            )
+        )
+        rows = result.all()
+        return {row.username for row in rows}, {row.email for row in rows}
+    
+    @staticmethod
+    async def _import_batch(
+        db: AsyncSession,
+        batch: List[Tuple[int, UserImportRow]],
+        department_ids: Dict[str, str],
+        position_ids: Dict[str, str],
+        known_department_ids: Set[str],
+        known_position_ids: Set[str]
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        校验并写入一批用户
+        
+        部门和岗位的代码、ID都在写入前批量确认存在，单行引用错误只报告在该行上，
+        不会因外键冲突导致整批写入失败。
+        
+        Returns:
+            (成功写入数量, 行错误列表)
+        """
+        errors: List[Dict[str, Any]] = []
+        
+        await UserImportService._resolve_codes(
+            db, Department,
+            {row.department_code for _, row in batch if row.department_code},
+            department_ids
+        )
+        await UserImportService._resolve_codes(
+            db, Position,
+            {row.position_code for _, row in batch if row.position_code},
+            position_ids
+        )
+        # 填写了代码时以代码为准，只需确认未填代码的行直接填写的ID
+        await UserImportService._resolve_ids(
+            db, Department,
+            {row.department_id for _, row in batch if row.department_id and not row.department_code},
+            known_department_ids
+        )
+        await UserImportService._resolve_ids(
+            db, Position,
+            {row.position_id for _, row in batch if row.position_id and not row.position_code},
+            known_position_ids
+        )
+        existing_usernames, existing_emails = await UserImportService._existing_identities(
+            db,
+            [row.username for _, row in batch],
+            [row.email for _, row in batch]
+        )
+        
+        accepted: List[Tuple[int, UserImportRow]] = []
+        for line_no, row in batch:
+            if row.username in existing_usernames:
+                error = "用户名已存在"
+            elif row.email in existing_emails:
+                error = "邮箱已存在"
+            elif row.department_code and row.department_code not in department_ids:
+                error = f"部门代码不存在: {row.department_code}"
+            elif row.position_code and row.position_code not in position_ids:
+                error = f"岗位代码不存在: {row.position_code}"
+            elif (
+                not row.department_code and row.department_id
+                and row.department_id not in known_department_ids
+            ):
+                error = f"部门不存在: {row.department_id}"
+            elif (
+                not row.position_code and row.position_id
+                and row.position_id not in known_position_ids
+            ):
+                error = f"岗位不存在: {row.position_id}"
+            else:
+                accepted.append((line_no, row))
+                continue
+            errors.append({"type": "error", "line": line_no, "success": False, "error": error})
+        
+        if not accepted:
+            return 0, errors
+        
+        # 密码哈希是CPU密集操作，分片交给哈希执行器并行计算
+        hashed_passwords = await ahash_passwords([row.password for _, row in accepted])
+        
+        records = []
+        for (_, row), hashed_password in zip(accepted, hashed_passwords):
+            records.append({
+                "id": str(uuid.uuid4()),
+                "email": row.email,
+                "username": row.username,
+                "hashed_password": hashed_password,
+                "nickname": row.nickname,
+                "avatar_url": row.avatar_url,
+                "is_superuser": row.is_superuser,
+                "is_active": True,
+                "department_id": (
+                    department_ids[row.department_code]
+                    if row.department_code else row.department_id
+                ),
+                "position_id": (
+                    position_ids[row.position_code]
+                    if row.position_code else row.position_id
+                ),
+            })
+        
+        try:
+            # 批量 INSERT（executemany），不经过 ORM 的逐行 flush
+            await db.execute(insert(User), records)
+            # 绕过了 ORM 事件，需手动同步全文索引
+            await db.run_sync(
+                lambda session: index_users(
+                    session.connection(),
+                    [SimpleNamespace(**record) for record in records]
+                )
+            )
+            await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            logger.warning(f"用户导入批次写入失败: {str(e)}")
+            errors.extend(
+                {
+                    "type": "error",
+                    "line": line_no,
+                    "success": False,
+                    "error": "写入失败，数据与现有记录冲突",
+                }
+                for line_no, _ in accepted
+            )
+            return 0, errors
+        
+        return len(records), errors
+    
+    @staticmethod
+    async def import_users(
+        db: AsyncSession,
+        file: BinaryIO,
+        file_format: str,
+        batch_size: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        流式导入用户
+        
+        逐行解析并校验文件内容，每凑满一批后批量检查冲突并写入，
+        每批单独提交。处理过程以 NDJSON 形式逐条输出：行错误、批次进度和最终汇总。
+        文件中途出现编码或格式错误时输出中止原因，已读取的行照常处理，
+        汇总中 completed 为 false。
+        
+        Args:
+            db: 数据库会话
+            file: 上传文件的二进制文件对象
+            file_format: csv / jsonl
+            batch_size: 每批写入数量，默认使用 USER_IMPORT_BATCH_SIZE
+        
+        Returns:
+            NDJSON 字节流
+        """
+        batch_size = batch_size or settings.USER_IMPORT_BATCH_SIZE
+        department_ids: Dict[str, str] = {}
+        position_ids: Dict[str, str] = {}
+        known_department_ids: Set[str] = set()
+        known_position_ids: Set[str] = set()
+        seen_usernames: Set[str] = set()
+        seen_emails: Set[str] = set()
+        batch: List[Tuple[int, UserImportRow]] = []
+        total = created = failed = 0
+        
+        async def flush() -> AsyncIterator[bytes]:
+            nonlocal created, failed
+            batch_created, batch_errors = await UserImportService._import_batch(
+                db, batch, department_ids, position_ids, known_department_ids, known_position_ids
+            )
+            created += batch_created
+            failed += len(batch_errors)
+            batch.clear()
+            for error in batch_errors:
+                yield _encode_event(error)
+            yield _encode_event({
+                "type": "progress",
+                "processed": total,
+                "created": created,
+                "failed": failed,
+            })
+        
+        rows = iter_import_rows(file, file_format)
+        last_line = 0
+        parse_error: Optional[Exception] = None
+        while parse_error is None:
+            # 解码和 CSV/JSON 解析是同步的CPU操作，按批放到线程池中执行，避免阻塞事件循环
+            chunk, parse_error = await run_in_threadpool(_read_rows, rows, batch_size)
+            for line_no, data in chunk:
+                last_line = line_no
+                total += 1
+                error = None
+                if isinstance(data, Exception):
+                    error = f"无法解析: {str(data)}"
+                elif not isinstance(data, dict):
+                    error = "每行必须是一个JSON对象"
+                else:
+                    try:
+                        row = UserImportRow.model_validate(data)
+                    except ValidationError as e:
+                        error = _format_validation_error(e)
+                    else:
+                        # 文件内部的重复数据在写入前即可发现
+                        if row.username in seen_usernames:
+                            error = "文件中用户名重复"
+                        elif row.email in seen_emails:
+                            error = "文件中邮箱重复"
+                        else:
+                            seen_usernames.add(row.username)
+                            seen_emails.add(row.email)
+                            batch.append((line_no, row))
+                
+                if error is not None:
+                    failed += 1
+                    yield _encode_event({"type": "error", "line": line_no, "success": False, "error": error})
+                
+                if len(batch) >= batch_size:
+                    async for event in flush():
+                        yield event
+            
+            if parse_error is None and len(chunk) < batch_size:
+                break
+        
+        if parse_error is not None:
+            # 之前的批次已经提交，输出中止原因后照常写入已校验的行并输出汇总
+            position = f"第 {last_line} 行之后的内容" if last_line else "文件"
+            yield _encode_event({
+                "type": "error",
+                "line": None,
+                "success": False,
+                "error": f"{position}无法解析，导入中止: {str(parse_error)}",
+            })
+        
+        if batch:
+            async for event in flush():
+                yield event
+        
+        if created:
+            # 部门树中包含部门人数统计
+            await invalidate("departments")
+        
+        yield _encode_event({
+            "type": "summary",
+            "total": total,
+            "created": created,
+            "failed": failed,
+            "completed": parse_error is None,
+        })
@@ -2,23 +2,35 @@
 系统管理路由模块
 """
 from typing import Optional, List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, UploadFile, File
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.responses import api_response
 from app.dependencies.database import get_db
 from app.dependencies.auth import get_current_active_user
-from app.dependencies.permissions import has_permission
-from app.schemas.common import ApiResponse, PaginationParams, PaginationResponse
-from app.schemas.user import UserCreate, UserUpdate, UserResponse, UserWithRoles
+from app.dependencies.permissions import has_permission, route_manifest
+from app.dependencies.conditional import conditional_get
+from app.core.conditional import ConditionalGet
+from app.schemas.common import (
+    ApiResponse, PaginationParams, PaginationResponse,
+    CursorPaginationParams, CursorPaginationResponse
+)
+from app.schemas.user import UserCreate, UserUpdate, UserResponse, UserWithRoles, UserListItem
 from app.schemas.role import RoleCreate, RoleUpdate, RoleResponse, RoleWithPermissions
 from app.schemas.permission import PermissionResponse, PermissionTree
+from app.schemas.fieldset import FieldSet, FieldSelection
 from app.models.user import User
 from .schemas import (
     DepartmentCreate, DepartmentUpdate, DepartmentResponse, DepartmentTree,
     PositionCreate, PositionUpdate, PositionResponse,
-    UserRoleAssign
+    UserRoleAssign,
+    USER_LIST_FIELDS, ROLE_LIST_FIELDS, POSITION_LIST_FIELDS
 )
 from .service import UserService, RoleService, PermissionService, DepartmentService, PositionService
+from .importer import UserImportService, detect_import_format
 
 
 router = APIRouter(prefix="/system", tags=["系统管理"])
@@ -27,40 +39,82 @@ router = APIRouter(prefix="/system", tags=["系统管理"])
 # 用户管理路由
 @router.get(
     "/users",
-    response_model=ApiResponse[PaginationResponse[UserWithRoles]],
+    response_model=ApiResponse[PaginationResponse[UserListItem]],
     summary="获取用户列表",
     description="分页获取用户列表，支持搜索和过滤"
 )
 async def get_users(
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(10, ge=1, le=100, description="每页数量"),
+    with_total: bool = Query(True, description="是否统计总数"),
+    count_mode: str = Query(
+        "exact", pattern="^(exact|cached|estimated)$", description="总数统计方式"
+    ),
     search: Optional[str] = Query(None, description="搜索关键词"),
     department_id: Optional[str] = Query(None, description="部门ID"),
     is_active: Optional[bool] = Query(None, description="激活状态"),
+    include_descendants: bool = Query(False, description="是否包含子部门用户"),
+    fields: Optional[str] = Query(
+        None, description="返回字段，逗号分隔，如 username,nickname,roles.name；为空返回全部字段"
+    ),
     current_user: User = Depends(has_permission("user:list")),
     db: AsyncSession = Depends(get_db)
 ):
     """获取用户列表"""
-    pagination = PaginationParams(page=page, page_size=page_size)
-    users, total = await UserService.get_users(
-        db, pagination, search, department_id, is_active
+    pagination = _pagination(page, page_size, with_total, count_mode)
+    selection = _field_selection(USER_LIST_FIELDS, fields)
+    # 列表行由投影查询直接构造，不经过ORM实体
+    users, total, total_is_estimate = await UserService.get_users(
+        db, pagination, search, department_id, is_active, include_descendants, selection
     )
     
-    # 转换为响应模型
-    user_responses = []
-    for user in users:
-        user_response = UserWithRoles.from_orm(user)
-        user_response.roles = [RoleResponse.from_orm(role) for role in user.roles]
-        user_responses.append(user_response)
-    
-    pagination_response = PaginationResponse.create(
-        items=user_responses,
+    # 列表行已是响应模型，直接序列化，不再经过 response_model 二次校验
+    item_model = USER_LIST_FIELDS.model_for(selection)
+    pagination_response = PaginationResponse[item_model].create(
+        items=users,
         total=total,
         page=page,
-        page_size=page_size
+        page_size=page_size,
+        total_is_estimate=total_is_estimate
+    )
+    
+    return api_response(pagination_response, PaginationResponse[item_model])
+
+
+@router.get(
+    "/users/cursor",
+    response_model=ApiResponse[CursorPaginationResponse[UserListItem]],
+    summary="游标分页获取用户列表",
+    description="按创建时间倒序的游标分页，适合深分页和全量遍历"
+)
+async def get_users_by_cursor(
+    cursor: Optional[str] = Query(None, description="分页游标，首页为空"),
+    page_size: int = Query(10, ge=1, le=100, description="每页数量"),
+    search: Optional[str] = Query(None, description="搜索关键词"),
+    department_id: Optional[str] = Query(None, description="部门ID"),
+    is_active: Optional[bool] = Query(None, description="激活状态"),
+    include_descendants: bool = Query(False, description="是否包含子部门用户"),
+    fields: Optional[str] = Query(
+        None, description="返回字段，逗号分隔，如 username,nickname,roles.name；为空返回全部字段"
+    ),
+    current_user: User = Depends(has_permission("user:list")),
+    db: AsyncSession = Depends(get_db)
+):
+    """游标分页获取用户列表"""
+    pagination = _cursor_pagination(cursor, page_size)
+    selection = _field_selection(USER_LIST_FIELDS, fields)
+    users, next_cursor = await UserService.get_users_by_cursor(
+        db, pagination, search, department_id, is_active, include_descendants, selection
+    )
+    
+    item_model = USER_LIST_FIELDS.model_for(selection)
+    pagination_response = CursorPaginationResponse[item_model].create(
+        items=users,
+        page_size=page_size,
+        next_cursor=next_cursor
     )
     
-    return ApiResponse(success=True, data=pagination_response)
+    return api_response(pagination_response, CursorPaginationResponse[item_model])
 
 
 @router.get(
@@ -82,10 +136,7 @@ async def get_user(
             detail="用户不存在"
         )
     
-    user_response = UserWithRoles.from_orm(user)
-    user_response.roles = [RoleResponse.from_orm(role) for role in user.roles]
-    
-    return ApiResponse(success=True, data=user_response)
+    return ApiResponse(success=True, data=_user_with_roles(user))
 
 
 @router.post(
@@ -125,6 +176,37 @@ async def create_user(
         )
 
 
+@router.post(
+    "/users/import",
+    summary="批量导入用户",
+    description="上传 CSV 或 JSONL 文件批量创建用户，处理结果以 NDJSON 流式返回"
+)
+async def import_users(
+    file: UploadFile = File(..., description="用户数据文件（.csv / .jsonl）"),
+    current_user: User = Depends(has_permission("user:create"))
+):
+    """批量导入用户"""
+    file_format = detect_import_format(file.filename)
+    if file_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="只支持 CSV 或 JSONL 格式的文件"
+        )
+    if file.size is not None and file.size > settings.USER_IMPORT_MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"文件大小不能超过{settings.USER_IMPORT_MAX_FILE_SIZE / (1024 * 1024):g}MB"
+        )
+    
+    async def stream():
+        # 响应流持续时间可能超过请求依赖的生命周期，使用独立的数据库会话
+        async with AsyncSessionLocal() as db:
+            async for chunk in UserImportService.import_users(db, file.file, file_format):
+                yield chunk
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @router.put(
     "/users/{user_id}",
     response_model=ApiResponse[UserResponse],
@@ -230,32 +312,71 @@ async def assign_user_roles(
 async def get_roles(
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(10, ge=1, le=100, description="每页数量"),
+    with_total: bool = Query(True, description="是否统计总数"),
+    count_mode: str = Query(
+        "exact", pattern="^(exact|cached|estimated)$", description="总数统计方式"
+    ),
     search: Optional[str] = Query(None, description="搜索关键词"),
     is_active: Optional[bool] = Query(None, description="激活状态"),
+    fields: Optional[str] = Query(
+        None, description="返回字段，逗号分隔，如 name,code,permissions.code；为空返回全部字段"
+    ),
     current_user: User = Depends(has_permission("role:list")),
+    conditional: ConditionalGet = Depends(conditional_get("roles", "permissions")),
     db: AsyncSession = Depends(get_db)
 ):
     """获取角色列表"""
-    pagination = PaginationParams(page=page, page_size=page_size)
-    roles, total = await RoleService.get_roles(db, pagination, search, is_active)
+    pagination = _pagination(page, page_size, with_total, count_mode)
+    selection = _field_selection(ROLE_LIST_FIELDS, fields)
+    roles, total, total_is_estimate = await RoleService.get_roles(db, pagination, search, is_active, selection)
     
     # 转换为响应模型
-    role_responses = []
-    for role in roles:
-        role_response = RoleWithPermissions.from_orm(role)
-        role_response.permissions = [
-            PermissionResponse.from_orm(perm) for perm in role.permissions
-        ]
-        role_responses.append(role_response)
-    
-    pagination_response = PaginationResponse.create(
+    item_model = ROLE_LIST_FIELDS.model_for(selection)
+    role_responses = _selected_items(ROLE_LIST_FIELDS, selection, roles, _role_with_permissions)
+    
+    pagination_response = PaginationResponse[item_model].create(
         items=role_responses,
         total=total,
         page=page,
-        page_size=page_size
+        page_size=page_size,
+        total_is_estimate=total_is_estimate
+    )
+    
+    return conditional.apply(api_response(pagination_response, PaginationResponse[item_model]))
+
+
+@router.get(
+    "/roles/cursor",
+    response_model=ApiResponse[CursorPaginationResponse[RoleWithPermissions]],
+    summary="游标分页获取角色列表",
+    description="按创建时间倒序的游标分页"
+)
+async def get_roles_by_cursor(
+    cursor: Optional[str] = Query(None, description="分页游标，首页为空"),
+    page_size: int = Query(10, ge=1, le=100, description="每页数量"),
+    search: Optional[str] = Query(None, description="搜索关键词"),
+    is_active: Optional[bool] = Query(None, description="激活状态"),
+    fields: Optional[str] = Query(
+        None, description="返回字段，逗号分隔，如 name,code,permissions.code；为空返回全部字段"
+    ),
+    current_user: User = Depends(has_permission("role:list")),
+    db: AsyncSession = Depends(get_db)
+):
+    """游标分页获取角色列表"""
+    pagination = _cursor_pagination(cursor, page_size)
+    selection = _field_selection(ROLE_LIST_FIELDS, fields)
+    roles, next_cursor = await RoleService.get_roles_by_cursor(
+        db, pagination, search, is_active, selection
     )
     
-    return ApiResponse(success=True, data=pagination_response)
+    item_model = ROLE_LIST_FIELDS.model_for(selection)
+    pagination_response = CursorPaginationResponse[item_model].create(
+        items=_selected_items(ROLE_LIST_FIELDS, selection, roles, _role_with_permissions),
+        page_size=page_size,
+        next_cursor=next_cursor
+    )
+    
+    return api_response(pagination_response, CursorPaginationResponse[item_model])
 
 
 @router.post(
@@ -289,13 +410,14 @@ async def create_role(
 )
 async def get_permissions(
     current_user: User = Depends(has_permission("permission:list")),
+    conditional: ConditionalGet = Depends(conditional_get("permissions")),
     db: AsyncSession = Depends(get_db)
 ):
     """获取权限列表"""
     permissions = await PermissionService.get_permissions(db)
     permission_responses = [PermissionResponse.from_orm(perm) for perm in permissions]
     
-    return ApiResponse(success=True, data=permission_responses)
+    return conditional.apply(api_response(permission_responses, List[PermissionResponse]))
 
 
 @router.get(
@@ -306,11 +428,28 @@ async def get_permissions(
 )
 async def get_permission_tree(
     current_user: User = Depends(has_permission("permission:list")),
+    conditional: ConditionalGet = Depends(conditional_get("permissions")),
     db: AsyncSession = Depends(get_db)
 ):
     """获取权限树"""
     tree = await PermissionService.get_permission_tree(db)
-    return ApiResponse(success=True, data=tree)
+    return conditional.apply(api_response(tree, List[dict]))
+
+
+@router.get(
+    "/permissions/manifest",
+    response_model=ApiResponse[List[dict]],
+    summary="获取路由权限清单",
+    description="获取每个受保护接口所需的权限代码"
+)
+async def get_permission_manifest(
+    request: Request,
+    current_user: User = Depends(has_permission("permission:list"))
+):
+    """获取路由权限清单"""
+    if not route_manifest.compiled:
+        route_manifest.compile(request.app.routes)
+    return ApiResponse(success=True, data=route_manifest.entries())
 
 
 # 部门管理路由
@@ -322,13 +461,14 @@ async def get_permission_tree(
 )
 async def get_departments(
     current_user: User = Depends(has_permission("department:list")),
+    conditional: ConditionalGet = Depends(conditional_get("departments")),
     db: AsyncSession = Depends(get_db)
 ):
     """获取部门列表"""
     departments = await DepartmentService.get_departments(db)
     dept_responses = [DepartmentResponse.from_orm(dept) for dept in departments]
     
-    return ApiResponse(success=True, data=dept_responses)
+    return conditional.apply(api_response(dept_responses, List[DepartmentResponse]))
 
 
 @router.get(
@@ -339,11 +479,12 @@ async def get_departments(
 )
 async def get_department_tree(
     current_user: User = Depends(has_permission("department:list")),
+    conditional: ConditionalGet = Depends(conditional_get("departments")),
     db: AsyncSession = Depends(get_db)
 ):
     """获取部门树"""
     tree = await DepartmentService.get_department_tree(db)
-    return ApiResponse(success=True, data=tree)
+    return conditional.apply(api_response(tree, List[DepartmentTree]))
 
 
 @router.post(
@@ -368,6 +509,38 @@ async def create_department(
         )
 
 
+@router.put(
+    "/departments/{dept_id}",
+    response_model=ApiResponse[DepartmentResponse],
+    summary="更新部门",
+    description="更新部门信息，支持调整上级部门"
+)
+async def update_department(
+    dept_id: str,
+    dept_data: DepartmentUpdate,
+    current_user: User = Depends(has_permission("department:update")),
+    db: AsyncSession = Depends(get_db)
+):
+    """更新部门"""
+    # 不能将部门移动到自身或其子部门下
+    if dept_data.parent_id and await DepartmentService.is_descendant(
+        db, dept_id, dept_data.parent_id
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="不能将部门移动到自身或其子部门下"
+        )
+    
+    department = await DepartmentService.update_department(db, dept_id, dept_data)
+    if not department:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="部门不存在"
+        )
+    
+    return ApiResponse(success=True, data=DepartmentResponse.from_orm(department))
+
+
 # 岗位管理路由
 @router.get(
     "/positions",
@@ -378,30 +551,152 @@ async def create_department(
 async def get_positions(
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(10, ge=1, le=100, description="每页数量"),
+    with_total: bool = Query(True, description="是否统计总数"),
+    count_mode: str = Query(
+        "exact", pattern="^(exact|cached|estimated)$", description="总数统计方式"
+    ),
     department_id: Optional[str] = Query(None, description="部门ID"),
     search: Optional[str] = Query(None, description="搜索关键词"),
+    fields: Optional[str] = Query(
+        None, description="返回字段，逗号分隔，如 name,code,department_name；为空返回全部字段"
+    ),
     current_user: User = Depends(has_permission("position:list")),
     db: AsyncSession = Depends(get_db)
 ):
     """获取岗位列表"""
-    pagination = PaginationParams(page=page, page_size=page_size)
-    positions, total = await PositionService.get_positions(
-        db, pagination, department_id, search
+    pagination = _pagination(page, page_size, with_total, count_mode)
+    selection = _field_selection(POSITION_LIST_FIELDS, fields)
+    positions, total, total_is_estimate = await PositionService.get_positions(
+        db, pagination, department_id, search, selection
     )
     
     # 转换为响应模型
-    position_responses = []
-    for position in positions:
-        pos_response = PositionResponse.from_orm(position)
-        pos_response.department_name = position.department.name if position.department else None
-        pos_response.user_count = 0  # TODO: 计算岗位人数
-        position_responses.append(pos_response)
-    
-    pagination_response = PaginationResponse.create(
+    item_model = POSITION_LIST_FIELDS.model_for(selection)
+    position_responses = _selected_items(POSITION_LIST_FIELDS, selection, positions, _position_response)
+    
+    pagination_response = PaginationResponse[item_model].create(
         items=position_responses,
         total=total,
         page=page,
-        page_size=page_size
+        page_size=page_size,
+        total_is_estimate=total_is_estimate
+    )
+    
+    return api_response(pagination_response, PaginationResponse[item_model])
+
+
+@router.get(
+    "/positions/cursor",
+    response_model=ApiResponse[CursorPaginationResponse[PositionResponse]],
+    summary="游标分页获取岗位列表",
+    description="按创建时间正序的游标分页"
+)
+async def get_positions_by_cursor(
+    cursor: Optional[str] = Query(None, description="分页游标，首页为空"),
+    page_size: int = Query(10, ge=1, le=100, description="每页数量"),
+    department_id: Optional[str] = Query(None, description="部门ID"),
+    search: Optional[str] = Query(None, description="搜索关键词"),
+    fields: Optional[str] = Query(
+        None, description="返回字段，逗号分隔，如 name,code,department_name；为空返回全部字段"
+    ),
+    current_user: User = Depends(has_permission("position:list")),
+    db: AsyncSession = Depends(get_db)
+):
+    """游标分页获取岗位列表"""
+    pagination = _cursor_pagination(cursor, page_size)
+    selection = _field_selection(POSITION_LIST_FIELDS, fields)
+    positions, next_cursor = await PositionService.get_positions_by_cursor(
+        db, pagination, department_id, search, selection
+    )
+    
+    item_model = POSITION_LIST_FIELDS.model_for(selection)
+    pagination_response = CursorPaginationResponse[item_model].create(
+        items=_selected_items(POSITION_LIST_FIELDS, selection, positions, _position_response),
+        page_size=page_size,
+        next_cursor=next_cursor
+    )
+    
+    return api_response(pagination_response, CursorPaginationResponse[item_model])
+
+
+def _pagination(
+    page: int, 
+    page_size: int, 
+    with_total: bool, 
+    count_mode: str
+) -> PaginationParams:
+    """构建页码分页参数"""
+    return PaginationParams(
+        page=page,
+        page_size=page_size,
+        count_mode=count_mode if with_total else "none"
     )
+
+
+def _cursor_pagination(cursor: Optional[str], page_size: int) -> CursorPaginationParams:
+    """构建游标分页参数，游标无效时返回400"""
+    pagination = CursorPaginationParams(cursor=cursor, page_size=page_size)
+    try:
+        pagination.decode_cursor()
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return pagination
+
+
+def _field_selection(fieldset: FieldSet, fields: Optional[str]) -> Optional[FieldSelection]:
+    """解析 fields 参数，包含白名单以外的字段时返回400"""
+    try:
+        return fieldset.parse(fields)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+def _selected_items(
+    fieldset: FieldSet,
+    selection: Optional[FieldSelection],
+    objects: list,
+    convert
+) -> list:
+    """
+    将列表查询结果转换为响应模型
     
-    return ApiResponse(success=True, data=pagination_response)
+    Args:
+        fieldset: 资源字段白名单
+        selection: 字段选择，None表示全部字段
+        objects: 实体或所选列的结果行
+        convert: 完整响应的转换函数
+    """
+    if selection is None:
+        return [convert(obj) for obj in objects]
+    item_model = fieldset.model_for(selection)
+    return [item_model.model_validate(obj) for obj in objects]
+
+
+def _user_with_roles(user: User) -> UserWithRoles:
+    """转换为包含角色的用户响应"""
+    user_response = UserWithRoles.from_orm(user)
+    user_response.roles = [RoleResponse.from_orm(role) for role in user.roles]
+    return user_response
+
+
+def _role_with_permissions(role) -> RoleWithPermissions:
+    """转换为包含权限的角色响应"""
+    role_response = RoleWithPermissions.from_orm(role)
+    role_response.permissions = [
+        PermissionResponse.from_orm(perm) for perm in role.permissions
+    ]
+    return role_response
+
+
+def _position_response(position) -> PositionResponse:
+    """转换为岗位响应"""
+    pos_response = PositionResponse.from_orm(position)
+    pos_response.department_name = position.department.name if position.department else None
+    pos_response.user_count = 0  # TODO: 计算岗位人数
+    return pos_response
@@ -4,9 +4,10 @@
 from typing import List, Optional
 from pydantic import BaseModel, Field
 
-from app.schemas.user import UserResponse
-from app.schemas.role import RoleResponse
+from app.schemas.user import UserResponse, UserCreate, UserListItem
+from app.schemas.role import RoleResponse, RoleWithPermissions
 from app.schemas.permission import PermissionResponse
+from app.schemas.fieldset import FieldSet
 
 
 class DepartmentBase(BaseModel):
@@ -92,5 +93,17 @@ class UserRoleAssign(BaseModel):
     role_ids: List[str] = Field(description="角色ID列表")
 
 
+class UserImportRow(UserCreate):
+    """批量导入用户的单行数据，部门和岗位可用代码指定"""
+    department_code: Optional[str] = Field(default=None, description="部门代码")
+    position_code: Optional[str] = Field(default=None, description="岗位代码")
+
+
 # 解决前向引用
 DepartmentTree.model_rebuild()
+
+
+# 列表接口 fields 参数的字段白名单
+USER_LIST_FIELDS = FieldSet(UserListItem, nested={"roles": RoleResponse})
+ROLE_LIST_FIELDS = FieldSet(RoleWithPermissions, nested={"permissions": PermissionResponse})
+POSITION_LIST_FIELDS = FieldSet(PositionResponse)
@@ -0,0 +1,279 @@
+"""
+用户搜索模块
+SQLite 使用 FTS5 全文索引，PostgreSQL 使用 pg_trgm 三元组索引，其他数据库回退到 LIKE。
+索引由迁移 5d7e1a9c3b20 创建，开发环境随 create_all 一并创建
+"""
+import re
+from typing import Optional
+
+from loguru import logger
+from sqlalchemy import event, inspect, select, func, or_, literal_column, table, column, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import Base, has_table
+from app.models.user import User
+
+
+USER_FTS_TABLE = "users_fts"
+USER_TRIGRAM_INDEX = "ix_users_search_trgm"
+
+# 写入全文索引的用户字段，只有这些字段变化时才需要更新索引
+INDEXED_USER_COLUMNS = ("username", "email", "nickname")
+
+# FTS5 虚拟表，user_id 仅存储不参与索引
+user_fts_table = table(
+    USER_FTS_TABLE,
+    column("user_id"),
+    column("username"),
+    column("email"),
+    column("nickname"),
+)
+
+# 中日韩字符逐字切分，使 unicode61 分词器可以按单字索引中文昵称
+_CJK_PATTERN = re.compile(
+    r"([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af])"
+)
+_TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+
+def segment_text(value: Optional[str]) -> str:
+    """将文本中的中日韩字符以空格分隔，用于写入全文索引"""
+    return _CJK_PATTERN.sub(r" \1 ", value or "")
+
+
+def build_match_query(search: str) -> Optional[str]:
+    """
+    构建 FTS5 MATCH 表达式
+    
+    关键词切分后作为一个短语匹配，最后一个词按前缀匹配，
+    适用于边输入边搜索。
+    
+    Args:
+        search: 搜索关键词
+    
+    Returns:
+        MATCH 表达式，关键词中没有可索引字符时返回None
+    """
+    tokens = _TOKEN_PATTERN.findall(segment_text(search))
+    if not tokens:
+        return None
+    return '"' + " ".join(tokens) + '" *'
+
+
+# PostgreSQL 三元组索引使用的拼接表达式，查询中的表达式需与索引定义完全一致
+_TRIGRAM_EXPRESSION = (
+    "(coalesce(users.username, '') || ' ' || coalesce(users.email, '') || ' ' "
+    "|| coalesce(users.nickname, ''))"
+)
+
+
+def _trigram_expression():
+    return literal_column(_TRIGRAM_EXPRESSION)
+
+
+def _fts_match(match_query: str):
+    return literal_column(USER_FTS_TABLE).op("MATCH")(match_query)
+
+
+def user_search_condition(dialect: str, search: str):
+    """
+    构建用户搜索过滤条件
+    
+    Args:
+        dialect: 数据库方言名称
+        search: 搜索关键词
+    
+    Returns:
+        SQL 过滤条件
+    """
+    if dialect == "sqlite":
+        match_query = build_match_query(search)
+        if match_query is not None:
+            return User.id.in_(
+                select(user_fts_table.c.user_id).where(_fts_match(match_query))
+            )
+    elif dialect == "postgresql":
+        escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return _trigram_expression().ilike(f"%{escaped}%")
+    
+    return or_(
+        User.username.contains(search),
+        User.email.contains(search),
+        User.nickname.contains(search)
+    )
+
+
+def apply_user_search_rank(query, dialect: str, search: str):
+    """
+    按搜索相关度排序
+    
+    Args:
+        query: 用户查询
+        dialect: 数据库方言名称
+        search: 搜索关键词
+    
+    Returns:
+        追加了相关度排序的查询
+    """
+    if dialect == "sqlite":
+        match_query = build_match_query(search)
+        if match_query is None:
+            return query
+        ranked = (
+            select(
+                user_fts_table.c.user_id,
+                func.bm25(literal_column(USER_FTS_TABLE)).label("rank")
+            )
+            .where(_fts_match(match_query))
+            .subquery()
+        )
+        # bm25 越小越相关
+        return query.join(ranked, ranked.c.user_id == User.id).order_by(ranked.c.rank)
+    if dialect == "postgresql":
+        return query.order_by(func.similarity(_trigram_expression(), search).desc())
+    return query
+
+
+def _index_row(user: User) -> dict:
+    return {
+        "user_id": user.id,
+        "username": segment_text(user.username),
+        "email": segment_text(user.email),
+        "nickname": segment_text(user.nickname),
+    }
+
+
+def create_fts_table(connection: Connection) -> None:
+    """创建 SQLite 全文索引虚拟表"""
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {USER_FTS_TABLE} "
+        "USING fts5(user_id UNINDEXED, username, email, nickname, tokenize='unicode61')"
+    ))
+
+
+def create_trigram_index(connection: Connection) -> None:
+    """创建 PostgreSQL 三元组索引（需要创建 pg_trgm 扩展的权限）"""
+    connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    connection.execute(text(
+        f"CREATE INDEX IF NOT EXISTS {USER_TRIGRAM_INDEX} ON users "
+        f"USING gin ({_TRIGRAM_EXPRESSION} gin_trgm_ops)"
+    ))
+
+
+def _on_metadata_created(metadata, connection: Connection, **kw) -> None:
+    # create_all 建表（开发环境、初始化脚本、测试）时一并创建搜索索引，
+    # 迁移管理的数据库由迁移创建
+    if connection.dialect.name == "sqlite":
+        create_fts_table(connection)
+    elif connection.dialect.name == "postgresql":
+        create_trigram_index(connection)
+
+
+event.listen(Base.metadata, "after_create", _on_metadata_created)
+
+
+def index_users(connection: Connection, users: list) -> None:
+    """
+    写入或更新用户的全文索引
+    
+    虚拟表由迁移或 create_all 创建，这里不执行DDL。
+    
+    Args:
+        connection: 同步数据库连接
+        users: 用户对象或包含 id/username/email/nickname 属性的对象列表
+    """
+    if connection.dialect.name != "sqlite" or not users:
+        return
+    
+    connection.execute(
+        user_fts_table.delete().where(
+            user_fts_table.c.user_id.in_([user.id for user in users])
+        )
+    )
+    connection.execute(user_fts_table.insert(), [_index_row(user) for user in users])
+
+
+def _on_user_inserted(mapper, connection: Connection, target: User) -> None:
+    index_users(connection, [target])
+
+
+def _on_user_updated(mapper, connection: Connection, target: User) -> None:
+    # 登录时间、启用状态等非索引字段的更新不改动索引
+    attrs = inspect(target).attrs
+    if any(attrs[name].history.has_changes() for name in INDEXED_USER_COLUMNS):
+        index_users(connection, [target])
+
+
+def _on_user_deleted(mapper, connection: Connection, target: User) -> None:
+    if connection.dialect.name != "sqlite":
+        return
+    connection.execute(
+        user_fts_table.delete().where(user_fts_table.c.user_id == target.id)
+    )
+
+
+# 通过 ORM 写入的用户自动同步到全文索引
+event.listen(User, "after_insert", _on_user_inserted)
+event.listen(User, "after_update", _on_user_updated)
+event.listen(User, "after_delete", _on_user_deleted)
+
+
+def _rebuild_fts(connection: Connection) -> int:
+    connection.execute(user_fts_table.delete())
+    rows = connection.execute(
+        select(User.id, User.username, User.email, User.nickname)
+    ).all()
+    if rows:
+        connection.execute(user_fts_table.insert(), [_index_row(row) for row in rows])
+    return len(rows)
+
+
+async def rebuild_user_search_index(db: AsyncSession) -> int:
+    """
+    全量重建用户搜索索引
+    
+    Returns:
+        写入索引的用户数量（非 SQLite 数据库返回0）
+    """
+    if db.bind.dialect.name != "sqlite":
+        return 0
+    
+    count = await db.run_sync(lambda session: _rebuild_fts(session.connection()))
+    await db.commit()
+    return count
+
+
+async def ensure_user_search_index(db: AsyncSession) -> None:
+    """
+    校验用户搜索索引存在且与用户表一致
+    
+    索引由迁移创建，应用启动时不执行DDL（创建 pg_trgm 扩展通常需要应用账号不具备的权限）。
+    SQLite 在索引行数与用户表不一致时全量重建索引内容（例如初始化脚本直接写库后）。
+    
+    Args:
+        db: 数据库会话
+    
+    Raises:
+        RuntimeError: 搜索索引不存在，搜索会退化为全表扫描或直接失败
+    """
+    dialect = db.bind.dialect.name
+    if dialect == "sqlite":
+        if not await has_table(db, USER_FTS_TABLE):
+            raise RuntimeError(f"用户搜索索引 {USER_FTS_TABLE} 不存在，请执行 alembic upgrade head")
+        index_count = await db.scalar(
+            select(func.count()).select_from(user_fts_table)
+        )
+        user_count = await db.scalar(select(func.count(User.id)))
+        if index_count != user_count:
+            count = await rebuild_user_search_index(db)
+            logger.info(f"用户搜索索引已重建，共 {count} 条")
+        else:
+            await db.commit()
+    elif dialect == "postgresql":
+        exists = await db.scalar(
+            text("SELECT 1 FROM pg_indexes WHERE tablename = 'users' AND indexname = :name"),
+            {"name": USER_TRIGRAM_INDEX}
+        )
+        if not exists:
+            raise RuntimeError(f"用户搜索索引 {USER_TRIGRAM_INDEX} 不存在，请执行 alembic upgrade head")
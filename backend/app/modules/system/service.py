@@ -1,28 +1,196 @@
 """
 系统管理服务模块
 """
-from typing import List, Optional, Dict, Any
+import hashlib
+import json
+from typing import List, Optional, Dict, Any, Type
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_, delete
-from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy import select, func, and_, or_, delete, insert, exists, literal, literal_column, text, true
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import selectinload, joinedload, aliased
+from pydantic import BaseModel, TypeAdapter
 
 from app.models.user import User
 from app.models.role import Role
 from app.models.permission import Permission
 from app.models.department import Department
 from app.models.position import Position
-from app.models.associations import user_role_table, role_permission_table
-from app.schemas.user import UserCreate, UserUpdate
+from app.models.loading import user_load, role_load
+from app.models.associations import (
+    user_role_table, role_permission_table, department_closure_table
+)
+from app.schemas.user import UserCreate, UserUpdate, UserListItem
 from app.schemas.role import RoleCreate, RoleUpdate
+from app.schemas.fieldset import FieldSelection
 from app.schemas.permission import PermissionCreate, PermissionUpdate
-from app.schemas.common import PaginationParams
-from app.core.security import get_password_hash
+from app.schemas.common import PaginationParams, CursorPaginationParams
+from app.core.security import ahash_password, forget_security_stamp
+from app.core.rbac import bump_rbac_version, invalidate_user_rbac
+from app.core.config import settings
+from app.core.cache import cached, invalidate, get_cache
+from app.core.responses import get_type_adapter
+from .search import user_search_condition, apply_user_search_rank
 from .schemas import (
     DepartmentCreate, DepartmentUpdate, DepartmentTree,
-    PositionCreate, PositionUpdate
+    PositionCreate, PositionUpdate,
+    USER_LIST_FIELDS
 )
 
 
+async def _count_rows(
+    db: AsyncSession,
+    model,
+    conditions: list,
+    pagination: PaginationParams,
+    page_count: int
+) -> tuple[Optional[int], bool]:
+    """
+    按分页参数的计数模式统计总数
+    
+    - exact: 精确计数
+    - cached: 以查询条件指纹为键缓存精确计数，短时间内可能略有滞后
+    - estimated: 无过滤条件时读取数据库统计信息，有过滤条件时退化为 cached
+    - none: 不计数
+    
+    当前页未取满时可直接推算出精确总数，无需额外查询。
+    
+    Args:
+        db: 数据库会话
+        model: 查询的模型类
+        conditions: 过滤条件
+        pagination: 分页参数
+        page_count: 当前页实际返回的数量
+    
+    Returns:
+        (总数, 是否为估算值或缓存值)，不计数时总数为None
+    """
+    if page_count < pagination.page_size and (page_count or pagination.offset == 0):
+        return pagination.offset + page_count, False
+    
+    mode = pagination.count_mode
+    if mode == "none":
+        return None, False
+    
+    if mode == "estimated" and not conditions:
+        estimate = await _estimate_table_rows(db, model.__tablename__)
+        if estimate is not None:
+            return estimate, True
+        mode = "exact"
+    
+    stmt = select(func.count(model.id))
+    if conditions:
+        stmt = stmt.where(and_(*conditions))
+    
+    if mode == "exact":
+        return (await db.execute(stmt)).scalar(), False
+    
+    # cached / 有过滤条件的 estimated
+    compiled = stmt.compile(dialect=db.bind.dialect)
+    fingerprint = hashlib.sha1(
+        f"{compiled}|{sorted(compiled.params.items())!r}".encode()
+    ).hexdigest()
+    key = f"{settings.CACHE_KEY_PREFIX}:count:{model.__tablename__}:{fingerprint}"
+    
+    cache = get_cache()
+    cached_total = await cache.get(key)
+    if cached_total is not None:
+        return int(cached_total), True
+    
+    # 缓存未命中时本次返回的是刚查询的精确值
+    total = (await db.execute(stmt)).scalar()
+    await cache.set(key, str(total).encode(), settings.COUNT_CACHE_TTL)
+    return total, False
+
+
+async def _estimate_table_rows(db: AsyncSession, table_name: str) -> Optional[int]:
+    """读取数据库统计信息估算表行数，无可用统计信息时返回None"""
+    dialect = db.bind.dialect.name
+    try:
+        if dialect == "postgresql":
+            result = await db.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE relname = :name"),
+                {"name": table_name}
+            )
+            estimate = result.scalar()
+            # 从未 ANALYZE 过的表 reltuples 为 -1
+            return int(estimate) if estimate is not None and estimate >= 0 else None
+        if dialect == "sqlite":
+            # 需要执行过 ANALYZE 才会生成 sqlite_stat1
+            result = await db.execute(
+                text("SELECT stat FROM sqlite_stat1 WHERE tbl = :name LIMIT 1"),
+                {"name": table_name}
+            )
+            stat = result.scalar()
+            return int(stat.split()[0]) if stat else None
+    except DBAPIError:
+        return None
+    return None
+
+
+async def _fetch_keyset_page(
+    db: AsyncSession,
+    query,
+    model,
+    pagination: CursorPaginationParams,
+    descending: bool = True,
+    scalars: bool = True
+) -> tuple[list, Optional[str]]:
+    """
+    按 (created_at, id) 进行游标分页查询
+    
+    多取一条判断是否还有下一页，避免额外的计数查询。
+    
+    Args:
+        db: 数据库会话
+        query: 已附加过滤条件的查询
+        model: 查询的模型类
+        pagination: 游标分页参数
+        descending: 是否按创建时间倒序
+        scalars: 查询返回实体时为True；列投影查询传入False，返回结果行
+    
+    Returns:
+        当前页数据和下一页游标
+    """
+    cursor = pagination.decode_cursor()
+    if cursor is not None:
+        created_at, last_id = cursor
+        # 以游标行实际存储的 created_at 为基准，避免时间精度差异；
+        # 游标行已被删除时回退到游标中记录的时间
+        anchor_model = aliased(model)
+        anchor = func.coalesce(
+            select(anchor_model.created_at)
+            .where(anchor_model.id == last_id)
+            .scalar_subquery(),
+            created_at
+        )
+        if descending:
+            query = query.where(or_(
+                model.created_at < anchor,
+                and_(model.created_at == anchor, model.id < last_id)
+            ))
+        else:
+            query = query.where(or_(
+                model.created_at > anchor,
+                and_(model.created_at == anchor, model.id > last_id)
+            ))
+    
+    if descending:
+        query = query.order_by(model.created_at.desc(), model.id.desc())
+    else:
+        query = query.order_by(model.created_at, model.id)
+    
+    result = await db.execute(query.limit(pagination.page_size + 1))
+    items = list(result.scalars().all() if scalars else result.all())
+    
+    next_cursor = None
+    if len(items) > pagination.page_size:
+        items = items[:pagination.page_size]
+        last = items[-1]
+        next_cursor = CursorPaginationParams.encode_cursor(last.created_at, str(last.id))
+    
+    return items, next_cursor
+
+
 class UserService:
     """用户服务类"""
     
@@ -32,8 +200,10 @@ class UserService:
         pagination: PaginationParams,
         search: Optional[str] = None,
         department_id: Optional[str] = None,
-        is_active: Optional[bool] = None
-    ) -> tuple[List[User], int]:
+        is_active: Optional[bool] = None,
+        include_descendants: bool = False,
+        selection: Optional[FieldSelection] = None
+    ) -> tuple[List[BaseModel], Optional[int], bool]:
         """
         获取用户列表
         
@@ -43,40 +213,25 @@ class UserService:
             search: 搜索关键词
             department_id: 部门ID过滤
             is_active: 激活状态过滤
-            
+            include_descendants: 部门过滤是否包含所有子部门
+            selection: 返回字段选择，None表示全部字段
+        
         Returns:
-            用户列表和总数
+            用户列表行（见 _user_list_row）、总数和总数是否为估算值
         """
+        dialect = db.bind.dialect.name
         # 构建查询条件
-        conditions = []
-        if search:
-            conditions.append(
-                or_(
-                    User.username.contains(search),
-                    User.email.contains(search),
-                    User.nickname.contains(search)
-                )
-            )
-        if department_id:
-            conditions.append(User.department_id == department_id)
-        if is_active is not None:
-            conditions.append(User.is_active == is_active)
+        conditions = UserService._build_user_conditions(
+            dialect, search, department_id, is_active, include_descendants
+        )
         
         # 查询用户
-        query = select(User).options(
-            selectinload(User.roles),
-            selectinload(User.department),
-            selectinload(User.position)
-        )
+        query = UserService._user_list_query(dialect, selection)
         if conditions:
             query = query.where(and_(*conditions))
-        
-        # 获取总数
-        count_result = await db.execute(
-            select(func.count(User.id)).where(and_(*conditions)) if conditions 
-            else select(func.count(User.id))
-        )
-        total = count_result.scalar()
+        if search:
+            # 搜索时优先按相关度排序
+            query = apply_user_search_rank(query, dialect, search)
         
         # 分页查询
         result = await db.execute(
@@ -84,20 +239,159 @@ class UserService:
                  .limit(pagination.page_size)
                  .order_by(User.created_at.desc())
         )
-        users = result.scalars().all()
+        rows = result.all()
+        
+        # 获取总数
+        total, total_is_estimate = await _count_rows(db, User, conditions, pagination, len(rows))
+        
+        model = USER_LIST_FIELDS.model_for(selection)
+        return [UserService._user_list_row(row, model) for row in rows], total, total_is_estimate
+    
+    @staticmethod
+    async def get_users_by_cursor(
+        db: AsyncSession,
+        pagination: CursorPaginationParams,
+        search: Optional[str] = None,
+        department_id: Optional[str] = None,
+        is_active: Optional[bool] = None,
+        include_descendants: bool = False,
+        selection: Optional[FieldSelection] = None
+    ) -> tuple[List[BaseModel], Optional[str]]:
+        """
+        游标分页获取用户列表
+        
+        按 (created_at, id) 倒序定位，深分页耗时与页码无关。
+        
+        Returns:
+            用户列表行（见 _user_list_row）和下一页游标
+        """
+        dialect = db.bind.dialect.name
+        conditions = UserService._build_user_conditions(
+            dialect, search, department_id, is_active, include_descendants
+        )
+        
+        query = UserService._user_list_query(dialect, selection)
+        if conditions:
+            query = query.where(and_(*conditions))
         
-        return users, total
+        rows, next_cursor = await _fetch_keyset_page(db, query, User, pagination, scalars=False)
+        model = USER_LIST_FIELDS.model_for(selection)
+        return [UserService._user_list_row(row, model) for row in rows], next_cursor
+    
+    @staticmethod
+    def _user_list_query(dialect: str, selection: Optional[FieldSelection] = None):
+        """
+        构建用户列表的列投影查询
+        
+        只选取列表展示需要的用户列（不含密码哈希），通过外连接带出部门和岗位名称，
+        角色摘要在SQL中聚合为JSON数组，一次查询得到完整的列表行，不构造ORM实体。
+        指定字段选择时只查询所选的列，未选择的部门、岗位名称不做连接，
+        未选择角色时不查询角色。id 和 created_at 始终查询，用于游标分页。
+        """
+        fields = selection.fields if selection else USER_LIST_FIELDS.names
+        columns = []
+        for name in dict.fromkeys(("id", "created_at") + tuple(fields)):
+            if name == "roles":
+                role_fields = selection.nested_fields("roles") if selection else None
+                columns.append(UserService._role_summaries(dialect, role_fields).label("roles"))
+            elif name == "department_name":
+                columns.append(Department.name.label(name))
+            elif name == "position_name":
+                columns.append(Position.name.label(name))
+            else:
+                columns.append(getattr(User, name))
+        
+        query = select(*columns).select_from(User)
+        if "department_name" in fields:
+            query = query.outerjoin(Department, Department.id == User.department_id)
+        if "position_name" in fields:
+            query = query.outerjoin(Position, Position.id == User.position_id)
+        return query
+    
+    @staticmethod
+    def _role_summaries(dialect: str, fields: Optional[tuple] = None):
+        """
+        构建按用户聚合角色摘要的关联子查询
+        
+        Args:
+            dialect: 数据库方言名称
+            fields: 角色摘要包含的字段，None表示全部字段
+        """
+        role_fields = []
+        for name in fields or USER_LIST_FIELDS.nested["roles"].model_fields:
+            role_fields.extend((literal_column(f"'{name}'"), getattr(Role, name)))
+        
+        if dialect == "postgresql":
+            aggregate = func.coalesce(
+                func.json_agg(func.json_build_object(*role_fields)),
+                literal_column("'[]'::json")
+            )
+        else:
+            aggregate = func.json_group_array(func.json_object(*role_fields))
+        
+        return (
+            select(aggregate)
+            .select_from(user_role_table)
+            .join(Role, Role.id == user_role_table.c.role_id)
+            .where(user_role_table.c.user_id == User.id)
+            .correlate(User)
+            .scalar_subquery()
+        )
+    
+    @staticmethod
+    def _user_list_row(row, model: Type[BaseModel] = UserListItem) -> BaseModel:
+        """
+        将列表查询行转换为响应模型
+        
+        用户列直接来自数据库，写入时已校验过，按可信数据构造而不再逐字段校验
+        （邮箱格式校验占列表校验开销的大部分）；JSON聚合出的角色摘要中布尔值和
+        时间为数据库方言的原始表示，仍需校验转换。
+        
+        Args:
+            row: 列表查询结果行
+            model: 响应模型，字段选择时为只包含所选字段的派生模型
+        """
+        mapping = row._mapping
+        data = {name: mapping[name] for name in model.model_fields}
+        if "roles" in data:
+            roles = data["roles"]
+            roles = json.loads(roles) if isinstance(roles, (str, bytes)) else (roles or [])
+            data["roles"] = get_type_adapter(model.model_fields["roles"].annotation).validate_python(roles)
+        return model.model_construct(**data)
+    
+    @staticmethod
+    def _build_user_conditions(
+        dialect: str,
+        search: Optional[str] = None,
+        department_id: Optional[str] = None,
+        is_active: Optional[bool] = None,
+        include_descendants: bool = False
+    ) -> list:
+        """构建用户列表查询条件"""
+        conditions = []
+        if search:
+            # 走全文/三元组索引，不支持时回退到 LIKE
+            conditions.append(user_search_condition(dialect, search))
+        if department_id and include_descendants:
+            # 通过闭包表一次查询出部门子树
+            conditions.append(
+                User.department_id.in_(
+                    select(department_closure_table.c.descendant_id)
+                    .where(department_closure_table.c.ancestor_id == department_id)
+                )
+            )
+        elif department_id:
+            conditions.append(User.department_id == department_id)
+        if is_active is not None:
+            conditions.append(User.is_active == is_active)
+        return conditions
     
     @staticmethod
     async def get_user_by_id(db: AsyncSession, user_id: str) -> Optional[User]:
         """根据ID获取用户"""
         result = await db.execute(
             select(User)
-            .options(
-                selectinload(User.roles),
-                selectinload(User.department),
-                selectinload(User.position)
-            )
+            .options(*user_load("with_roles"))
             .where(User.id == user_id)
         )
         return result.scalar_one_or_none()
@@ -108,7 +402,7 @@ class UserService:
         user = User(
             email=user_data.email,
             username=user_data.username,
-            hashed_password=get_password_hash(user_data.password),
+            hashed_password=await ahash_password(user_data.password),
             nickname=user_data.nickname,
             avatar_url=user_data.avatar_url,
             is_superuser=user_data.is_superuser,
@@ -119,6 +413,8 @@ class UserService:
         db.add(user)
         await db.commit()
         await db.refresh(user)
+        # 部门树中包含部门人数统计
+        await invalidate("departments")
         
         return user
     
@@ -129,7 +425,9 @@ class UserService:
         user_data: UserUpdate
     ) -> Optional[User]:
         """更新用户"""
-        result = await db.execute(select(User).where(User.id == user_id))
+        result = await db.execute(
+            select(User).options(*user_load("lean")).where(User.id == user_id)
+        )
         user = result.scalar_one_or_none()
         
         if not user:
@@ -144,12 +442,19 @@ class UserService:
         await db.commit()
         await db.refresh(user)
         
+        # 超级管理员标记可能变化，清除该用户的权限缓存和安全戳
+        invalidate_user_rbac(str(user.id))
+        await forget_security_stamp(str(user.id))
+        await invalidate("departments")
+        
         return user
     
     @staticmethod
     async def delete_user(db: AsyncSession, user_id: str) -> bool:
         """删除用户"""
-        result = await db.execute(select(User).where(User.id == user_id))
+        result = await db.execute(
+            select(User).options(*user_load("lean")).where(User.id == user_id)
+        )
         user = result.scalar_one_or_none()
         
         if not user:
@@ -157,6 +462,9 @@ class UserService:
         
         await db.delete(user)
         await db.commit()
+        invalidate_user_rbac(user_id)
+        await forget_security_stamp(user_id)
+        await invalidate("departments")
         
         return True
     
@@ -169,7 +477,7 @@ class UserService:
         """为用户分配角色"""
         # 获取用户
         result = await db.execute(
-            select(User).options(selectinload(User.roles)).where(User.id == user_id)
+            select(User).options(*user_load("with_roles")).where(User.id == user_id)
         )
         user = result.scalar_one_or_none()
         
@@ -178,7 +486,9 @@ class UserService:
         
         # 获取新角色
         result = await db.execute(
-            select(Role).where(Role.id.in_(role_ids), Role.is_active == True)
+            select(Role)
+            .options(*role_load("lean"))
+            .where(Role.id.in_(role_ids), Role.is_active == True)
         )
         new_roles = result.scalars().all()
         
@@ -187,6 +497,7 @@ class UserService:
         user.roles.extend(new_roles)
         
         await db.commit()
+        await bump_rbac_version()
         return True
 
 
@@ -198,44 +509,84 @@ class RoleService:
         db: AsyncSession,
         pagination: PaginationParams,
         search: Optional[str] = None,
-        is_active: Optional[bool] = None
-    ) -> tuple[List[Role], int]:
-        """获取角色列表"""
-        conditions = []
-        if search:
-            conditions.append(
-                or_(Role.name.contains(search), Role.code.contains(search))
-            )
-        if is_active is not None:
-            conditions.append(Role.is_active == is_active)
+        is_active: Optional[bool] = None,
+        selection: Optional[FieldSelection] = None
+    ) -> tuple[list, Optional[int], bool]:
+        """获取角色列表，返回角色实体或所选列的结果行（见 _role_list_query）"""
+        conditions = RoleService._build_role_conditions(search, is_active)
         
-        query = select(Role).options(selectinload(Role.permissions))
+        query, entities = RoleService._role_list_query(selection)
         if conditions:
             query = query.where(and_(*conditions))
         
-        # 获取总数
-        count_result = await db.execute(
-            select(func.count(Role.id)).where(and_(*conditions)) if conditions 
-            else select(func.count(Role.id))
-        )
-        total = count_result.scalar()
-        
         # 分页查询
         result = await db.execute(
             query.offset(pagination.offset)
                  .limit(pagination.page_size)
                  .order_by(Role.created_at.desc())
         )
-        roles = result.scalars().all()
+        roles = result.scalars().all() if entities else result.all()
+        
+        # 获取总数
+        total, total_is_estimate = await _count_rows(db, Role, conditions, pagination, len(roles))
+        
+        return roles, total, total_is_estimate
+    
+    @staticmethod
+    async def get_roles_by_cursor(
+        db: AsyncSession,
+        pagination: CursorPaginationParams,
+        search: Optional[str] = None,
+        is_active: Optional[bool] = None,
+        selection: Optional[FieldSelection] = None
+    ) -> tuple[list, Optional[str]]:
+        """游标分页获取角色列表"""
+        conditions = RoleService._build_role_conditions(search, is_active)
+        
+        query, entities = RoleService._role_list_query(selection)
+        if conditions:
+            query = query.where(and_(*conditions))
+        
+        return await _fetch_keyset_page(db, query, Role, pagination, scalars=entities)
+    
+    @staticmethod
+    def _role_list_query(selection: Optional[FieldSelection] = None):
+        """
+        构建角色列表查询
+        
+        未指定字段或选择了权限时查询角色实体并预加载权限；
+        否则只查询所选的列（id 和 created_at 始终查询，用于游标分页），不加载权限。
+        
+        Returns:
+            (查询, 是否查询实体)
+        """
+        if selection is None or "permissions" in selection.fields:
+            return select(Role).options(*role_load("with_permissions")), True
         
-        return roles, total
+        names = dict.fromkeys(("id", "created_at") + selection.fields)
+        return select(*(getattr(Role, name) for name in names)), False
+    
+    @staticmethod
+    def _build_role_conditions(
+        search: Optional[str] = None,
+        is_active: Optional[bool] = None
+    ) -> list:
+        """构建角色列表查询条件"""
+        conditions = []
+        if search:
+            conditions.append(
+                or_(Role.name.contains(search), Role.code.contains(search))
+            )
+        if is_active is not None:
+            conditions.append(Role.is_active == is_active)
+        return conditions
     
     @staticmethod
     async def get_role_by_id(db: AsyncSession, role_id: str) -> Optional[Role]:
         """根据ID获取角色"""
         result = await db.execute(
             select(Role)
-            .options(selectinload(Role.permissions))
+            .options(*role_load("with_permissions"))
             .where(Role.id == role_id)
         )
         return result.scalar_one_or_none()
@@ -243,16 +594,8 @@ class RoleService:
     @staticmethod
     async def create_role(db: AsyncSession, role_data: RoleCreate) -> Role:
         """创建角色"""
-        role = Role(
-            name=role_data.name,
-            code=role_data.code,
-            description=role_data.description
-        )
-        
-        db.add(role)
-        await db.flush()
-        
-        # 分配权限
+        # 先查询权限再构造角色，新角色的权限集合无需从数据库加载
+        permissions = []
         if role_data.permission_ids:
             result = await db.execute(
                 select(Permission).where(
@@ -260,11 +603,19 @@ class RoleService:
                     Permission.is_active == True
                 )
             )
-            permissions = result.scalars().all()
-            role.permissions.extend(permissions)
+            permissions = list(result.scalars().all())
+        
+        role = Role(
+            name=role_data.name,
+            code=role_data.code,
+            description=role_data.description,
+            permissions=permissions
+        )
         
+        db.add(role)
         await db.commit()
         await db.refresh(role)
+        await invalidate("roles")
         
         return role
     
@@ -276,7 +627,7 @@ class RoleService:
     ) -> Optional[Role]:
         """更新角色"""
         result = await db.execute(
-            select(Role).options(selectinload(Role.permissions)).where(Role.id == role_id)
+            select(Role).options(*role_load("with_permissions")).where(Role.id == role_id)
         )
         role = result.scalar_one_or_none()
         
@@ -303,13 +654,17 @@ class RoleService:
         
         await db.commit()
         await db.refresh(role)
+        await bump_rbac_version()
+        await invalidate("roles")
         
         return role
     
     @staticmethod
     async def delete_role(db: AsyncSession, role_id: str) -> bool:
         """删除角色"""
-        result = await db.execute(select(Role).where(Role.id == role_id))
+        result = await db.execute(
+            select(Role).options(*role_load("lean")).where(Role.id == role_id)
+        )
         role = result.scalar_one_or_none()
         
         if not role:
@@ -317,6 +672,8 @@ class RoleService:
         
         await db.delete(role)
         await db.commit()
+        await bump_rbac_version()
+        await invalidate("roles")
         
         return True
 
@@ -333,43 +690,44 @@ class PermissionService:
         return result.scalars().all()
     
     @staticmethod
+    @cached("permissions")
     async def get_permission_tree(db: AsyncSession) -> List[Dict[str, Any]]:
         """获取权限树形结构"""
         permissions = await PermissionService.get_permissions(db)
+        return PermissionService._build_permission_tree(permissions)
+    
+    @staticmethod
+    def _build_permission_tree(permissions: List[Permission]) -> List[Dict[str, Any]]:
+        """
+        构建权限树
         
-        # 构建权限映射
-        perm_map = {str(perm.id): perm for perm in permissions}
+        先为每个权限创建节点，再按 parent_id 一次遍历挂接到父节点，
+        时间复杂度 O(n)，不依赖递归深度。子节点顺序与输入顺序一致。
+        """
+        nodes = {
+            str(perm.id): {
+                "id": str(perm.id),
+                "name": perm.name,
+                "code": perm.code,
+                "resource": perm.resource,
+                "action": perm.action,
+                "permission_type": perm.permission_type,
+                "sort_order": perm.sort_order,
+                "is_active": perm.is_active,
+                "children": []
+            }
+            for perm in permissions
+        }
         
-        # 构建树形结构
         tree = []
         for perm in permissions:
+            node = nodes[str(perm.id)]
             if perm.parent_id is None:
-                tree.append(PermissionService._build_permission_tree(perm, perm_map))
+                tree.append(node)
+            elif str(perm.parent_id) in nodes:
+                nodes[str(perm.parent_id)]["children"].append(node)
         
         return tree
-    
-    @staticmethod
-    def _build_permission_tree(
-        permission: Permission, 
-        perm_map: Dict[str, Permission]
-    ) -> Dict[str, Any]:
-        """构建权限树节点"""
-        children = []
-        for perm in perm_map.values():
-            if perm.parent_id == permission.id:
-                children.append(PermissionService._build_permission_tree(perm, perm_map))
-        
-        return {
-            "id": str(permission.id),
-            "name": permission.name,
-            "code": permission.code,
-            "resource": permission.resource,
-            "action": permission.action,
-            "permission_type": permission.permission_type,
-            "sort_order": permission.sort_order,
-            "is_active": permission.is_active,
-            "children": children
-        }
 
 
 class DepartmentService:
@@ -380,12 +738,14 @@ class DepartmentService:
         """获取所有部门"""
         result = await db.execute(
             select(Department)
-            .options(selectinload(Department.leader))
+            # 负责人只需要用户列，不级联加载其角色
+            .options(selectinload(Department.leader).raiseload("*", sql_only=True))
             .order_by(Department.sort_order, Department.created_at)
         )
         return result.scalars().all()
     
     @staticmethod
+    @cached("departments", adapter=TypeAdapter(List[DepartmentTree]))
     async def get_department_tree(db: AsyncSession) -> List[DepartmentTree]:
         """获取部门树形结构"""
         departments = await DepartmentService.get_departments(db)
@@ -393,18 +753,7 @@ class DepartmentService:
         # 获取每个部门的人数统计
         user_counts = await DepartmentService._get_department_user_counts(db)
         
-        # 构建部门映射
-        dept_map = {str(dept.id): dept for dept in departments}
-        
-        # 构建树形结构
-        tree = []
-        for dept in departments:
-            if dept.parent_id is None:
-                tree.append(
-                    DepartmentService._build_department_tree(dept, dept_map, user_counts)
-                )
-        
-        return tree
+        return DepartmentService._build_department_tree(departments, user_counts)
     
     @staticmethod
     async def _get_department_user_counts(db: AsyncSession) -> Dict[str, int]:
@@ -419,31 +768,40 @@ class DepartmentService:
     
     @staticmethod
     def _build_department_tree(
-        department: Department,
-        dept_map: Dict[str, Department],
+        departments: List[Department],
         user_counts: Dict[str, int]
-    ) -> DepartmentTree:
-        """构建部门树节点"""
-        children = []
-        for dept in dept_map.values():
-            if dept.parent_id == department.id:
-                children.append(
-                    DepartmentService._build_department_tree(dept, dept_map, user_counts)
-                )
+    ) -> List[DepartmentTree]:
+        """
+        构建部门树
         
-        return DepartmentTree(
-            id=str(department.id),
-            name=department.name,
-            code=department.code,
-            description=department.description,
-            sort_order=department.sort_order,
-            parent_id=str(department.parent_id) if department.parent_id else None,
-            leader_id=str(department.leader_id) if department.leader_id else None,
-            is_active=department.is_active,
-            children=children,
-            leader_name=department.leader.nickname if department.leader else None,
-            user_count=user_counts.get(str(department.id), 0)
-        )
+        与权限树相同，先创建全部节点再一次遍历挂接父子关系，时间复杂度 O(n)。
+        """
+        nodes = {
+            str(dept.id): DepartmentTree(
+                id=str(dept.id),
+                name=dept.name,
+                code=dept.code,
+                description=dept.description,
+                sort_order=dept.sort_order,
+                parent_id=str(dept.parent_id) if dept.parent_id else None,
+                leader_id=str(dept.leader_id) if dept.leader_id else None,
+                is_active=dept.is_active,
+                children=[],
+                leader_name=dept.leader.nickname if dept.leader else None,
+                user_count=user_counts.get(str(dept.id), 0)
+            )
+            for dept in departments
+        }
+        
+        tree = []
+        for dept in departments:
+            node = nodes[str(dept.id)]
+            if dept.parent_id is None:
+                tree.append(node)
+            elif str(dept.parent_id) in nodes:
+                nodes[str(dept.parent_id)].children.append(node)
+        
+        return tree
     
     @staticmethod
     async def create_department(
@@ -461,10 +819,199 @@ class DepartmentService:
         )
         
         db.add(department)
+        await db.flush()
+        await DepartmentService._insert_closure(db, department.id, department.parent_id)
         await db.commit()
         await db.refresh(department)
+        await invalidate("departments")
         
         return department
+    
+    @staticmethod
+    async def get_department_by_id(
+        db: AsyncSession, 
+        dept_id: str
+    ) -> Optional[Department]:
+        """根据ID获取部门"""
+        result = await db.execute(select(Department).where(Department.id == dept_id))
+        return result.scalar_one_or_none()
+    
+    @staticmethod
+    async def update_department(
+        db: AsyncSession, 
+        dept_id: str, 
+        dept_data: DepartmentUpdate
+    ) -> Optional[Department]:
+        """更新部门，父部门变化时同步维护闭包表"""
+        department = await DepartmentService.get_department_by_id(db, dept_id)
+        if not department:
+            return None
+        
+        old_parent_id = department.parent_id
+        update_data = dept_data.dict(exclude_unset=True)
+        for field, value in update_data.items():
+            if hasattr(department, field):
+                setattr(department, field, value)
+        
+        if department.parent_id != old_parent_id:
+            await db.flush()
+            await DepartmentService._move_closure(db, department.id, department.parent_id)
+        
+        await db.commit()
+        await db.refresh(department)
+        await invalidate("departments")
+        
+        return department
+    
+    @staticmethod
+    async def is_descendant(
+        db: AsyncSession, 
+        ancestor_id: str, 
+        dept_id: str
+    ) -> bool:
+        """判断部门是否为指定部门自身或其子孙部门"""
+        result = await db.execute(
+            select(department_closure_table.c.depth).where(
+                department_closure_table.c.ancestor_id == ancestor_id,
+                department_closure_table.c.descendant_id == dept_id
+            )
+        )
+        return result.first() is not None
+    
+    @staticmethod
+    async def _insert_closure(
+        db: AsyncSession, 
+        dept_id: str, 
+        parent_id: Optional[str]
+    ) -> None:
+        """为新部门写入闭包关系：自身一条，加上父部门的全部祖先"""
+        closure = department_closure_table.c
+        await db.execute(
+            insert(department_closure_table).values(
+                ancestor_id=dept_id, descendant_id=dept_id, depth=0
+            )
+        )
+        if parent_id:
+            await db.execute(
+                insert(department_closure_table).from_select(
+                    ["ancestor_id", "descendant_id", "depth"],
+                    select(closure.ancestor_id, literal(dept_id), closure.depth + 1)
+                    .where(closure.descendant_id == parent_id)
+                )
+            )
+    
+    @staticmethod
+    async def _move_closure(
+        db: AsyncSession, 
+        dept_id: str, 
+        new_parent_id: Optional[str]
+    ) -> None:
+        """将部门子树移动到新的父部门下"""
+        closure = department_closure_table.c
+        subtree = select(closure.descendant_id).where(closure.ancestor_id == dept_id)
+        
+        # 断开子树与原祖先之间的关系，保留子树内部关系
+        await db.execute(
+            delete(department_closure_table).where(
+                closure.descendant_id.in_(subtree),
+                closure.ancestor_id.notin_(subtree)
+            )
+        )
+        
+        if new_parent_id:
+            # 新祖先 × 子树节点
+            supertree = department_closure_table.alias("supertree")
+            sub = department_closure_table.alias("sub")
+            await db.execute(
+                insert(department_closure_table).from_select(
+                    ["ancestor_id", "descendant_id", "depth"],
+                    select(
+                        supertree.c.ancestor_id,
+                        sub.c.descendant_id,
+                        supertree.c.depth + sub.c.depth + 1
+                    ).select_from(
+                        # 有意的笛卡尔积，显式声明以免 SQLAlchemy 告警
+                        supertree.join(sub, true())
+                    ).where(
+                        supertree.c.descendant_id == new_parent_id,
+                        sub.c.ancestor_id == dept_id
+                    )
+                )
+            )
+    
+    @staticmethod
+    async def rebuild_department_closure(db: AsyncSession) -> int:
+        """
+        根据 parent_id 全量重建部门闭包表
+        
+        用于初始化脚本直接写入部门数据后，或已有数据库首次启用闭包表时。
+        
+        Returns:
+            写入的闭包关系数量
+        """
+        result = await db.execute(select(Department.id, Department.parent_id))
+        parents = {str(dept_id): parent_id for dept_id, parent_id in result.all()}
+        
+        rows = []
+        for dept_id in parents:
+            ancestor_id, depth = dept_id, 0
+            visited = set()
+            while ancestor_id in parents and ancestor_id not in visited:
+                visited.add(ancestor_id)
+                rows.append(
+                    {"ancestor_id": ancestor_id, "descendant_id": dept_id, "depth": depth}
+                )
+                ancestor_id, depth = parents.get(ancestor_id), depth + 1
+        
+        await db.execute(delete(department_closure_table))
+        if rows:
+            await db.execute(insert(department_closure_table), rows)
+        await db.commit()
+        
+        return len(rows)
+    
+    @staticmethod
+    async def ensure_department_closure(db: AsyncSession) -> bool:
+        """
+        校验闭包表与部门 parent_id 是否一致，不一致时全量重建
+        
+        绕过 DepartmentService 写入的部门（初始化脚本、CSV导入、手工SQL）没有闭包记录，
+        直接修改 parent_id 的部门闭包记录也已过期。一致的闭包表满足：每个部门都有
+        深度0的自身记录，有上级的部门都有指向当前上级的深度1记录，且不含已删除部门的记录。
+        
+        Returns:
+            是否重建了闭包表
+        """
+        closure = department_closure_table.c
+        self_row = exists().where(
+            closure.ancestor_id == Department.id,
+            closure.descendant_id == Department.id,
+            closure.depth == 0
+        )
+        parent_row = exists().where(
+            closure.ancestor_id == Department.parent_id,
+            closure.descendant_id == Department.id,
+            closure.depth == 1
+        )
+        missing = await db.scalar(
+            select(func.count(Department.id)).where(
+                or_(~self_row, and_(Department.parent_id.isnot(None), ~parent_row))
+            )
+        )
+        department_ids = select(Department.id)
+        stale = await db.scalar(
+            select(func.count()).select_from(department_closure_table).where(
+                or_(
+                    closure.ancestor_id.notin_(department_ids),
+                    closure.descendant_id.notin_(department_ids)
+                )
+            )
+        )
+        if not missing and not stale:
+            return False
+        
+        await DepartmentService.rebuild_department_closure(db)
+        return True
 
 
 class PositionService:
@@ -475,34 +1022,88 @@ class PositionService:
         db: AsyncSession,
         pagination: PaginationParams,
         department_id: Optional[str] = None,
-        search: Optional[str] = None
-    ) -> tuple[List[Position], int]:
-        """获取岗位列表"""
-        conditions = []
-        if department_id:
-            conditions.append(Position.department_id == department_id)
-        if search:
-            conditions.append(
-                or_(Position.name.contains(search), Position.code.contains(search))
-            )
+        search: Optional[str] = None,
+        selection: Optional[FieldSelection] = None
+    ) -> tuple[list, Optional[int], bool]:
+        """获取岗位列表，返回岗位实体或所选列的结果行（见 _position_list_query）"""
+        conditions = PositionService._build_position_conditions(department_id, search)
         
-        query = select(Position).options(selectinload(Position.department))
+        query, entities = PositionService._position_list_query(selection)
         if conditions:
             query = query.where(and_(*conditions))
         
-        # 获取总数
-        count_result = await db.execute(
-            select(func.count(Position.id)).where(and_(*conditions)) if conditions 
-            else select(func.count(Position.id))
-        )
-        total = count_result.scalar()
-        
         # 分页查询
         result = await db.execute(
             query.offset(pagination.offset)
                  .limit(pagination.page_size)
                  .order_by(Position.sort_order, Position.created_at)
         )
-        positions = result.scalars().all()
+        positions = result.scalars().all() if entities else result.all()
+        
+        # 获取总数
+        total, total_is_estimate = await _count_rows(db, Position, conditions, pagination, len(positions))
+        
+        return positions, total, total_is_estimate
+    
+    @staticmethod
+    async def get_positions_by_cursor(
+        db: AsyncSession,
+        pagination: CursorPaginationParams,
+        department_id: Optional[str] = None,
+        search: Optional[str] = None,
+        selection: Optional[FieldSelection] = None
+    ) -> tuple[list, Optional[str]]:
+        """游标分页获取岗位列表（按创建时间正序）"""
+        conditions = PositionService._build_position_conditions(department_id, search)
+        
+        query, entities = PositionService._position_list_query(selection)
+        if conditions:
+            query = query.where(and_(*conditions))
+        
+        return await _fetch_keyset_page(
+            db, query, Position, pagination, descending=False, scalars=entities
+        )
+    
+    @staticmethod
+    def _position_list_query(selection: Optional[FieldSelection] = None):
+        """
+        构建岗位列表查询
+        
+        未指定字段时查询岗位实体并预加载所属部门；否则只查询所选的列
+        （id 和 created_at 始终查询，用于游标分页），选择部门名称时才连接部门表。
+        
+        Returns:
+            (查询, 是否查询实体)
+        """
+        if selection is None:
+            return select(Position).options(selectinload(Position.department)), True
+        
+        columns = []
+        for name in dict.fromkeys(("id", "created_at") + selection.fields):
+            if name == "department_name":
+                columns.append(Department.name.label(name))
+            elif name == "user_count":
+                # 与完整响应一致，岗位人数尚未统计
+                columns.append(literal(0).label(name))
+            else:
+                columns.append(getattr(Position, name))
         
-        return positions, total
+        query = select(*columns).select_from(Position)
+        if "department_name" in selection.fields:
+            query = query.outerjoin(Department, Department.id == Position.department_id)
+        return query, False
+    
+    @staticmethod
+    def _build_position_conditions(
+        department_id: Optional[str] = None,
+        search: Optional[str] = None
+    ) -> list:
+        """构建岗位列表查询条件"""
+        conditions = []
+        if department_id:
+            conditions.append(Position.department_id == department_id)
+        if search:
+            conditions.append(
+                or_(Position.name.contains(search), Position.code.contains(search))
+            )
+        return conditions
@@ -1,7 +1,9 @@
 """
 通用响应模式
 """
-from typing import Generic, TypeVar, Optional, Any
+import base64
+import json
+from typing import Generic, TypeVar, Optional, Any, Tuple
 from pydantic import BaseModel, Field
 from datetime import datetime
 
@@ -26,6 +28,11 @@ class PaginationParams(BaseModel):
     """分页参数"""
     page: int = Field(default=1, ge=1, description="页码")
     page_size: int = Field(default=10, ge=1, le=100, description="每页数量")
+    count_mode: str = Field(
+        default="exact",
+        pattern="^(exact|cached|estimated|none)$",
+        description="总数统计方式：exact 精确 / cached 缓存 / estimated 估算 / none 不统计"
+    )
     
     @property
     def offset(self) -> int:
@@ -36,27 +43,87 @@ class PaginationParams(BaseModel):
 class PaginationResponse(BaseModel, Generic[DataT]):
     """分页响应模式"""
     items: list[DataT] = Field(description="数据列表")
-    total: int = Field(description="总数量")
+    total: Optional[int] = Field(description="总数量，未统计时为空")
     page: int = Field(description="当前页码")
     page_size: int = Field(description="每页数量")
-    total_pages: int = Field(description="总页数")
+    total_pages: Optional[int] = Field(description="总页数，未统计时为空")
+    total_is_estimate: bool = Field(default=False, description="总数是否为估算值或缓存值")
     
     @classmethod
     def create(
         cls, 
         items: list[DataT], 
-        total: int, 
+        total: Optional[int], 
         page: int, 
-        page_size: int
+        page_size: int,
+        total_is_estimate: bool = False
     ) -> "PaginationResponse[DataT]":
         """创建分页响应"""
         import math
+        total_pages = None
+        if total is not None:
+            total_pages = math.ceil(total / page_size) if page_size > 0 else 0
         return cls(
             items=items,
             total=total,
             page=page,
             page_size=page_size,
-            total_pages=math.ceil(total / page_size) if page_size > 0 else 0
+            total_pages=total_pages,
+            total_is_estimate=total_is_estimate and total is not None
+        )
+
+
+class CursorPaginationParams(BaseModel):
+    """游标分页参数"""
+    cursor: Optional[str] = Field(default=None, description="游标，首页为空")
+    page_size: int = Field(default=10, ge=1, le=100, description="每页数量")
+    
+    @staticmethod
+    def encode_cursor(created_at: datetime, id: str) -> str:
+        """将排序键 (created_at, id) 编码为不透明游标"""
+        raw = json.dumps({"t": created_at.isoformat(), "id": id}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+    
+    def decode_cursor(self) -> Optional[Tuple[datetime, str]]:
+        """
+        解析游标
+        
+        Returns:
+            (created_at, id)，首页返回None
+            
+        Raises:
+            ValueError: 游标格式无效
+        """
+        if not self.cursor:
+            return None
+        try:
+            padded = self.cursor + "=" * (-len(self.cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return datetime.fromisoformat(data["t"]), str(data["id"])
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError("无效的分页游标") from e
+
+
+class CursorPaginationResponse(BaseModel, Generic[DataT]):
+    """游标分页响应模式"""
+    items: list[DataT] = Field(description="数据列表")
+    page_size: int = Field(description="每页数量")
+    next_cursor: Optional[str] = Field(default=None, description="下一页游标，为空表示没有更多数据")
+    has_more: bool = Field(description="是否还有更多数据")
+    
+    @classmethod
+    def create(
+        cls,
+        items: list[DataT],
+        page_size: int,
+        next_cursor: Optional[str]
+    ) -> "CursorPaginationResponse[DataT]":
+        """创建游标分页响应"""
+        return cls(
+            items=items,
+            page_size=page_size,
+            next_cursor=next_cursor,
+            has_more=next_cursor is not None
         )
 
 
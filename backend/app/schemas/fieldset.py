@@ -0,0 +1,144 @@
+"""
+稀疏字段集模式
+解析列表接口的 fields 参数，按资源的字段白名单生成只包含所选字段的响应模型
+"""
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple, Type
+
+from pydantic import BaseModel, ConfigDict, create_model
+
+
+class FieldSelection(NamedTuple):
+    """已校验的字段选择"""
+    fields: Tuple[str, ...]
+    # 关联字段的子字段选择，如 (("roles", ("code", "name")),)；未列出的关联字段返回全部子字段
+    nested: Tuple[Tuple[str, Tuple[str, ...]], ...] = ()
+    
+    def nested_fields(self, name: str) -> Optional[Tuple[str, ...]]:
+        """
+        获取关联字段的子字段选择
+        
+        Args:
+            name: 关联字段名
+        
+        Returns:
+            所选子字段，未指定子字段时返回None（表示全部）
+        """
+        return dict(self.nested).get(name)
+
+
+@lru_cache(maxsize=256)
+def _partial_model(
+    model: Type[BaseModel],
+    fields: Tuple[str, ...],
+    nested: Tuple[Tuple[str, Type[BaseModel]], ...]
+) -> Type[BaseModel]:
+    """按字段选择从完整模型派生出部分字段模型，同一选择只构建一次"""
+    nested_models = dict(nested)
+    definitions = {}
+    for name in fields:
+        field = model.model_fields[name]
+        annotation = List[nested_models[name]] if name in nested_models else field.annotation
+        definitions[name] = (annotation, field)
+    return create_model(
+        f"{model.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **definitions
+    )
+
+
+class FieldSet:
+    """
+    资源的稀疏字段集白名单
+    
+    fields 参数为逗号分隔的字段名，关联字段可用 关联.子字段 只选取部分子字段，
+    如 username,nickname,roles.name。白名单即响应模型的字段，关联字段只支持列表关系。
+    主键字段始终返回，便于前端作为行键使用。
+    """
+    
+    def __init__(
+        self,
+        model: Type[BaseModel],
+        nested: Optional[Dict[str, Type[BaseModel]]] = None,
+        always: Tuple[str, ...] = ("id",)
+    ):
+        self.model = model
+        self.nested = nested or {}
+        self.always = always
+    
+    @property
+    def names(self) -> Tuple[str, ...]:
+        """白名单字段，按响应模型中的顺序"""
+        return tuple(self.model.model_fields)
+    
+    def parse(self, raw: Optional[str]) -> Optional[FieldSelection]:
+        """
+        解析并校验 fields 参数
+        
+        Args:
+            raw: 逗号分隔的字段列表
+        
+        Returns:
+            字段选择，参数为空时返回None（表示全部字段）
+        
+        Raises:
+            ValueError: 包含白名单以外的字段
+        """
+        if raw is None or not raw.strip():
+            return None
+        
+        selected = set(self.always)
+        whole = set()
+        partial: Dict[str, set] = {}
+        unknown = []
+        for item in raw.split(","):
+            item = item.strip()
+            if not item:
+                continue
+            name, _, sub = item.partition(".")
+            nested_model = self.nested.get(name)
+            if name not in self.model.model_fields:
+                unknown.append(item)
+            elif not sub:
+                selected.add(name)
+                whole.add(name)
+            elif nested_model is not None and sub in nested_model.model_fields:
+                selected.add(name)
+                partial.setdefault(name, set()).add(sub)
+            else:
+                unknown.append(item)
+        
+        if unknown:
+            raise ValueError(f"不支持的字段: {', '.join(unknown)}")
+        
+        # 同时给出 roles 和 roles.name 时按 roles 返回全部子字段
+        nested = tuple(
+            (name, tuple(sub for sub in self.nested[name].model_fields if sub in subs))
+            for name, subs in partial.items() if name not in whole
+        )
+        return FieldSelection(
+            fields=tuple(name for name in self.names if name in selected),
+            nested=tuple(sorted(nested))
+        )
+    
+    def model_for(self, selection: Optional[FieldSelection]) -> Type[BaseModel]:
+        """
+        获取字段选择对应的响应模型
+        
+        Args:
+            selection: 字段选择，None表示全部字段
+        
+        Returns:
+            完整响应模型或只包含所选字段的派生模型
+        """
+        if selection is None:
+            return self.model
+        
+        nested = []
+        for name, subs in selection.nested:
+            nested_model = self.nested[name]
+            nested.append((name, _partial_model(nested_model, subs, ())))
+        for name in selection.fields:
+            if name in self.nested and selection.nested_fields(name) is None:
+                nested.append((name, self.nested[name]))
+        return _partial_model(self.model, selection.fields, tuple(sorted(nested, key=lambda item: item[0])))
@@ -46,6 +46,12 @@ class UserWithRoles(UserResponse):
     roles: List["RoleResponse"] = Field(default=[], description="用户角色列表")
 
 
+class UserListItem(UserWithRoles):
+    """用户列表项响应模式"""
+    department_name: Optional[str] = Field(default=None, description="部门名称")
+    position_name: Optional[str] = Field(default=None, description="岗位名称")
+
+
 class UserLogin(BaseModel):
     """用户登录请求模式"""
     username: str = Field(description="用户名或邮箱")
@@ -76,3 +82,4 @@ class TokenResponse(BaseModel):
 # 避免循环导入
 from .role import RoleResponse
 UserWithRoles.model_rebuild()
+UserListItem.model_rebuild()
@@ -1,19 +1,29 @@
 """
 企业级管理系统 FastAPI 应用入口
 """
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 import uvicorn
 
 from app.core.config import settings
 from app.core.logging import setup_logging
-from app.core.database import Base, engine
+from app.core.database import Base, engine, AsyncSessionLocal, has_table
+from app.core.cache import close_cache
+from app.core.conditional import NotModified
+from app.core.hashing import PasswordHasherBusy, password_hasher
+from app.core.ratelimit import RateLimitExceeded
+from app.core.responses import FastJSONResponse
 from app.schemas.common import ApiResponse
+from app.dependencies.permissions import route_manifest
+from app.middleware.authorization import PermissionFastPathMiddleware
+from app.middleware.query_stats import QueryStatsMiddleware
 from app.modules.auth.router import router as auth_router
 from app.modules.system.router import router as system_router
 from app.modules.profile.router import router as profile_router
+from app.models.associations import department_closure_table
+from app.modules.system.service import DepartmentService
+from app.modules.system.search import ensure_user_search_index
 
 
 # 设置日志
@@ -31,10 +41,25 @@ async def lifespan(app: FastAPI):
         Base.metadata.create_all(bind=engine)
         logger.info("数据库表已创建")
     
+    # 校正部门闭包表（绕过服务层写入或修改的部门数据），校验用户搜索索引
+    async with AsyncSessionLocal() as db:
+        if await has_table(db, department_closure_table.name):
+            if await DepartmentService.ensure_department_closure(db):
+                logger.info("部门闭包表与部门数据不一致，已重建")
+        else:
+            logger.warning("部门闭包表不存在，请执行 alembic upgrade head")
+        await ensure_user_search_index(db)
+    
+    # 编译路由权限清单，供权限快速拒绝中间件使用
+    route_manifest.compile(app.routes)
+    logger.info(f"路由权限清单已编译，共 {len(route_manifest.entries())} 个受保护路由")
+    
     yield
     
     # 关闭时执行
     logger.info("应用关闭中...")
+    await close_cache()
+    password_hasher.shutdown()
 
 
 # 创建FastAPI应用
@@ -48,6 +73,13 @@ app = FastAPI(
 )
 
 
+# 权限快速拒绝（先注册的中间件位于内层，被拒绝的响应仍会经过CORS处理）
+app.add_middleware(PermissionFastPathMiddleware)
+
+# 请求级SQL统计
+app.add_middleware(QueryStatsMiddleware)
+
+
 # 配置CORS
 app.add_middleware(
     CORSMiddleware,
@@ -62,14 +94,52 @@ app.add_middleware(
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     """HTTP异常处理器"""
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=200,  # 统一返回200状态码
+        headers=getattr(exc, "headers", None),
         content=ApiResponse(
             success=False,
             data=None,
             error=exc.detail,
             code=str(exc.status_code)
-        ).dict()
+        )
+    )
+
+
+@app.exception_handler(NotModified)
+async def not_modified_handler(request: Request, exc: NotModified):
+    """条件请求命中，返回不带响应体的304"""
+    return Response(status_code=304, headers=exc.headers)
+
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    """密码哈希排队已满时快速拒绝请求"""
+    # 使用真实的503状态码和Retry-After，便于客户端和负载均衡器退避重试
+    return FastJSONResponse(
+        status_code=503,
+        headers={"Retry-After": str(exc.retry_after)},
+        content=ApiResponse(
+            success=False,
+            data=None,
+            error=str(exc),
+            code="503"
+        )
+    )
+
+
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    """限流拒绝处理器"""
+    return FastJSONResponse(
+        status_code=429,
+        headers={"Retry-After": str(exc.retry_after)},
+        content=ApiResponse(
+            success=False,
+            data=None,
+            error=str(exc),
+            code="429"
+        )
     )
 
 
@@ -77,14 +147,14 @@ async def http_exception_handler(request: Request, exc: HTTPException):
 async def general_exception_handler(request: Request, exc: Exception):
     """通用异常处理器"""
     logger.error(f"未处理的异常: {str(exc)}")
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=200,
         content=ApiResponse(
             success=False,
             data=None,
             error="服务器内部错误" if not settings.DEBUG else str(exc),
             code="500"
-        ).dict()
+        )
     )
 
 
@@ -110,5 +180,6 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=settings.DEBUG,
+        workers=settings.WORKERS,
         log_level="debug" if settings.DEBUG else "info"
     )
@@ -24,9 +24,31 @@ async def init_db():
     # 初始化基础数据（异步会话）
     from scripts.initial_data import init_data
     await init_data()
+    await rebuild_department_closure()
+    await rebuild_search_index()
     print("数据库初始化完成！")
 
 
+async def rebuild_department_closure():
+    """重建部门闭包表"""
+    from app.core.database import AsyncSessionLocal
+    from app.modules.system.service import DepartmentService
+    
+    async with AsyncSessionLocal() as db:
+        count = await DepartmentService.rebuild_department_closure(db)
+    print(f"部门闭包表已重建，共 {count} 条关系")
+
+
+async def rebuild_search_index():
+    """重建用户搜索索引"""
+    from app.core.database import AsyncSessionLocal
+    from app.modules.system.search import rebuild_user_search_index
+    
+    async with AsyncSessionLocal() as db:
+        count = await rebuild_user_search_index(db)
+    print(f"用户搜索索引已重建，共 {count} 条")
+
+
 def create_migration(message: str):
     """创建数据库迁移"""
     os.system(f'alembic revision --autogenerate -m "{message}"')
@@ -63,6 +85,8 @@ def show_help():
   init-db        初始化数据库和基础数据
   makemigrations 创建数据库迁移 (需要提供消息)
   migrate        应用数据库迁移
+  rebuild-closure 重建部门闭包表
+  rebuild-search 重建用户搜索索引
   runserver      运行开发服务器
   help           显示此帮助信息
 
@@ -93,6 +117,10 @@ async def main():
         create_migration(message)
     elif command == "migrate":
         upgrade_db()
+    elif command == "rebuild-closure":
+        await rebuild_department_closure()
+    elif command == "rebuild-search":
+        await rebuild_search_index()
     elif command == "runserver":
         run_server()
     elif command in ["help", "-h", "--help"]:
@@ -0,0 +1,202 @@
+"""
+响应序列化基准测试
+对比用户列表和树形接口在 FastAPI 默认响应流程与 FastJSONResponse 下的序列化吞吐量
+
+默认流程：路由返回 ApiResponse 模型，FastAPI 按 response_model 重新校验、
+经 jsonable_encoder 转换后由 JSONResponse 输出。
+快速流程：路由返回 api_response(...)，直接由预构建的序列化器输出JSON字节。
+
+用法：python -m scripts.benchmark_responses [--rounds 200]
+"""
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from main import app
+from app.core.responses import api_response
+from app.modules.system.schemas import DepartmentTree
+from app.modules.system.service import PermissionService, UserService
+from app.schemas.common import ApiResponse, PaginationResponse
+from app.schemas.user import UserListItem
+
+
+def _user_rows(count: int) -> List[Dict[str, Any]]:
+    """构造与用户列表投影查询结构一致的列表行"""
+    now = datetime.now()
+    roles = [
+        {
+            "id": str(uuid.uuid4()),
+            "name": f"角色{index}",
+            "code": f"role_{index}",
+            "description": "基准测试角色",
+            "created_at": now,
+            "updated_at": now,
+            "is_active": True,
+        }
+        for index in range(3)
+    ]
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "email": f"user{index}@example.com",
+            "username": f"user{index}",
+            "nickname": f"用户{index}",
+            "avatar_url": None,
+            "is_superuser": False,
+            "department_id": str(uuid.uuid4()),
+            "position_id": str(uuid.uuid4()),
+            "department_name": "研发部",
+            "position_name": "工程师",
+            "created_at": now,
+            "updated_at": now,
+            "is_active": True,
+            "roles": roles,
+        }
+        for index in range(count)
+    ]
+
+
+def _department_tree(depth: int, width: int) -> List[DepartmentTree]:
+    """构造指定深度和宽度的部门树"""
+    def build(level: int, prefix: str) -> List[DepartmentTree]:
+        if level == depth:
+            return []
+        return [
+            DepartmentTree(
+                id=str(uuid.uuid4()),
+                name=f"部门{prefix}{index}",
+                code=f"dept_{prefix}{index}",
+                sort_order=index,
+                is_active=True,
+                user_count=10,
+                children=build(level + 1, f"{prefix}{index}_"),
+            )
+            for index in range(width)
+        ]
+    return build(0, "")
+
+
+def _permission_tree(groups: int, actions: int) -> List[Dict[str, Any]]:
+    """构造与 PermissionService.get_permission_tree 结构一致的权限树"""
+    permissions = []
+    for group in range(groups):
+        parent_id = uuid.uuid4()
+        permissions.append(_PermissionRow(parent_id, None, f"group{group}", "menu"))
+        for action in range(actions):
+            permissions.append(
+                _PermissionRow(uuid.uuid4(), parent_id, f"group{group}:action{action}", "api")
+            )
+    return PermissionService._build_permission_tree(permissions)
+
+
+class _PermissionRow:
+    """权限树构建所需的最小属性集合"""
+    
+    def __init__(self, id, parent_id, code: str, permission_type: str):
+        self.id = id
+        self.parent_id = parent_id
+        self.name = code
+        self.code = code
+        self.resource = code.split(":")[0]
+        self.action = code.split(":")[-1]
+        self.permission_type = permission_type
+        self.sort_order = 0
+        self.is_active = True
+
+
+def _route(path: str) -> APIRoute:
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.path == path and "GET" in route.methods:
+            return route
+    raise LookupError(path)
+
+
+def _default_pipeline(path: str, build: Callable[[], Any]) -> Callable[[], bytes]:
+    """模拟 FastAPI 默认流程：返回 ApiResponse 后按 response_model 校验并序列化"""
+    field = _route(path).response_field
+    
+    def run() -> bytes:
+        # serialize_response 在 is_coroutine=True 时内部没有真正的等待，直接驱动协程即可
+        coroutine = serialize_response(field=field, response_content=build())
+        try:
+            coroutine.send(None)
+        except StopIteration as done:
+            return JSONResponse(done.value).body
+        raise RuntimeError("serialize_response 未同步完成")
+    return run
+
+
+def _measure(run: Callable[[], bytes], rounds: int) -> float:
+    run()  # 预热，构建序列化器
+    started = time.perf_counter()
+    for _ in range(rounds):
+        run()
+    return rounds / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=200, help="每个场景的序列化次数")
+    parser.add_argument("--page-size", type=int, default=100, help="用户列表每页行数")
+    args = parser.parse_args()
+    
+    rows = _user_rows(args.page_size)
+    departments = _department_tree(depth=4, width=4)
+    permissions = _permission_tree(groups=40, actions=8)
+    page_type = PaginationResponse[UserListItem]
+    
+    def user_page(typed: bool = False) -> PaginationResponse:
+        if not typed:
+            # 改造前服务层返回字典行，由 response_model 校验
+            return PaginationResponse.create(items=rows, total=1000, page=1, page_size=args.page_size)
+        items = [UserService._user_list_row(SimpleNamespace(_mapping=row)) for row in rows]
+        return page_type.create(items=items, total=1000, page=1, page_size=args.page_size)
+    
+    scenarios = [
+        (
+            f"/system/users (page_size={args.page_size})",
+            _default_pipeline(
+                "/api/system/users",
+                lambda: ApiResponse(success=True, data=user_page())
+            ),
+            lambda: api_response(user_page(typed=True), page_type).body,
+        ),
+        (
+            "/system/departments/tree (341 nodes)",
+            _default_pipeline(
+                "/api/system/departments/tree",
+                lambda: ApiResponse(success=True, data=departments)
+            ),
+            lambda: api_response(departments, List[DepartmentTree]).body,
+        ),
+        (
+            "/system/permissions/tree (360 nodes)",
+            _default_pipeline(
+                "/api/system/permissions/tree",
+                lambda: ApiResponse(success=True, data=permissions)
+            ),
+            lambda: api_response(permissions, List[dict]).body,
+        ),
+    ]
+    
+    print(f"{'场景':<40}{'默认 (次/秒)':>14}{'快速 (次/秒)':>14}{'倍数':>8}")
+    for name, default_run, fast_run in scenarios:
+        default_body, fast_body = json.loads(default_run()), json.loads(fast_run())
+        default_body.pop("timestamp"), fast_body.pop("timestamp")
+        if default_body != fast_body:
+            raise SystemExit(f"{name}: 两种流程的输出不一致")
+        
+        default_rate = _measure(default_run, args.rounds)
+        fast_rate = _measure(fast_run, args.rounds)
+        print(f"{name:<40}{default_rate:>14.1f}{fast_rate:>14.1f}{fast_rate / default_rate:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,139 +2,844 @@
 """
 基础功能测试脚本
 验证后端主要组件是否正常工作
+
+可直接运行（python test_basic.py），也可由 pytest 收集执行；
+各测试以 assert 断言结果，异步测试由 pytest-asyncio 执行。
 """
 import asyncio
 import sys
 import os
 from pathlib import Path
 
+import pytest
+
 # 添加项目根目录到Python路径
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
 
+@pytest.fixture(scope="session")
+def event_loop():
+    """所有异步测试共用一个事件循环，与全局异步数据库引擎的连接池保持一致"""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
 async def test_imports():
     """测试模块导入"""
     print("🔍 测试模块导入...")
     
-    try:
-        # 测试核心模块
-        from app.core.config import settings
-        print("✅ 配置模块导入成功")
-        
-        from app.core.database import Base, engine
-        print("✅ 数据库模块导入成功")
-        
-        from app.core.security import create_access_token, verify_password
-        print("✅ 安全模块导入成功")
-        
-        # 测试模型
-        from app.models.user import User
-        from app.models.role import Role
-        from app.models.permission import Permission
-        print("✅ 数据模型导入成功")
-        
-        # 测试路由
-        from app.modules.auth.router import router as auth_router
-        from app.modules.system.router import router as system_router
-        from app.modules.profile.router import router as profile_router
-        print("✅ 路由模块导入成功")
-        
-        # 测试主应用
-        from main import app
-        print("✅ 主应用导入成功")
-        
-        return True
-        
-    except Exception as e:
-        print(f"❌ 模块导入失败: {str(e)}")
-        return False
+    # 测试核心模块
+    from app.core.config import settings
+    print("✅ 配置模块导入成功")
+    
+    from app.core.database import Base, engine
+    print("✅ 数据库模块导入成功")
+    
+    from app.core.security import create_access_token, verify_password
+    print("✅ 安全模块导入成功")
+    
+    # 测试模型
+    from app.models.user import User
+    from app.models.role import Role
+    from app.models.permission import Permission
+    print("✅ 数据模型导入成功")
+    
+    # 测试路由
+    from app.modules.auth.router import router as auth_router
+    from app.modules.system.router import router as system_router
+    from app.modules.profile.router import router as profile_router
+    print("✅ 路由模块导入成功")
+    
+    # 测试主应用
+    from main import app
+    print("✅ 主应用导入成功")
 
 
 def test_config():
     """测试配置"""
     print("\n🔧 测试配置...")
     
-    try:
-        from app.core.config import settings
-        
-        print(f"📋 项目名称: {settings.PROJECT_NAME}")
-        print(f"📋 项目版本: {settings.PROJECT_VERSION}")
-        print(f"📋 调试模式: {settings.DEBUG}")
-        print(f"📋 数据库URL: {settings.DATABASE_URL}")
-        print("✅ 配置测试通过")
-        
-        return True
-        
-    except Exception as e:
-        print(f"❌ 配置测试失败: {str(e)}")
-        return False
+    from app.core.config import Settings, settings
+    
+    print(f"📋 项目名称: {settings.PROJECT_NAME}")
+    print(f"📋 项目版本: {settings.PROJECT_VERSION}")
+    print(f"📋 调试模式: {settings.DEBUG}")
+    print(f"📋 数据库URL: {settings.DATABASE_URL}")
+    assert settings.PROJECT_NAME and settings.DATABASE_URL
+    
+    # 多进程部署时进程内缓存不能保证安全校验一致，应拒绝启动
+    unsafe = Settings(WORKERS=2, CACHE_BACKEND="memory", STATE_BACKEND=None)
+    with pytest.raises(ValueError):
+        unsafe.validate_deployment()
+    print("✅ 配置测试通过")
 
 
 def test_database():
     """测试数据库连接"""
     print("\n💾 测试数据库...")
     
-    try:
-        from app.core.database import Base, engine
-        
-        # 创建表
-        Base.metadata.create_all(bind=engine)
-        print("✅ 数据库表创建成功")
-        
-        return True
-        
-    except Exception as e:
-        print(f"❌ 数据库测试失败: {str(e)}")
-        return False
+    from app.core.database import Base, engine
+    
+    # 创建表
+    Base.metadata.create_all(bind=engine)
+    print("✅ 数据库表创建成功")
 
 
 def test_security():
     """测试安全功能"""
     print("\n🔐 测试安全功能...")
     
-    try:
-        from app.core.security import create_access_token, verify_password, get_password_hash
+    from app.core.security import create_access_token, verify_password, get_password_hash
+    
+    # 测试密码哈希
+    password = "test123"
+    hashed = get_password_hash(password)
+    assert verify_password(password, hashed), "密码哈希验证失败"
+    assert not verify_password("wrong", hashed), "错误密码验证通过"
+    print("✅ 密码哈希验证成功")
+    
+    # 测试JWT令牌
+    token = create_access_token(subject="test-user-id")
+    assert token, "JWT令牌创建失败"
+    print("✅ JWT令牌创建成功")
+
+
+async def test_services():
+    """测试服务功能"""
+    print("\n🔧 测试服务功能...")
+    
+    from app.modules.auth.service import AuthService
+    from app.modules.system.service import UserService
+    
+    print("✅ 服务类导入成功")
+
+
+
+
+def test_tree_builders():
+    """测试树形结构构建性能（应随节点数线性增长）"""
+    print("\n🌲 测试树形结构构建...")
+    
+    import time
+    from types import SimpleNamespace
+    from app.modules.system.service import PermissionService, DepartmentService
+    
+    def make_nodes(count):
+        # 每个节点挂在前面某个节点下，同时包含一条很深的链
+        nodes = []
+        for i in range(count):
+            parent_id = None if i == 0 else str(i - 1 if i % 2 else i // 2)
+            nodes.append(SimpleNamespace(
+                id=str(i), name=f"node-{i}", code=f"code-{i}", description=None,
+                resource="res", action="act", permission_type="menu", sort_order=i,
+                is_active=True, parent_id=parent_id, leader_id=None, leader=None
+            ))
+        return nodes
+    
+    per_node = {}
+    for count in (100, 1000, 10000, 50000):
+        nodes = make_nodes(count)
         
-        # 测试密码哈希
-        password = "test123"
-        hashed = get_password_hash(password)
+        start = time.perf_counter()
+        perm_tree = PermissionService._build_permission_tree(nodes)
+        dept_tree = DepartmentService._build_department_tree(nodes, {})
+        elapsed = time.perf_counter() - start
         
-        if verify_password(password, hashed):
-            print("✅ 密码哈希验证成功")
-        else:
-            print("❌ 密码哈希验证失败")
-            return False
+        assert len(perm_tree) == 1 and len(dept_tree) == 1, "树形结构根节点数量错误"
         
-        # 测试JWT令牌
-        token = create_access_token(subject="test-user-id")
-        if token:
-            print("✅ JWT令牌创建成功")
-        else:
-            print("❌ JWT令牌创建失败")
-            return False
+        per_node[count] = elapsed / count
+        print(f"📋 {count} 个节点: {elapsed * 1000:.1f} ms")
+    
+    # 线性复杂度下单节点耗时基本不变，O(n²) 实现会相差数百倍
+    assert per_node[50000] <= per_node[1000] * 10, "树形结构构建耗时未呈线性增长"
+    print("✅ 树形结构构建测试通过")
+
+
+async def test_cache_backends():
+    """测试缓存后端接口和命名空间版本号"""
+    print("\n🗄️ 测试缓存后端...")
+    
+    from app.core.cache import (
+        CacheBackend, cached, create_cache_backend, get_cache, get_namespace_version, invalidate
+    )
+    from app.core.config import settings
+    
+    with pytest.raises(TypeError):
+        CacheBackend()
+    
+    # 进程内后端与 Redis 后端（fakeredis 替身）行为一致
+    for name in ("memory", "fakeredis"):
+        backend = create_cache_backend(name)
+        try:
+            await backend.set("test:a", b"1", 60)
+            assert await backend.get_many(["test:a", "test:missing"]) == [b"1", None], f"{name}: 批量读取错误"
+            assert await backend.incr("test:counter", 60) == 1, f"{name}: 计数器初始值错误"
+            assert await backend.incr("test:counter", 60, amount=-1) == 0, f"{name}: 计数器递减错误"
+            await backend.delete("test:a", "test:counter")
+            assert await backend.get("test:a") is None, f"{name}: 删除失败"
+        finally:
+            await backend.close()
+    
+    calls = []
+    
+    @cached("test_namespace", ttl=60)
+    async def load(value):
+        calls.append(value)
+        return {"value": value}
+    
+    await invalidate("test_namespace")
+    version = await get_namespace_version("test_namespace")
+    assert await load(1) == {"value": 1} and await load(1) == {"value": 1}
+    assert calls == [1], "缓存未命中"
+    
+    # 缓存被大量无关数据挤占后，命名空间版本号不会回退
+    cache = get_cache()
+    for index in range(settings.CACHE_MAX_SIZE * 2):
+        await cache.set(f"{settings.CACHE_KEY_PREFIX}:test:filler:{index}", b"1", 60)
+    assert await get_namespace_version("test_namespace") == version, "命名空间版本号被淘汰"
+    
+    await invalidate("test_namespace")
+    await load(1)
+    assert calls == [1, 1], "失效后仍返回旧缓存"
+    print("✅ 缓存后端测试通过")
+
+
+def test_token_cache():
+    """测试已验证令牌缓存"""
+    print("\n🎫 测试令牌缓存...")
+    
+    import time
+    from app.core.config import settings
+    from app.core.security import create_access_token, decode_access_token
+    from app.core.token_cache import verified_token_cache
+    
+    token = create_access_token(subject="test-user-id")
+    rounds = 2000
+    
+    verified_token_cache.clear()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        verified_token_cache.clear()
+        decode_access_token(token)
+    uncached = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for _ in range(rounds):
+        payload = decode_access_token(token)
+    cached = time.perf_counter() - start
+    print(f"📋 单次校验: 未缓存 {uncached / rounds * 1e6:.1f} µs, 缓存 {cached / rounds * 1e6:.1f} µs")
+    
+    assert payload is not None and payload["sub"] == "test-user-id", "令牌声明错误"
+    assert cached < uncached, "令牌缓存未生效"
+    
+    # 密钥轮换后旧令牌必须失效
+    secret_key = settings.SECRET_KEY
+    settings.SECRET_KEY = secret_key + "-rotated"
+    try:
+        assert decode_access_token(token) is None, "密钥轮换后旧令牌仍然有效"
+    finally:
+        settings.SECRET_KEY = secret_key
+    
+    print("✅ 令牌缓存测试通过")
+
+
+def test_permission_index():
+    """测试权限展开索引"""
+    print("\n🔑 测试权限展开...")
+    
+    from app.core.rbac import PermissionRegistry, PermissionIndex
+    
+    registry = PermissionRegistry()
+    index = PermissionIndex(registry, [
+        ("user", None),
+        ("user:list", "user"),
+        ("user:create", "user"),
+        ("user:*", None),
+        ("role", None),
+        ("role:list", "role"),
+    ])
+    
+    expected = {
+        "user": {"user", "user:list", "user:create"},
+        "user:*": {"user:*", "user:list", "user:create"},
+        "role:list": {"role:list"},
+    }
+    for code, codes in expected.items():
+        expanded = set(registry.codes(index.expand(code)))
+        assert expanded == codes, f"{code} 展开结果错误: {sorted(expanded)}"
+    
+    required = registry.mask(["user:list", "user:create"])
+    assert (index.expand("user") & required) == required, "位掩码校验失败"
+    print("✅ 权限展开测试通过")
+
+
+async def test_permission_cache_version():
+    """测试加载期间权限变更时不缓存过时的权限"""
+    print("\n🔢 测试权限缓存版本...")
+    
+    from app.core.rbac import PermissionCache, bump_rbac_version, get_rbac_version
+    
+    cache = PermissionCache(ttl=300, max_size=10)
+    version = get_rbac_version()
+    cache.set("cached-user", 1, version)
+    assert cache.get("cached-user") == 1, "权限缓存未命中"
+    
+    # 开始加载后其他请求修改了角色，加载结果不能以新版本号写入
+    version = get_rbac_version()
+    await bump_rbac_version()
+    cache.set("loading-user", 1, version)
+    assert cache.get("loading-user") is None, "加载期间变更后仍缓存了过时的权限"
+    assert cache.get("cached-user") is None, "版本号变化后旧条目仍然命中"
+    print("✅ 权限缓存版本测试通过")
+
+
+def test_query_budget():
+    """测试SQL查询统计和查询预算"""
+    print("\n📊 测试查询预算...")
+    
+    from sqlalchemy import text
+    from app.core.database import engine
+    from app.core.query_stats import query_budget
+    
+    with query_budget(3) as stats:
+        with engine.connect() as conn:
+            for value in range(3):
+                conn.execute(text("SELECT :value"), {"value": value})
+    
+    assert stats.count == 3 and len(stats.repeated(3)) == 1, \
+        f"查询统计错误: {stats.count} 次, {dict(stats.shapes)}"
+    
+    # 超出预算时 query_budget 抛出 AssertionError
+    with pytest.raises(AssertionError):
+        with query_budget(1):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
+    print("✅ 查询预算测试通过")
+
+
+def test_fast_json_response():
+    """测试快速JSON响应与 FastAPI 默认序列化结果一致"""
+    print("\n⚡ 测试快速JSON响应...")
+    
+    import json
+    from datetime import datetime
+    from typing import List
+    from fastapi.encoders import jsonable_encoder
+    from app.core.responses import api_response
+    from app.modules.system.schemas import DepartmentTree
+    from app.schemas.common import ApiResponse
+    
+    tree = [DepartmentTree(
+        id="root", name="总公司", code="company", is_active=True,
+        children=[DepartmentTree(id="tech", name="技术部", code="tech", parent_id="root", is_active=True)]
+    )]
+    response = api_response(tree, List[DepartmentTree])
+    expected = jsonable_encoder(ApiResponse[List[DepartmentTree]](success=True, data=tree))
+    body = json.loads(response.body)
+    
+    datetime.fromisoformat(body.pop("timestamp"))
+    expected.pop("timestamp")
+    assert body == expected, f"序列化结果不一致: {body}"
+    assert response.media_type == "application/json"
+    print("✅ 快速JSON响应测试通过")
+
+
+def test_field_selection():
+    """测试稀疏字段集解析和部分字段模型"""
+    print("\n🧩 测试字段选择...")
+    
+    from app.modules.system.schemas import USER_LIST_FIELDS
+    
+    selection = USER_LIST_FIELDS.parse("nickname, username,roles.name")
+    assert selection.fields == ("id", "username", "nickname", "roles"), f"字段解析错误: {selection}"
+    assert selection.nested_fields("roles") == ("name",), f"字段解析错误: {selection}"
+    
+    model = USER_LIST_FIELDS.model_for(selection)
+    item = model.model_validate({
+        "id": "u1", "username": "alice", "nickname": None,
+        "roles": [{"name": "管理员"}]
+    })
+    assert item.model_dump() == {
+        "id": "u1", "username": "alice", "nickname": None, "roles": [{"name": "管理员"}]
+    }, f"部分字段模型错误: {item.model_dump()}"
+    assert USER_LIST_FIELDS.model_for(USER_LIST_FIELDS.parse("username,nickname,roles.name")) is model, \
+        "相同字段选择未复用模型"
+    
+    # 白名单以外的字段必须被拒绝
+    with pytest.raises(ValueError):
+        USER_LIST_FIELDS.parse("username,hashed_password")
+    print("✅ 字段选择测试通过")
+
+
+async def test_resource_version_cache():
+    """测试绕过应用修改数据后，ETag 与服务层缓存同时失效"""
+    print("\n🏷️ 测试资源版本与缓存一致性...")
+    
+    from app.core.cache import cached, get_cache, get_namespace_version
+    from app.core.conditional import _stamp_key, resource_version
+    
+    data = {"stamp": "a"}
+    
+    async def load_stamp():
+        return data["stamp"]
+    
+    @cached("test_family", ttl=60)
+    async def load_body():
+        return data["stamp"]
+    
+    first = await resource_version("test_family", load_stamp)
+    assert await load_body() == "a"
+    
+    # 直接修改数据库：数据戳缓存过期前 ETag 和缓存内容都保持旧值
+    data["stamp"] = "b"
+    assert await resource_version("test_family", load_stamp) == first
+    
+    # 数据戳缓存过期后重新查询，发现变化时同时使服务层缓存失效
+    counter = await get_namespace_version("test_family")
+    await get_cache().delete(_stamp_key("test_family", counter))
+    second = await resource_version("test_family", load_stamp)
+    assert second != first, "数据戳变化后 ETag 未更新"
+    assert await load_body() == "b", "ETag 已更新但仍返回旧的缓存内容"
+    print("✅ 资源版本与缓存一致性测试通过")
+
+
+def test_conditional_get():
+    """测试条件请求 ETag 匹配"""
+    print("\n🏷️ 测试条件请求...")
+    
+    from app.core.conditional import ConditionalGet, NotModified, etag_matches
+    
+    etag = '"abc"'
+    cases = [
+        (None, False),
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"x", "abc"', True),
+        ("*", True),
+        ('"abd"', False),
+    ]
+    for header, expected in cases:
+        assert etag_matches(header, etag) == expected, f"If-None-Match 匹配错误: {header}"
+    
+    conditional = ConditionalGet(etag)
+    assert conditional.headers["ETag"] == etag, f"响应头错误: {conditional.headers}"
+    assert "Cache-Control" in conditional.headers, f"响应头错误: {conditional.headers}"
+    
+    class _Request:
+        headers = {"if-none-match": etag}
+    
+    # ETag 匹配时返回304
+    with pytest.raises(NotModified):
+        conditional.check(_Request())
+    print("✅ 条件请求测试通过")
+
+
+async def test_endpoint_query_counts():
+    """测试主要接口的查询次数（防止关系级联加载回归）"""
+    print("\n🧮 测试接口查询次数...")
+    
+    import uuid
+    import httpx
+    from sqlalchemy import delete
+    from app.core.database import Base, async_engine, AsyncSessionLocal
+    from app.core.query_stats import query_budget
+    from app.core.rbac import role_mask_table
+    from app.core.security import create_access_token
+    from app.models.user import User
+    from main import app
+    
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    suffix = uuid.uuid4().hex[:8]
+    async with AsyncSessionLocal() as db:
+        user = User(
+            id=str(uuid.uuid4()),
+            email=f"qc_{suffix}@example.com",
+            username=f"qc_{suffix}",
+            hashed_password="-"
+        )
+        db.add(user)
+        user_id = user.id
+        await db.commit()
+    
+    try:
+        headers = {"Authorization": f"Bearer {create_access_token(subject=user_id)}"}
+        role_mask_table.clear()
+        # 冷缓存：用户、角色、角色掩码表各一次；热缓存只查询用户
+        budgets = [
+            ("/api/auth/me", 3),
+            ("/api/auth/me", 1),
+            ("/api/profile/me", 2),
+        ]
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for url, budget in budgets:
+                # 超出预算时 query_budget 抛出 AssertionError
+                with query_budget(budget) as stats:
+                    response = await client.get(url, headers=headers)
+                assert response.json().get("success"), f"{url} 请求失败: {response.text[:200]}"
+                print(f"📋 {url}: {stats.count} 次查询")
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(User).where(User.id == user_id))
+            await db.commit()
+    
+    print("✅ 接口查询次数测试通过")
+
+
+async def test_stateless_auth_fallback():
+    """测试无状态认证模式下安全戳缓存失效后回退数据库校验"""
+    print("\n🪪 测试无状态认证回退...")
+    
+    import uuid
+    import httpx
+    from sqlalchemy import delete
+    from app.core.config import settings
+    from app.core.database import Base, async_engine, AsyncSessionLocal
+    from app.core.security import create_access_token, forget_security_stamp, get_cached_security_stamp
+    from app.dependencies.auth import build_token_claims
+    from app.models.user import User
+    from main import app
+    
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    suffix = uuid.uuid4().hex[:8]
+    async with AsyncSessionLocal() as db:
+        user = User(
+            id=str(uuid.uuid4()),
+            email=f"sl_{suffix}@example.com",
+            username=f"sl_{suffix}",
+            hashed_password="-"
+        )
+        db.add(user)
+        user_id = user.id
+        await db.commit()
+        await db.refresh(user)
+    
+    stateless = settings.JWT_STATELESS_AUTH
+    settings.JWT_STATELESS_AUTH = True
+    try:
+        claims = build_token_claims(user)
+        headers = {"Authorization": f"Bearer {create_access_token(subject=user_id, claims=claims)}"}
+        # 模拟登录时写入的安全戳已过期，请求回退到数据库校验
+        await forget_security_stamp(user_id)
         
-        return True
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/api/auth/me", headers=headers)
+        assert response.status_code == 200, f"/api/auth/me 请求失败: {response.text[:200]}"
         
-    except Exception as e:
-        print(f"❌ 安全功能测试失败: {str(e)}")
-        return False
+        # 通过数据库校验后重新缓存安全戳，后续请求可以走无状态快速路径
+        assert await get_cached_security_stamp(user_id) == claims["ss"], "回退校验后未重新缓存安全戳"
+    finally:
+        settings.JWT_STATELESS_AUTH = stateless
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(User).where(User.id == user_id))
+            await db.commit()
+    
+    print("✅ 无状态认证回退测试通过")
 
 
-async def test_services():
-    """测试服务功能"""
-    print("\n🔧 测试服务功能...")
+async def test_user_search_index():
+    """测试用户搜索索引缺失时启动校验失败，存在时按用户表补全"""
+    print("\n🔍 测试用户搜索索引...")
+    
+    import tempfile
+    import uuid
+    from sqlalchemy import insert, select
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from app.models.user import User
+    from app.modules.system.search import (
+        create_fts_table, ensure_user_search_index, user_search_condition
+    )
+    
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{directory}/search.db")
+        try:
+            # 只建用户表，模拟未执行迁移的数据库
+            async with engine.begin() as conn:
+                await conn.run_sync(User.__table__.create)
+                await conn.execute(insert(User), [{
+                    "id": str(uuid.uuid4()), "email": "search@example.com",
+                    "username": "search_user", "nickname": "搜索测试", "hashed_password": "-"
+                }])
+            async with AsyncSession(engine) as db:
+                with pytest.raises(RuntimeError):
+                    await ensure_user_search_index(db)
+            
+            # 迁移创建虚拟表后，启动校验按用户表写入绕过ORM插入的用户
+            async with engine.begin() as conn:
+                await conn.run_sync(create_fts_table)
+            async with AsyncSession(engine) as db:
+                await ensure_user_search_index(db)
+                found = await db.scalars(
+                    select(User.username).where(user_search_condition("sqlite", "搜索"))
+                )
+                assert list(found) == ["search_user"], "搜索索引未包含已有用户"
+        finally:
+            await engine.dispose()
+    print("✅ 用户搜索索引测试通过")
+
+
+async def test_user_import_references():
+    """测试导入时不存在的部门ID只报告在对应行上"""
+    print("\n📥 测试用户导入...")
+    
+    import io
+    import json
+    import uuid
+    from sqlalchemy import delete, select
+    from app.core.database import Base, async_engine, AsyncSessionLocal
+    from app.models.department import Department
+    from app.models.user import User
+    from app.modules.system.importer import UserImportService
     
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    suffix = uuid.uuid4().hex[:8]
+    department_id = str(uuid.uuid4())
+    usernames = [f"imp_ok_{suffix}", f"imp_bad_{suffix}"]
+    async with AsyncSessionLocal() as db:
+        db.add(Department(id=department_id, name=f"导入_{suffix}", code=f"imp_{suffix}"))
+        await db.commit()
+    
+    content = "username,email,password,department_id\n" + "\n".join([
+        f"{usernames[0]},{usernames[0]}@example.com,secret123,{department_id}",
+        f"{usernames[1]},{usernames[1]}@example.com,secret123,{uuid.uuid4()}",
+    ]) + "\n"
     try:
-        from app.modules.auth.service import AuthService
-        from app.modules.system.service import UserService
-        
-        print("✅ 服务类导入成功")
-        return True
+        async with AsyncSessionLocal() as db:
+            events = [
+                json.loads(line)
+                async for chunk in UserImportService.import_users(db, io.BytesIO(content.encode()), "csv")
+                for line in chunk.decode().splitlines()
+            ]
+        errors = [event for event in events if event["type"] == "error"]
+        summary = events[-1]
+        assert summary["created"] == 1 and summary["failed"] == 1, f"导入结果错误: {summary}"
+        assert len(errors) == 1 and errors[0]["line"] == 3, f"错误未报告在对应行上: {errors}"
+        assert errors[0]["error"].startswith("部门不存在"), errors[0]["error"]
         
-    except Exception as e:
-        print(f"❌ 服务功能测试失败: {str(e)}")
-        return False
+        async with AsyncSessionLocal() as db:
+            created = await db.scalars(select(User.username).where(User.username.in_(usernames)))
+            assert list(created) == [usernames[0]], "有效的行未写入"
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(User).where(User.username.in_(usernames)))
+            await db.execute(delete(Department).where(Department.id == department_id))
+            await db.commit()
+    print("✅ 用户导入测试通过")
+
+
+async def test_refresh_token_rotation():
+    """测试刷新令牌轮换和重复使用检测"""
+    print("\n🔄 测试刷新令牌轮换...")
+    
+    from app.core.cache import get_cache
+    from app.core.config import settings
+    from app.core.refresh_tokens import (
+        RefreshTokenError, issue_refresh_token, rotate_refresh_token, parse_refresh_token
+    )
+    
+    token = await issue_refresh_token("refresh-user", "stamp", False)
+    
+    # 缓存被大量无关数据挤占后，令牌族状态仍然存在
+    cache = get_cache()
+    for index in range(settings.CACHE_MAX_SIZE * 2):
+        await cache.set(f"{settings.CACHE_KEY_PREFIX}:test:filler:{index}", b"1", 60)
+    
+    rotated, state = await rotate_refresh_token(token)
+    assert state == {"sub": "refresh-user", "ss": "stamp", "su": False}, f"令牌族状态错误: {state}"
+    assert parse_refresh_token(rotated)[1] == 1, "轮换后代数未递增"
+    
+    # 已使用过的旧令牌再次出现时吊销整个令牌族
+    with pytest.raises(RefreshTokenError) as reused:
+        await rotate_refresh_token(token)
+    assert reused.value.reused, "重复使用未被识别"
+    with pytest.raises(RefreshTokenError):
+        await rotate_refresh_token(rotated)
+    
+    # 篡改的令牌签名校验失败
+    family_id, _ = parse_refresh_token(rotated)
+    with pytest.raises(RefreshTokenError):
+        parse_refresh_token(f"{family_id}.5.forged")
+    print("✅ 刷新令牌轮换测试通过")
+
+
+async def test_token_revocation_cutoff():
+    """测试按时间点吊销用户全部访问令牌"""
+    print("\n🚫 测试令牌吊销...")
+    
+    import time
+    from datetime import timedelta
+    from jose import jwt
+    import json
+    from app.core.cache import get_state_store
+    from app.core.revocation import TokenRevocationList, _entry_key, _sequence_key
+    from app.core.security import create_access_token, max_access_token_lifetime
+    
+    revocations = TokenRevocationList(sync_interval=0)
+    after = time.time()
+    await revocations.revoke_user_tokens("revoked-user", after=after)
+    
+    assert revocations.is_revoked({"sub": "revoked-user", "iat": after - 1}), "分界点之前签发的令牌未被吊销"
+    assert not revocations.is_revoked({"sub": "revoked-user", "iat": after + 1}), "分界点之后签发的令牌被误吊销"
+    assert not revocations.is_revoked({"sub": "other-user", "iat": after - 1}), "其他用户的令牌被误吊销"
+    
+    # 吊销记录需覆盖可能签发的最长有效期，自定义有效期不能超过上限
+    cutoff = revocations._user_cutoffs["revoked-user"]
+    assert cutoff["exp"] >= after + max_access_token_lifetime().total_seconds(), f"吊销记录有效期过短: {cutoff}"
+    with pytest.raises(ValueError):
+        create_access_token("revoked-user", expires_delta=max_access_token_lifetime() + timedelta(minutes=1))
+    
+    # 其他进程从状态存储同步到同一条记录
+    other_process = TokenRevocationList(sync_interval=0)
+    token = create_access_token("revoked-user", expires_delta=max_access_token_lifetime())
+    payload = jwt.get_unverified_claims(token)
+    payload["iat"] = after - 1
+    assert await other_process.check(payload), "吊销记录未同步到其他进程"
+    
+    # 另一个进程已取得序号但尚未写入记录时，同步停在该序号，不越过其后的记录
+    store = get_state_store()
+    pending = await store.incr(_sequence_key())
+    await revocations.revoke_user_tokens("later-user", after=after)
+    await other_process.sync(force=True)
+    assert not other_process.is_revoked({"sub": "later-user", "iat": after - 1}), "越过了仍在写入的记录"
+    entry = {"type": "user", "sub": "pending-user", "after": after, "exp": after + 60, "ts": time.time()}
+    await store.set(_entry_key(pending), json.dumps(entry).encode(), 60)
+    await other_process.sync(force=True)
+    assert other_process.is_revoked({"sub": "pending-user", "iat": after - 1}), "写入完成的记录未同步"
+    assert other_process.is_revoked({"sub": "later-user", "iat": after - 1}), "后续记录未同步"
+    
+    # 写入方失败留下的空序号在宽限期后跳过
+    await store.incr(_sequence_key())
+    await revocations.revoke_user_tokens("after-gap-user", after=after)
+    other_process.PENDING_GRACE = 0
+    await other_process.sync(force=True)
+    assert other_process.is_revoked({"sub": "after-gap-user", "iat": after - 1}), "空序号阻塞了后续记录"
+    print("✅ 令牌吊销测试通过")
+
+
+async def test_login_rate_limit():
+    """测试登录失败限流和登录成功后的计数清除"""
+    print("\n🧱 测试登录限流...")
+    
+    import uuid
+    from app.core.cache import get_cache
+    from app.core.config import settings
+    from app.core.ratelimit import LoginRateLimiter, RateLimitExceeded
+    
+    limiter = LoginRateLimiter(window=300, limits={"user_ip": 3, "user": 5, "ip": 50})
+    username = f"limited_{uuid.uuid4().hex[:8]}"
+    
+    for _ in range(3):
+        await limiter.acquire(username, "10.0.0.1")
+        await limiter.record_failure(username, "10.0.0.1")
+    
+    # 缓存被大量无关数据挤占后，失败计数仍然存在
+    cache = get_cache()
+    for index in range(settings.CACHE_MAX_SIZE * 2):
+        await cache.set(f"{settings.CACHE_KEY_PREFIX}:test:filler:{index}", b"1", 60)
+    with pytest.raises(RateLimitExceeded) as throttled:
+        await limiter.acquire(username, "10.0.0.1")
+    assert throttled.value.scope == "user_ip" and throttled.value.retry_after > 0, "限流维度或重试时间错误"
+    
+    # 其他IP只累计用户名维度，尚未达到阈值
+    await limiter.acquire(username, "10.0.0.2")
+    await limiter.record_failure(username, "10.0.0.2")
+    
+    # 登录成功后清除用户名+IP和用户名维度的计数，用户名维度重新从0开始累计
+    await limiter.acquire(username, "10.0.0.2")
+    await limiter.record_success(username, "10.0.0.2")
+    for ip in ("10.0.0.3", "10.0.0.3", "10.0.0.3", "10.0.0.4", "10.0.0.4"):
+        await limiter.acquire(username, ip)
+        await limiter.record_failure(username, ip)
+    with pytest.raises(RateLimitExceeded) as throttled:
+        await limiter.acquire(username, "10.0.0.5")
+    assert throttled.value.scope == "user", "用户名维度限流错误"
+    
+    # 并发的一批登录尝试中只有阈值以内的请求通过检查
+    burst_user = f"burst_{uuid.uuid4().hex[:8]}"
+    results = await asyncio.gather(
+        *(limiter.acquire(burst_user, "10.0.1.1") for _ in range(10)),
+        return_exceptions=True
+    )
+    admitted = [result for result in results if result is None]
+    assert len(admitted) == 3, f"并发请求通过数量错误: {len(admitted)}"
+    print("✅ 登录限流测试通过")
+
+
+async def test_department_closure_move():
+    """测试部门移动后按闭包表查询子部门用户"""
+    print("\n🏢 测试部门闭包表...")
+    
+    import uuid
+    from sqlalchemy import delete, or_
+    from app.core.database import Base, async_engine, AsyncSessionLocal
+    from app.models.associations import department_closure_table
+    from app.models.department import Department
+    from app.models.user import User
+    from app.modules.system.schemas import DepartmentCreate, DepartmentUpdate
+    from app.modules.system.service import DepartmentService, UserService
+    from app.schemas.common import PaginationParams
+    
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    
+    suffix = uuid.uuid4().hex[:8]
+    department_ids = []
+    user_id = str(uuid.uuid4())
+    
+    async def user_ids_under(db, department_id):
+        users, total, _ = await UserService.get_users(
+            db, PaginationParams(page_size=100), department_id=department_id, include_descendants=True
+        )
+        return {str(user.id) for user in users}
+    
+    try:
+        async with AsyncSessionLocal() as db:
+            async def create(name, parent_id=None):
+                department = await DepartmentService.create_department(
+                    db, DepartmentCreate(name=name, code=f"{name}_{suffix}", parent_id=parent_id)
+                )
+                department_ids.append(str(department.id))
+                return str(department.id)
+            
+            # root -> a -> b，root -> c
+            root = await create("root")
+            a = await create("a", root)
+            b = await create("b", a)
+            c = await create("c", root)
+            db.add(User(
+                id=user_id, email=f"closure_{suffix}@example.com",
+                username=f"closure_{suffix}", hashed_password="-", department_id=b
+            ))
+            await db.commit()
+            
+            assert user_id in await user_ids_under(db, a), "子部门用户未包含在上级部门中"
+            assert user_id not in await user_ids_under(db, c), "无关部门包含了该用户"
+            
+            # a（连同子部门 b）移动到 c 之下
+            await DepartmentService.update_department(db, a, DepartmentUpdate(parent_id=c))
+            assert user_id in await user_ids_under(db, c), "移动后新上级部门未包含子树用户"
+            assert user_id in await user_ids_under(db, root), "移动后根部门未包含子树用户"
+            assert user_id in await user_ids_under(db, a), "移动后原子树关系丢失"
+            
+            # 闭包表与 parent_id 一致，启动校正不需要重建
+            assert not await DepartmentService.ensure_department_closure(db), "移动后闭包表与部门数据不一致"
+        print("✅ 部门闭包表测试通过")
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(User).where(User.id == user_id))
+            closure = department_closure_table.c
+            await db.execute(delete(department_closure_table).where(or_(
+                closure.ancestor_id.in_(department_ids), closure.descendant_id.in_(department_ids)
+            )))
+            await db.execute(delete(Department).where(Department.id.in_(department_ids)))
+            await db.commit()
 
 
 async def main():
@@ -142,23 +847,42 @@ async def main():
     print("🚀 开始后端基础功能测试...\n")
     
     tests = [
-        ("模块导入", test_imports()),
-        ("配置", test_config()),
-        ("数据库", test_database()),
-        ("安全功能", test_security()),
-        ("服务功能", test_services()),
+        ("模块导入", test_imports),
+        ("配置", test_config),
+        ("数据库", test_database),
+        ("安全功能", test_security),
+        ("服务功能", test_services),
+        ("树形结构", test_tree_builders),
+        ("缓存后端", test_cache_backends),
+        ("令牌缓存", test_token_cache),
+        ("权限展开", test_permission_index),
+        ("权限缓存版本", test_permission_cache_version),
+        ("查询预算", test_query_budget),
+        ("快速JSON响应", test_fast_json_response),
+        ("字段选择", test_field_selection),
+        ("条件请求", test_conditional_get),
+        ("资源版本缓存", test_resource_version_cache),
+        ("接口查询次数", test_endpoint_query_counts),
+        ("无状态认证回退", test_stateless_auth_fallback),
+        ("用户搜索索引", test_user_search_index),
+        ("用户导入", test_user_import_references),
+        ("刷新令牌轮换", test_refresh_token_rotation),
+        ("令牌吊销", test_token_revocation_cutoff),
+        ("登录限流", test_login_rate_limit),
+        ("部门闭包表", test_department_closure_move),
     ]
     
     passed = 0
     total = len(tests)
     
     for name, test_func in tests:
-        if asyncio.iscoroutine(test_func):
-            result = await test_func
+        try:
+            result = test_func()
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            print(f"❌ {name}测试失败: {type(e).__name__}: {str(e)}")
         else:
-            result = test_func
-        
-        if result:
             passed += 1
     
     print(f"\n📊 测试结果: {passed}/{total} 通过")
@@ -39,6 +39,8 @@ export interface Position {
 
 export interface UserWithRoles extends User {
   roles: Role[];
+  department_name?: string;
+  position_name?: string;
 }
 
 export interface RoleWithPermissions extends Role {